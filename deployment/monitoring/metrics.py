@@ -14,9 +14,12 @@ from typing import Dict, List, Any
 
 import psutil
 
+from src.utils.latency_histogram import DEFAULT_QUANTILES, LatencyRegistry, get_latency_registry
+
 # Prometheus客户端（可选）
 try:
-    from prometheus_client import Gauge, Counter, Histogram, start_http_server
+    from prometheus_client import Gauge, Counter, Histogram, REGISTRY, start_http_server
+    from prometheus_client.core import GaugeMetricFamily, HistogramMetricFamily
 
     PROMETHEUS_AVAILABLE = True
 except ImportError:
@@ -65,17 +68,51 @@ class BusinessMetrics:
     risk_exposure: float  # 风险暴露
 
 
+class StageLatencyCollector:
+    """
+    分阶段延迟直方图的Prometheus自定义收集器
+
+    热路径只写进程内直方图（src.utils.latency_histogram），Prometheus抓取时才在这里
+    把计数数组转换为指标，不在每笔Tick上调用prometheus_client。
+    """
+
+    def __init__(self, latency_registry: LatencyRegistry, name: str = 'triplea_stage_latency_seconds'):
+        self.latency_registry = latency_registry
+        self.name = name
+
+    def collect(self):
+        labels = ['stage', 'source']
+        histogram_family = HistogramMetricFamily(self.name, 'TripleA 各阶段处理延迟（秒）', labels=labels)
+        quantile_family = GaugeMetricFamily(f'{self.name}_quantile', 'TripleA 各阶段处理延迟分位数（秒，进程内聚合）',
+                                            labels=labels + ['quantile'])
+        max_family = GaugeMetricFamily(f'{self.name}_max', 'TripleA 各阶段处理延迟最大值（秒）', labels=labels)
+
+        for (stage, source), histogram in self.latency_registry.items():
+            buckets = [(str(bound_ns / 1e9), cumulative) for bound_ns, cumulative in histogram.octave_buckets()]
+            buckets.append(('+Inf', histogram.count))
+            histogram_family.add_metric([stage, source], buckets, histogram.sum_ns / 1e9)
+            for q in DEFAULT_QUANTILES:
+                quantile_family.add_metric([stage, source, str(q)], histogram.percentile(q * 100) / 1e9)
+            max_family.add_metric([stage, source], histogram.max_ns / 1e9)
+
+        yield histogram_family
+        yield quantile_family
+        yield max_family
+
+
 class MetricsCollector:
     """指标收集器"""
 
-    def __init__(self, history_size: int = 1000):
+    def __init__(self, history_size: int = 1000, latency_registry: LatencyRegistry = None):
         """
         初始化指标收集器
 
         Args:
             history_size: 历史记录保留数量
+            latency_registry: 分阶段延迟直方图注册表，默认使用进程级共享注册表
         """
         self.history_size = history_size
+        self.latency_registry = latency_registry or get_latency_registry()
 
         # 指标历史记录
         self.system_metrics_history = deque(maxlen=history_size)
@@ -142,6 +179,10 @@ class MetricsCollector:
             ['error_type']
         )
 
+        # 分阶段延迟（decode / range_bar / cvd / state_machine / signal_emit / order_submit）
+        self.prom_stage_latency = StageLatencyCollector(self.latency_registry)
+        REGISTRY.register(self.prom_stage_latency)
+
     def collect_system_metrics(self) -> SystemMetrics:
         """
         收集系统指标
@@ -396,6 +437,30 @@ class MetricsCollector:
             "sample_count": len(recent_metrics)
         }
 
+    def get_latency_summary(self) -> Dict[str, Any]:
+        """
+        获取分阶段延迟摘要
+
+        Returns:
+            Dict[str, Any]: {"阶段/来源": {count, mean_ms, p50_ms, p99_ms, p999_ms, max_ms}}
+        """
+        summary = {}
+        for (stage, source), snapshot in self.latency_registry.snapshot().items():
+            summary[f"{stage}/{source}"] = {
+                key.replace('_ns', '_ms'): value if key == 'count' else round(value / 1_000_000, 4)
+                for key, value in snapshot.items()
+            }
+        return summary
+
+    def get_latency_prometheus_text(self) -> str:
+        """
+        分阶段延迟的Prometheus文本格式（未安装prometheus_client时可自行暴露或写入文件）
+
+        Returns:
+            str: Prometheus 文本格式
+        """
+        return self.latency_registry.prometheus_text()
+
     def get_business_summary(self) -> Dict[str, Any]:
         """
         获取业务指标摘要
@@ -36,7 +36,7 @@ project_root = os.path.dirname(os.path.dirname(os.path.dirname(current_file)))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from src.data_feed.okx_loader import OKXDataLoader
+from src.data_feed.candle_cache import get_candle_cache
 from src.strategy.indicators import add_smc_indicators
 from src.strategy.smc import SMCStrategy
 from src.execution.trader import OKXTrader
@@ -80,7 +80,8 @@ class SMCOrchestrator:
         self.context = MarketContext()
 
         # 初始化核心组件
-        self.data_loader = OKXDataLoader(symbol=symbol, timeframe=self.timeframe)
+        # 进程级共享 K 线缓存：预热一次后每小时只拉取新收盘的 K 线
+        self.candle_cache = get_candle_cache()
         self.strategy = SMCStrategy(
             ema_period=self.strat_cfg.get('ema_period', 144),
             lookback=self.strat_cfg.get('lookback', 15),
@@ -186,8 +187,8 @@ class SMCOrchestrator:
         logger.info("🕐 开始每小时 SMC 信号扫描...")
 
         try:
-            # 1. 拉取最新的 K 线数据（例如最近 500 根）
-            df = self.data_loader.fetch_historical_data(limit=500)
+            # 1. 拉取最新的 K 线数据（例如最近 500 根），缓存返回零拷贝视图，指标列直接追加在上面
+            df = self.candle_cache.get_frame(self.symbol, self.timeframe, limit=500)
             if df.empty:
                 logger.error("❌ 获取数据失败，跳过本次扫描")
                 return
@@ -13,10 +13,10 @@ TripleA 四号引擎编排器 (TripleA Orchestrator)
 import argparse
 import asyncio
 import csv
-import json
 import os
 import signal
 import sys
+import time
 
 import aiohttp
 
@@ -29,7 +29,11 @@ if project_root not in sys.path:
 from src.strategy.triplea.signal.signal_generator import TripleASignalGenerator
 from src.strategy.triplea.signal.research_generator import ResearchTripleASignalGenerator
 from src.execution.trader import OKXTrader
+from src.data_feed.okx_trade_decoder import OKXTradeDecoder
+from src.data_feed.trade_aggregator import aggregate_fills, aggregation_enabled
+from src.data_feed.trade_tape import get_trade_tape_recorder
 from engines.engine_4_triplea.execution_manager import TripleAExecutionManager
+from src.utils.latency_histogram import get_latency_registry
 from src.utils.log import get_logger
 
 logger = get_logger(__name__)
@@ -53,7 +57,7 @@ class TripleAOrchestrator:
 
         # 👻 影子引擎：科考打捞船 (参数故意放宽，用于测试边界)
         # 影子引擎使用固定账户规模1000，用于百分比计算，不依赖实际余额
-        self.shadow_queue = asyncio.Queue(maxsize=10000)  # 影子引擎专用队列
+        self.shadow_queue = asyncio.Queue(maxsize=10000)  # 影子引擎专用队列（按 WS 帧入队）
         self.shadow_generator = ResearchTripleASignalGenerator(symbol=symbol, account_size_usdt=1000)
         self.shadow_generator.vol_spike_threshold = 1.5  # 放宽爆量倍数 (主炮塔是 2.0)
         self.shadow_generator.delta_ratio_threshold = 0.25  # 放宽净买卖比 (主炮塔是 0.35)
@@ -63,6 +67,16 @@ class TripleAOrchestrator:
         self.log_file = f"data/tripleA/shadow_research_{symbol}.csv"
         self._init_research_vessel()
 
+        # 📼 逐笔成交磁带：后台线程落盘，WS 协程里每帧只入队一次
+        self.tape_recorder = get_trade_tape_recorder()
+
+        # 🧩 成交帧解码器：WS 原文直接解码为列式 Tick 块
+        self.trade_decoder = OKXTradeDecoder(symbol)
+        # 🧱 同价成交聚合（settings.yaml: trade_aggregation.engine_4_triplea）
+        self.aggregate_fills = aggregation_enabled('engine_4_triplea')
+        # ⏱️ 下单延迟直方图（解码/状态机等阶段在各组件内部计时）
+        self.order_latency = get_latency_registry().histogram('order_submit')
+
         self.current_price = 0.0
         self._is_running = False
         self._tasks = []
@@ -189,40 +203,41 @@ class TripleAOrchestrator:
                                 break
 
                             if msg.type == aiohttp.WSMsgType.TEXT:
-                                data = json.loads(msg.data)
+                                # 整帧解码成列式 Tick 块（ts 毫秒，side 1=买/-1=卖），非本交易对成交帧返回 None
+                                ticks = self.trade_decoder.decode(msg.data)
 
                                 # 解析 Trades 频道数据
-                                if "data" in data and isinstance(data["data"], list):
-                                    for trade in data["data"]:
-                                        # 转换成引擎认识的标准 Tick 格式
-                                        # 转换成引擎认识的标准 Tick 格式
-                                        tick = {
-                                            'price': float(trade['px']),
-                                            'size': float(trade['sz']),
-                                            'side': trade['side'],
-                                            'ts': int(trade['ts'])
-                                        }
-
-                                        # 更新Tick计数器
-                                        tick_counter += 1
-                                        if tick_counter % 100 == 0:
-                                            logger.debug(f"[DEBUG] 已处理 {tick_counter} 个Tick，最新价格: {tick['price']:.2f}")
-
-                                        # 更新当前价格
-                                        self.current_price = tick['price']
-
-                                        # 🚀 优先级 1：主引擎同步处理 (最高优先级，严禁延迟)
-                                        main_signal = await self.main_generator.process_tick(tick)
-                                        if main_signal:
-                                            # 使用 create_task 异步处理信号执行，不阻塞 Tick 接收
-                                            asyncio.create_task(self._handle_main_signal(main_signal))
-
-                                        # 🚀 优先级 2：将 Tick 丢入影子队列 (非阻塞)
-                                        try:
-                                            self.shadow_queue.put_nowait(tick)
-                                        except asyncio.QueueFull:
-                                            # 如果队列满了，优先丢弃影子 Tick，确保主系统存活
-                                            pass
+                                if ticks is not None:
+                                    if self.tape_recorder is not None:
+                                        self.tape_recorder.record(self.symbol, ticks)
+
+                                    if len(ticks) == 0:
+                                        continue
+
+                                    # 同一主动单的同毫秒、同价、同方向成交合并为一笔（磁带仍录制原始成交）
+                                    if self.aggregate_fills:
+                                        ticks = aggregate_fills(ticks)
+
+                                    # 更新Tick计数器
+                                    previous_counter = tick_counter
+                                    tick_counter += len(ticks)
+                                    if tick_counter // 100 > previous_counter // 100:
+                                        logger.debug(f"[DEBUG] 已处理 {tick_counter} 个Tick，最新价格: {ticks['px'][-1]:.2f}")
+
+                                    # 更新当前价格
+                                    self.current_price = float(ticks['px'][-1])
+
+                                    # 🚀 优先级 1：主引擎整帧处理 (最高优先级，严禁延迟)
+                                    for main_signal in await self.main_generator.process_ticks(ticks):
+                                        # 使用 create_task 异步处理信号执行，不阻塞 Tick 接收
+                                        asyncio.create_task(self._handle_main_signal(main_signal))
+
+                                    # 🚀 优先级 2：将整帧丢入影子队列 (非阻塞)
+                                    try:
+                                        self.shadow_queue.put_nowait(ticks)
+                                    except asyncio.QueueFull:
+                                        # 如果队列满了，优先丢弃影子 Tick，确保主系统存活
+                                        pass
 
                             elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
                                 logger.warning("⚠️ WebSocket 连接断开，准备重连...")
@@ -240,7 +255,9 @@ class TripleAOrchestrator:
         if reason == "TRIPLE_A_COMPLETE":
             # 🚀 抓到了完整的 A1-A2-A3 突破信号！
             if self.mode == "live":
+                start_ns = time.perf_counter_ns()
                 success = await self.execution_manager.execute_signal(signal)
+                self.order_latency.record(time.perf_counter_ns() - start_ns)
                 if not success:
                     # 如果实盘开仓因为余额等问题失败，必须手动把引擎状态重置回 IDLE
                     # 否则引擎会一直处于 LONG/SHORT 的幻觉中
@@ -373,12 +390,11 @@ class TripleAOrchestrator:
         logger.info("🚢 影子科考船已启动，开始监听镜像 Tick 流...")
         while self._is_running:
             try:
-                # 阻塞式等待队列中的 Tick
-                tick = await self.shadow_queue.get()
+                # 阻塞式等待队列中的 Tick 帧
+                ticks = await self.shadow_queue.get()
 
                 # 驱动影子引擎
-                shadow_signal = await self.shadow_generator.process_tick(tick)
-                if shadow_signal:
+                for shadow_signal in await self.shadow_generator.process_ticks(ticks):
                     await self._handle_shadow_signal(shadow_signal)
 
                 # 标记处理完成
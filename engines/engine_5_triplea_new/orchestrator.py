@@ -27,7 +27,6 @@ TripleA 五号引擎编排器 (TripleA Orchestrator v5)
 """
 import argparse
 import asyncio
-import json
 import os
 import signal
 import sys
@@ -41,6 +40,9 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from src.execution.trader import OKXTrader
+from src.data_feed.okx_trade_decoder import OKXTradeDecoder
+from src.data_feed.trade_aggregator import aggregate_fills, aggregation_enabled
+from src.data_feed.trade_tape import get_trade_tape_recorder
 from engines.engine_5_triplea_new.execution_manager import TripleAExecutionManager
 from src.utils.log import get_logger
 
@@ -74,6 +76,14 @@ class TripleAOrchestrator:
         # 🔌 信号生成器占位（后续填充）
         self.signal_generator = None  # 后续替换为实际的信号生成器
 
+        # 📼 逐笔成交磁带：后台线程落盘，WS 协程里每帧只入队一次
+        self.tape_recorder = get_trade_tape_recorder()
+
+        # 🧩 成交帧解码器：WS 原文直接解码为列式 Tick 块
+        self.trade_decoder = OKXTradeDecoder(symbol)
+        # 🧱 同价成交聚合（settings.yaml: trade_aggregation.engine_5_triplea_new）
+        self.aggregate_fills = aggregation_enabled('engine_5_triplea_new')
+
         # 📊 当前价格
         self.current_price = 0.0
 
@@ -151,34 +161,37 @@ class TripleAOrchestrator:
                                 break
 
                             if msg.type == aiohttp.WSMsgType.TEXT:
-                                data = json.loads(msg.data)
+                                # 整帧解码成列式 Tick 块（ts 毫秒，side 1=买/-1=卖），非本交易对成交帧返回 None
+                                ticks = self.trade_decoder.decode(msg.data)
 
                                 # 解析Trades频道数据
-                                if "data" in data and isinstance(data["data"], list):
-                                    for trade in data["data"]:
-                                        # 转换成标准Tick格式
-                                        tick = {
-                                            'price': float(trade['px']),
-                                            'size': float(trade['sz']),
-                                            'side': trade['side'],
-                                            'ts': int(trade['ts'])
-                                        }
-
-                                        # 更新当前价格
-                                        self.current_price = tick['price']
-
-                                        # 🔄 单向数据流：将Tick传递给处理管道
-                                        # 当前版本仅打印日志，后续添加实际处理
-                                        tick_counter += 1
-                                        if tick_counter % 100 == 0:
-                                            logger.info(
-                                                f"📊 已接收 {tick_counter} 个Tick | "
-                                                f"最新价格: {tick['price']:.2f} | "
-                                                f"模式: {self.mode.upper()}"
-                                            )
-
-                                        # TODO: 后续将此处替换为实际的数据管道调用
-                                        # await self._process_tick_pipeline(tick)
+                                if ticks is not None:
+                                    if self.tape_recorder is not None:
+                                        self.tape_recorder.record(self.symbol, ticks)
+
+                                    if len(ticks) == 0:
+                                        continue
+
+                                    # 同一主动单的同毫秒、同价、同方向成交合并为一笔（磁带仍录制原始成交）
+                                    if self.aggregate_fills:
+                                        ticks = aggregate_fills(ticks)
+
+                                    # 更新当前价格
+                                    self.current_price = float(ticks['px'][-1])
+
+                                    # 🔄 单向数据流：将Tick块传递给处理管道
+                                    # 当前版本仅打印日志，后续添加实际处理
+                                    previous_counter = tick_counter
+                                    tick_counter += len(ticks)
+                                    if tick_counter // 100 > previous_counter // 100:
+                                        logger.info(
+                                            f"📊 已接收 {tick_counter} 个Tick | "
+                                            f"最新价格: {self.current_price:.2f} | "
+                                            f"模式: {self.mode.upper()}"
+                                        )
+
+                                    # TODO: 后续将此处替换为实际的数据管道调用
+                                    # await self._process_tick_pipeline(ticks)
 
                             elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
                                 logger.warning("⚠️ WebSocket连接断开，准备重连...")
@@ -36,7 +36,8 @@ cfg = load_strategy_config("smc", SYMBOL)
 engine_cfg = cfg.get("engine", {})
 
 logger.info(f"📥 正在加载全局数据 {SYMBOL} ({START_DATE} 至 {END_DATE})...")
-loader = OKXDataLoader(symbol=SYMBOL, timeframe=SMC_TIMEFRAME)
+# 多个调参进程同时读库，用只读连接避免与实盘引擎的写入互相加锁
+loader = OKXDataLoader(symbol=SYMBOL, timeframe=SMC_TIMEFRAME, read_only=True)
 df_raw = loader.fetch_data_by_date_range(START_DATE, END_DATE)
 df_global = add_smc_indicators(df_raw)
 logger.info("✅ 数据加载完成，启动 Optuna 智能调参引擎！\n")
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author     : Zijun Deng
+@Date       : 3/11/26 9:15 PM
+@File       : candle_cache.py
+@Description: 进程内共享 K 线缓存
+
+按 (symbol, timeframe) 缓存最近 N 根已收盘 K 线，底层是列式 numpy 环形缓冲：
+- 首次访问走 OKXDataLoader.fetch_historical_data 完整的"向右/向左/补中间"流程预热
+- 之后每次访问只在出现新的收盘 K 线时向 OKX 拉取尾部增量
+- 对外返回只读的 numpy 视图 / 基于视图构造的 DataFrame，不拷贝数据；
+  缓冲区满时换新数组搬迁，已经交出去的视图内容永远不会被改写
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.data_feed.okx_loader import OKXDataLoader
+from src.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+CANDLE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class CandleRing:
+    """
+    只追加的列式 K 线缓冲，保留最近 capacity 根
+
+    物理数组长度为 2 * capacity，写满后把最近 capacity 根搬到一块新数组的开头，
+    因此 [end - n, end) 永远是连续内存，可以直接切片成零拷贝视图。
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.clear()
+
+    def _alloc(self):
+        self.ts = np.empty(2 * self.capacity, dtype=np.int64)
+        self.cols = {col: np.empty(2 * self.capacity, dtype=np.float64) for col in CANDLE_COLUMNS}
+
+    def clear(self):
+        """清空 (换新数组，不覆盖已交出的视图)"""
+        self._alloc()
+        self.start = 0
+        self.end = 0
+
+    def __len__(self):
+        return self.end - self.start
+
+    @property
+    def last_ts(self):
+        return int(self.ts[self.end - 1]) if len(self) else None
+
+    def append(self, ts: np.ndarray, cols: dict):
+        n = len(ts)
+        if n == 0:
+            return
+        if n >= self.capacity:
+            ts, cols = ts[-self.capacity:], {col: arr[-self.capacity:] for col, arr in cols.items()}
+            n = self.capacity
+            self.clear()
+
+        if self.end + n > len(self.ts):
+            # 搬迁到新数组：旧视图仍引用旧数组，不受影响
+            keep = min(len(self), self.capacity - n)
+            old_ts, old_cols, old_end = self.ts, self.cols, self.end
+            self._alloc()
+            self.ts[:keep] = old_ts[old_end - keep:old_end]
+            for col in CANDLE_COLUMNS:
+                self.cols[col][:keep] = old_cols[col][old_end - keep:old_end]
+            self.start, self.end = 0, keep
+
+        self.ts[self.end:self.end + n] = ts
+        for col in CANDLE_COLUMNS:
+            self.cols[col][self.end:self.end + n] = cols[col]
+        self.end += n
+        self.start = max(self.start, self.end - self.capacity)
+
+    def view(self, limit: int = None):
+        """返回最近 limit 根的只读视图 (timestamp数组, {列名: 数组})"""
+        lo = self.start if limit is None else max(self.start, self.end - limit)
+        ts = self.ts[lo:self.end]
+        ts.flags.writeable = False
+        cols = {}
+        for col in CANDLE_COLUMNS:
+            arr = self.cols[col][lo:self.end]
+            arr.flags.writeable = False
+            cols[col] = arr
+        return ts, cols
+
+
+class CandleCache:
+    """按 (symbol, timeframe) 管理 CandleRing 的进程级缓存"""
+
+    def __init__(self, capacity: int = 5000):
+        """
+        Args:
+            capacity: 每个 (symbol, timeframe) 缓存的最大 K 线根数
+        """
+        self.capacity = capacity
+        self._rings = {}
+        self._loaders = {}
+        self._locks = {}
+        self._warm_limits = {}
+        self._registry_lock = threading.Lock()
+
+        self.stats = {
+            'hits': 0,
+            'warmups': 0,
+            'tail_refreshes': 0,
+            'bars_appended': 0,
+        }
+
+    def _entry(self, symbol: str, timeframe: str):
+        key = (symbol, timeframe)
+        with self._registry_lock:
+            if key not in self._rings:
+                self._rings[key] = CandleRing(self.capacity)
+                self._loaders[key] = OKXDataLoader(symbol=symbol, timeframe=timeframe)
+                self._locks[key] = threading.Lock()
+                self._warm_limits[key] = 0
+            return self._rings[key], self._loaders[key], self._locks[key]
+
+    @staticmethod
+    def _to_arrays(df: pd.DataFrame):
+        ts = pd.DatetimeIndex(df.index).values.astype('datetime64[ns]').astype(np.int64)
+        return ts, {col: df[col].to_numpy(dtype=np.float64) for col in CANDLE_COLUMNS}
+
+    def _warmup(self, key, ring: CandleRing, loader: OKXDataLoader, need: int):
+        df = loader.fetch_historical_data(limit=need)
+        ring.clear()
+        if not df.empty:
+            ring.append(*self._to_arrays(df))
+        self._warm_limits[key] = need
+        self.stats['warmups'] += 1
+
+    def refresh(self, symbol: str, timeframe: str, limit: int = None):
+        """
+        保证缓存包含最新的已收盘 K 线
+
+        首次访问 (或请求的根数超过上次预热的根数) 时完整预热；
+        否则只在理论上已有新 K 线收盘时拉取尾部增量。
+        """
+        key = (symbol, timeframe)
+        ring, loader, lock = self._entry(symbol, timeframe)
+        need = limit or self.capacity
+
+        with lock:
+            if need > ring.capacity:
+                ring = self._rings[key] = CandleRing(need)
+            if len(ring) == 0 or need > self._warm_limits[key]:
+                self._warmup(key, ring, loader, need)
+                return
+
+            bar_seconds = loader._get_seconds(timeframe)
+            elapsed = (loader._get_current_local_time() - pd.Timestamp(ring.last_ts)).total_seconds()
+            # 缓存最后一根的下一根也已经收盘，才需要去交易所拿
+            missing = int(elapsed // bar_seconds) - 1
+            if missing <= 0:
+                self.stats['hits'] += 1
+                return
+
+            if missing >= ring.capacity:
+                # 离线太久，整段重建
+                self._warmup(key, ring, loader, need)
+                return
+
+            df = loader.fetch_from_okx(limit=missing + 2)
+            if not df.empty:
+                ts, cols = self._to_arrays(df)
+                new = ts > ring.last_ts
+                ring.append(ts[new], {col: arr[new] for col, arr in cols.items()})
+                self.stats['bars_appended'] += int(new.sum())
+            self.stats['tail_refreshes'] += 1
+
+    def get_arrays(self, symbol: str, timeframe: str, limit: int = None):
+        """
+        获取最近 limit 根 K 线的只读 numpy 视图
+
+        Returns:
+            (timestamp int64 纳秒数组, {列名: float64 数组})
+        """
+        self.refresh(symbol, timeframe, limit)
+        ring, _, lock = self._entry(symbol, timeframe)
+        with lock:
+            return ring.view(limit)
+
+    def get_frame(self, symbol: str, timeframe: str, limit: int = None) -> pd.DataFrame:
+        """
+        获取最近 limit 根 K 线的 DataFrame (列直接引用缓存的只读数组，不拷贝)
+
+        调用方可以新增列，但不能原地修改 OHLCV 列 (会抛 ValueError)，需要修改时请先 .copy()。
+        """
+        ts, cols = self.get_arrays(symbol, timeframe, limit)
+        if len(ts) == 0:
+            return pd.DataFrame()
+        index = pd.DatetimeIndex(ts.view('datetime64[ns]'), name='timestamp')
+        return pd.DataFrame(cols, index=index, copy=False)
+
+    def invalidate(self, symbol: str = None, timeframe: str = None):
+        """清空指定 (或全部) 缓存"""
+        with self._registry_lock:
+            for key, ring in self._rings.items():
+                if (symbol is None or key[0] == symbol) and (timeframe is None or key[1] == timeframe):
+                    ring.clear()
+                    self._warm_limits[key] = 0
+
+
+_GLOBAL_CACHE = None
+_GLOBAL_CACHE_LOCK = threading.Lock()
+
+
+def get_candle_cache() -> CandleCache:
+    """获取进程级共享的 K 线缓存单例"""
+    global _GLOBAL_CACHE
+    if _GLOBAL_CACHE is None:
+        with _GLOBAL_CACHE_LOCK:
+            if _GLOBAL_CACHE is None:
+                _GLOBAL_CACHE = CandleCache()
+    return _GLOBAL_CACHE
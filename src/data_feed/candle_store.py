@@ -0,0 +1,365 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author     : Zijun Deng
+@Date       : 3/8/26 10:12 PM
+@File       : candle_store.py
+@Description: 历史 K 线存储后端
+
+OKXDataLoader 的落盘层，提供两种实现：
+- SQLiteCandleStore: 兼容旧版 data/crypto_history.db，每个 {symbol}_{timeframe} 一张表
+- ColumnarCandleStore: 按 symbol/timeframe/月份 分区的列式文件 (原始 numpy 列)，
+  追加与区间读取只触碰需要的月份分区，不再整表重写
+
+列式布局:
+    data/candles/{symbol}/{timeframe}/{YYYY-MM}/timestamp.i8
+                                               /open.f8 high.f8 low.f8 close.f8 volume.f8
+timestamp 为带时区偏移的本地时间 (与 SQLite 表一致) 的 int64 纳秒。
+"""
+import os
+import re
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from src.data_feed.sqlite_pool import get_connection
+from src.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+CANDLE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class CandleStore:
+    """K 线存储接口：索引为 timestamp 的 OHLCV DataFrame 读写"""
+
+    def read(self, start=None, end=None, last_n=None) -> pd.DataFrame:
+        """
+        读取 K 线 (按时间升序)，过滤条件下推到存储层，只反序列化命中的行
+
+        Args:
+            start: 起始时间 (含)，None 表示不限
+            end: 结束时间 (含)，None 表示不限
+            last_n: 只取满足区间条件的最后 N 根，None 表示全部
+
+        Returns:
+            pd.DataFrame: 索引为 timestamp 的 OHLCV，无数据时返回空 DataFrame
+        """
+        raise NotImplementedError
+
+    def append(self, df: pd.DataFrame):
+        """追加 K 线，时间戳重复时以新数据为准"""
+        raise NotImplementedError
+
+    def replace(self, df: pd.DataFrame):
+        """用 df 整体覆盖已有数据"""
+        raise NotImplementedError
+
+
+class SQLiteCandleStore(CandleStore):
+    """
+    SQLite 存储，一个 {symbol}_{timeframe} 对应一张表
+
+    表以 timestamp 为主键 (WITHOUT ROWID，按时间聚簇)，写入走
+    INSERT ... ON CONFLICT DO UPDATE 批量 UPSERT，新增 K 线的代价只与新增行数有关。
+    旧版 to_sql 建的无主键表会在第一次写入时一次性迁移。
+    连接来自 sqlite_pool 的进程级长连接 (WAL)；read_only 时以只读方式打开，任何写入都会报错。
+    """
+
+    UPSERT_BATCH_SIZE = 5000
+
+    def __init__(self, db_path: str, table_name: str, read_only: bool = False):
+        self.db_path = db_path
+        self.table_name = table_name
+        self.read_only = read_only
+        self._schema_ready = False
+
+        updates = ', '.join(f'"{col}"=excluded."{col}"' for col in CANDLE_COLUMNS)
+        self._upsert_sql = (f'INSERT INTO "{table_name}" ("timestamp", "open", "high", "low", "close", "volume") '
+                            f'VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT("timestamp") DO UPDATE SET {updates}')
+
+    def _connect(self):
+        return get_connection(self.db_path, read_only=self.read_only)
+
+    def _check_writable(self):
+        if self.read_only:
+            raise PermissionError(f"只读模式下不能写入 {self.table_name}")
+
+    def _table_exists(self, conn) -> bool:
+        cursor = conn.cursor()
+        cursor.execute("SELECT count(name) FROM sqlite_master WHERE type='table' AND name=?", (self.table_name,))
+        return cursor.fetchone()[0] > 0
+
+    def _create_table_sql(self, table_name: str) -> str:
+        return (f'CREATE TABLE IF NOT EXISTS "{table_name}" ('
+                f'"timestamp" TIMESTAMP PRIMARY KEY, "open" REAL, "high" REAL, '
+                f'"low" REAL, "close" REAL, "volume" REAL) WITHOUT ROWID')
+
+    def _ensure_schema(self, conn):
+        """建表，或把旧版无主键表迁移为 timestamp 主键表 (重复时间戳保留最后写入的一行)"""
+        if self._schema_ready:
+            return
+        if not self._table_exists(conn):
+            conn.execute(self._create_table_sql(self.table_name))
+        else:
+            columns = conn.execute(f'PRAGMA table_info("{self.table_name}")').fetchall()
+            has_pk = any(col[1] == 'timestamp' and col[5] for col in columns)
+            if not has_pk:
+                tmp_table = f"{self.table_name}__pk"
+                logger.info(f"🛠️ [SQLite存储] 为 {self.table_name} 建立 timestamp 主键 (一次性迁移)...")
+                with conn:
+                    conn.execute(f'DROP TABLE IF EXISTS "{tmp_table}"')
+                    conn.execute(self._create_table_sql(tmp_table))
+                    conn.execute(f'INSERT OR REPLACE INTO "{tmp_table}" '
+                                 f'SELECT timestamp, open, high, low, close, volume '
+                                 f'FROM "{self.table_name}" ORDER BY rowid')
+                    conn.execute(f'DROP TABLE "{self.table_name}"')
+                    conn.execute(f'ALTER TABLE "{tmp_table}" RENAME TO "{self.table_name}"')
+        conn.commit()
+        self._schema_ready = True
+
+    def read(self, start=None, end=None, last_n=None) -> pd.DataFrame:
+        if self.read_only and not os.path.exists(self.db_path):
+            return pd.DataFrame()
+        conn = self._connect()
+        if not self._table_exists(conn):
+            return pd.DataFrame()
+
+        # 读路径不做主键迁移：旧版无主键表同样按 timestamp 过滤/排序读取，迁移留给第一次写入
+        # timestamp 主键以 'YYYY-MM-DD HH:MM:SS' 文本存储，字符串比较即时间比较，可直接走主键范围扫描
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("timestamp >= ?")
+            params.append(str(pd.Timestamp(start)))
+        if end is not None:
+            conditions.append("timestamp <= ?")
+            params.append(str(pd.Timestamp(end)))
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        if last_n is not None:
+            query = (f"SELECT * FROM (SELECT * FROM {self.table_name}{where} "
+                     f"ORDER BY timestamp DESC LIMIT ?) ORDER BY timestamp")
+            params.append(int(last_n))
+        else:
+            query = f"SELECT * FROM {self.table_name}{where} ORDER BY timestamp"
+
+        df = pd.read_sql(query, conn, params=params, index_col='timestamp', parse_dates=['timestamp'])
+        return df if not df.empty else pd.DataFrame()
+
+    def _upsert(self, conn, df: pd.DataFrame):
+        """在当前事务内按批 executemany UPSERT"""
+        ts = pd.DatetimeIndex(df.index).strftime('%Y-%m-%d %H:%M:%S')
+        values = [df[col].to_numpy(dtype=np.float64).tolist() for col in CANDLE_COLUMNS]
+        rows = list(zip(ts, *values))
+        for i in range(0, len(rows), self.UPSERT_BATCH_SIZE):
+            conn.executemany(self._upsert_sql, rows[i:i + self.UPSERT_BATCH_SIZE])
+
+    def append(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        self._check_writable()
+        conn = self._connect()
+        self._ensure_schema(conn)
+        with conn:
+            self._upsert(conn, df)
+
+    def replace(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        self._check_writable()
+        conn = self._connect()
+        self._ensure_schema(conn)
+        with conn:
+            conn.execute(f'DELETE FROM "{self.table_name}"')
+            self._upsert(conn, df)
+
+
+class ColumnarCandleStore(CandleStore):
+    """
+    按月分区的列式 K 线存储
+
+    每个分区目录下每列一个定长二进制文件，读取时用 np.memmap 零拷贝映射。
+    追加的数据若全部晚于分区末尾，直接在文件尾部追加字节；否则只重写受影响的分区。
+    """
+
+    TS_FILE = 'timestamp.i8'
+    _PARTITION_RE = re.compile(r'^\d{4}-\d{2}$')
+
+    def __init__(self, root_dir: str, symbol: str, timeframe: str):
+        self.root_dir = root_dir
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.base_dir = os.path.join(root_dir, symbol, timeframe)
+
+    # ------------------------------------------------------------------
+    # 分区工具
+    # ------------------------------------------------------------------
+    def partitions(self) -> list:
+        """返回已有的月份分区 (YYYY-MM，升序)"""
+        if not os.path.isdir(self.base_dir):
+            return []
+        return sorted(name for name in os.listdir(self.base_dir) if self._PARTITION_RE.match(name))
+
+    def _ts_path(self, part: str) -> str:
+        return os.path.join(self.base_dir, part, self.TS_FILE)
+
+    def _col_path(self, part: str, col: str) -> str:
+        return os.path.join(self.base_dir, part, f"{col}.f8")
+
+    @staticmethod
+    def _map(path: str, dtype) -> np.ndarray:
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r')
+
+    def _load_partition(self, part: str):
+        """
+        映射一个分区的全部列
+
+        Returns:
+            (timestamp数组, {列名: 数组}, 各列文件长度是否一致)
+        """
+        ts = self._map(self._ts_path(part), np.int64)
+        cols = {col: self._map(self._col_path(part, col), np.float64) for col in CANDLE_COLUMNS}
+        n = min([len(ts)] + [len(arr) for arr in cols.values()])
+        consistent = all(len(arr) == n for arr in cols.values()) and len(ts) == n
+        return ts[:n], {col: arr[:n] for col, arr in cols.items()}, consistent
+
+    @staticmethod
+    def _to_arrays(df: pd.DataFrame):
+        """DataFrame -> (按时间升序且去重的 int64 纳秒时间戳, 列数组字典)"""
+        ts = pd.DatetimeIndex(df.index).values.astype('datetime64[ns]').astype(np.int64)
+        cols = {col: df[col].to_numpy(dtype=np.float64) for col in CANDLE_COLUMNS}
+        return _sort_dedup_last(ts, cols)
+
+    @staticmethod
+    def _to_frame(ts: np.ndarray, cols: dict) -> pd.DataFrame:
+        index = pd.DatetimeIndex(np.asarray(ts, dtype=np.int64).view('datetime64[ns]'), name='timestamp')
+        return pd.DataFrame({col: np.array(cols[col]) for col in CANDLE_COLUMNS}, index=index)
+
+    # ------------------------------------------------------------------
+    # 读写
+    # ------------------------------------------------------------------
+    def read(self, start=None, end=None, last_n=None) -> pd.DataFrame:
+        parts = self.partitions()
+        start_ns = pd.Timestamp(start).value if start is not None else None
+        end_ns = pd.Timestamp(end).value if end is not None else None
+
+        # 1. 按月份裁剪分区，区间外的分区连文件都不打开
+        if start_ns is not None:
+            start_part = str(np.datetime64(start_ns, 'ns').astype('datetime64[M]'))
+            parts = [p for p in parts if p >= start_part]
+        if end_ns is not None:
+            end_part = str(np.datetime64(end_ns, 'ns').astype('datetime64[M]'))
+            parts = [p for p in parts if p <= end_part]
+
+        # 2. 分区内用 searchsorted 在 memmap 上定位行区间；last_n 从最新分区往回取，够数即停
+        ts_chunks = []
+        col_chunks = {col: [] for col in CANDLE_COLUMNS}
+        remaining = last_n
+        for part in reversed(parts):
+            if remaining is not None and remaining <= 0:
+                break
+            ts, cols, _ = self._load_partition(part)
+            lo = 0 if start_ns is None else int(np.searchsorted(ts, start_ns, side='left'))
+            hi = len(ts) if end_ns is None else int(np.searchsorted(ts, end_ns, side='right'))
+            if remaining is not None:
+                lo = max(lo, hi - remaining)
+                remaining -= hi - lo
+            if hi <= lo:
+                continue
+            ts_chunks.append(ts[lo:hi])
+            for col in CANDLE_COLUMNS:
+                col_chunks[col].append(cols[col][lo:hi])
+
+        if not ts_chunks:
+            return pd.DataFrame()
+        ts_chunks.reverse()
+        for col in CANDLE_COLUMNS:
+            col_chunks[col].reverse()
+        return self._to_frame(np.concatenate(ts_chunks),
+                              {col: np.concatenate(col_chunks[col]) for col in CANDLE_COLUMNS})
+
+    def append(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        ts, cols = self._to_arrays(df)
+
+        # 按月切段，每段只写自己的分区
+        months = ts.view('datetime64[ns]').astype('datetime64[M]')
+        bounds = np.flatnonzero(months[1:] != months[:-1]) + 1
+        starts = np.concatenate(([0], bounds))
+        ends = np.concatenate((bounds, [len(ts)]))
+        for s, e in zip(starts, ends):
+            part = str(months[s])
+            self._write_partition(part, ts[s:e], {col: arr[s:e] for col, arr in cols.items()})
+
+    def replace(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        if os.path.isdir(self.base_dir):
+            shutil.rmtree(self.base_dir)
+        self.append(df)
+
+    def _write_partition(self, part: str, ts: np.ndarray, cols: dict):
+        os.makedirs(os.path.join(self.base_dir, part), exist_ok=True)
+        old_ts, old_cols, consistent = self._load_partition(part)
+
+        if consistent and (len(old_ts) == 0 or ts[0] > old_ts[-1]):
+            # 快路径：纯尾部追加，只写新增字节
+            del old_ts, old_cols
+            with open(self._ts_path(part), 'ab') as f:
+                ts.tofile(f)
+            for col in CANDLE_COLUMNS:
+                with open(self._col_path(part, col), 'ab') as f:
+                    cols[col].tofile(f)
+            return
+
+        # 慢路径：与分区内已有数据重叠 (或上次写入中断导致列长度不一致)，仅重写本分区
+        merged_ts, merged_cols = _sort_dedup_last(
+            np.concatenate((old_ts, ts)),
+            {col: np.concatenate((old_cols[col], cols[col])) for col in CANDLE_COLUMNS}
+        )
+        del old_ts, old_cols
+        self._atomic_write(self._ts_path(part), merged_ts)
+        for col in CANDLE_COLUMNS:
+            self._atomic_write(self._col_path(part, col), merged_cols[col])
+        logger.debug(f"💾 [列式存储] 重写分区 {self.symbol}/{self.timeframe}/{part}: {len(merged_ts)} 根")
+
+    @staticmethod
+    def _atomic_write(path: str, arr: np.ndarray):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            arr.tofile(f)
+        os.replace(tmp_path, path)
+
+
+def _sort_dedup_last(ts: np.ndarray, cols: dict):
+    """按时间戳稳定排序，重复时间戳保留最后出现的一行"""
+    order = np.argsort(ts, kind='stable')
+    ts = ts[order]
+    keep = np.ones(len(ts), dtype=bool)
+    if len(ts) > 1:
+        keep[:-1] = ts[1:] != ts[:-1]
+    return ts[keep], {col: np.asarray(arr)[order][keep] for col, arr in cols.items()}
+
+
+def create_candle_store(backend: str, data_dir: str, symbol: str, timeframe: str,
+                        read_only: bool = False) -> CandleStore:
+    """
+    根据后端名称创建存储
+
+    Args:
+        backend: 'sqlite' 或 'columnar'
+        data_dir: 数据根目录 (项目 data/ 目录)
+        symbol: 交易对，如 ETH-USDT-SWAP
+        timeframe: K 线周期，如 1H
+        read_only: SQLite 后端以只读连接打开 (列式存储的读取本身不加锁，忽略该参数)
+    """
+    if backend == 'sqlite':
+        return SQLiteCandleStore(os.path.join(data_dir, 'crypto_history.db'),
+                                 f"{symbol.replace('-', '_')}_{timeframe}", read_only=read_only)
+    if backend == 'columnar':
+        return ColumnarCandleStore(os.path.join(data_dir, 'candles'), symbol, timeframe)
+    raise ValueError(f"未知的K线存储后端: {backend}")
@@ -0,0 +1,310 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author     : Zijun Deng
+@Date       : 3/9/26 9:40 PM
+@File       : okx_backfill.py
+@Description: OKX 历史 K 线异步并发回补引擎
+
+把目标时间区间切成互不重叠的窗口，多个协程并发向后翻页拉取，
+所有请求共享一个按 OKX 接口限频配置的令牌桶；每页数据直接写入 CandleStore，
+每个窗口的翻页游标在数据落盘后写入检查点文件，进程崩溃后重跑同一区间即可断点续传。
+"""
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass, asdict
+
+import aiohttp
+import pandas as pd
+
+from src.data_feed.candle_store import CandleStore
+from src.data_feed.okx_loader import candles_to_dataframe, confirmed_candles, local_to_utc_ms
+from src.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# OKX 文档: GET /api/v5/market/history-candles 限速 20 次 / 2s (按 IP)
+HISTORY_CANDLES_RATE_LIMIT = 20
+HISTORY_CANDLES_RATE_INTERVAL = 2.0
+
+BAR_SECONDS = {
+    '1m': 60,
+    '5m': 300,
+    '15m': 900,
+    '30m': 1800,
+    '1H': 3600,
+    '4H': 14400,
+    '1D': 86400
+}
+
+
+class TokenBucket:
+    """
+    异步令牌桶限频器
+
+    按 rate 个/秒 匀速补充令牌，桶容量 capacity 允许短时突发；
+    所有并发协程共享同一个实例即可保证总请求速率不超限。
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def for_history_candles(cls) -> "TokenBucket":
+        return cls(rate=HISTORY_CANDLES_RATE_LIMIT / HISTORY_CANDLES_RATE_INTERVAL,
+                   capacity=HISTORY_CANDLES_RATE_LIMIT)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self.tokens) / self.rate)
+
+    def drain(self):
+        """清空令牌 (被交易所限频时调用)，所有共享该桶的协程都要等令牌重新补充"""
+        self.tokens = 0.0
+        self.last_refill = time.monotonic()
+
+
+@dataclass
+class BackfillWindow:
+    """一个回补窗口 [start_ms, end_ms)，cursor_ms 为下一页请求的 after 参数 (UTC 毫秒)"""
+    start_ms: int
+    end_ms: int
+    cursor_ms: int
+    done: bool = False
+
+
+class OKXBackfillEngine:
+    """OKX history-candles 并发回补引擎"""
+
+    ENDPOINT = "/api/v5/market/history-candles"
+    PAGE_SIZE = 100
+    RATE_LIMIT_CODE = "50011"  # OKX 业务层限频错误码 (HTTP 200 + code=50011)
+
+    def __init__(self, symbol: str, timeframe: str, store: CandleStore,
+                 base_url: str = "https://www.okx.com",
+                 concurrency: int = 8,
+                 window_bars: int = 20_000,
+                 flush_bars: int = 1000,
+                 checkpoint_dir: str = None,
+                 limiter: TokenBucket = None,
+                 max_retries: int = 5):
+        """
+        Args:
+            symbol: 交易对，如 ETH-USDT-SWAP
+            timeframe: K 线周期，如 1m
+            store: 写入目标存储
+            base_url: OKX REST 根地址 (测试时指向本地假服务器)
+            concurrency: 并发拉取的协程数
+            window_bars: 每个窗口包含的 K 线根数
+            flush_bars: 窗口内累计多少根 K 线写一次存储并推进检查点
+            checkpoint_dir: 检查点目录，None 表示不做断点续传
+            limiter: 共享令牌桶，多个引擎同时跑时传入同一个实例
+            max_retries: 单页请求最大重试次数
+        """
+        if timeframe not in BAR_SECONDS:
+            raise IndexError(f"没有这个timeframe: {timeframe}")
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.store = store
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = concurrency
+        self.window_bars = window_bars
+        self.flush_bars = flush_bars
+        self.checkpoint_dir = checkpoint_dir
+        self.limiter = limiter or TokenBucket.for_history_candles()
+        self.max_retries = max_retries
+        self.bar_ms = BAR_SECONDS[timeframe] * 1000
+
+        self._write_lock = asyncio.Lock()
+        self._checkpoint_path = None
+        self._windows = []
+
+        self.stats = {
+            'requests': 0,
+            'retries': 0,
+            'rate_limited': 0,
+            'candles': 0,
+            'windows': 0,
+            'windows_resumed': 0,
+            'elapsed_sec': 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # 窗口与检查点
+    # ------------------------------------------------------------------
+    def _plan_windows(self, start_ms: int, end_ms: int) -> list:
+        step = self.window_bars * self.bar_ms
+        windows = []
+        ws = start_ms
+        while ws <= end_ms:
+            we = min(ws + step, end_ms + 1)
+            windows.append(BackfillWindow(start_ms=ws, end_ms=we, cursor_ms=we))
+            ws = we
+        return windows
+
+    def _load_checkpoint(self, start_ms: int, end_ms: int):
+        if not self.checkpoint_dir:
+            return None
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        self._checkpoint_path = os.path.join(
+            self.checkpoint_dir, f"{self.symbol}_{self.timeframe}_{start_ms}_{end_ms}.json")
+        if not os.path.exists(self._checkpoint_path):
+            return None
+        try:
+            with open(self._checkpoint_path, 'r') as f:
+                data = json.load(f)
+            return [BackfillWindow(**w) for w in data['windows']]
+        except Exception as e:
+            logger.warning(f"⚠️ [回补] 检查点损坏，将从头开始: {e}")
+            return None
+
+    def _save_checkpoint(self):
+        if not self._checkpoint_path:
+            return
+        tmp_path = self._checkpoint_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'symbol': self.symbol,
+                'timeframe': self.timeframe,
+                'windows': [asdict(w) for w in self._windows],
+            }, f)
+        os.replace(tmp_path, self._checkpoint_path)
+
+    # ------------------------------------------------------------------
+    # 拉取
+    # ------------------------------------------------------------------
+    async def _fetch_page(self, session: aiohttp.ClientSession, after_ms: int) -> list:
+        params = {
+            "instId": self.symbol,
+            "bar": self.timeframe,
+            "limit": str(self.PAGE_SIZE),
+            "after": str(after_ms),
+        }
+        url = f"{self.base_url}{self.ENDPOINT}"
+
+        for attempt in range(self.max_retries):
+            await self.limiter.acquire()
+            self.stats['requests'] += 1
+            try:
+                async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=15)) as resp:
+                    if resp.status == 429:
+                        self._on_rate_limited()
+                        raise RuntimeError("HTTP 429 触发限频")
+                    resp.raise_for_status()
+                    data = await resp.json(content_type=None)
+                if data.get("code") == self.RATE_LIMIT_CODE:
+                    self._on_rate_limited()
+                    raise RuntimeError(f"OKX 限频 [{self.RATE_LIMIT_CODE}]: {data.get('msg')}")
+                if data.get("code") != "0":
+                    raise RuntimeError(f"OKX 业务报错 [{data.get('code')}]: {data.get('msg')}")
+                return data.get("data", [])
+            except Exception as e:
+                self.stats['retries'] += 1
+                if attempt == self.max_retries - 1:
+                    raise
+                backoff = min(0.5 * (2 ** attempt), 8.0)
+                logger.warning(f"⚠️ [回补] 第 {attempt + 1}/{self.max_retries} 次重试 (after={after_ms}) | {e}")
+                await asyncio.sleep(backoff)
+        return []
+
+    def _on_rate_limited(self):
+        """HTTP 429 与业务码 50011 同样处理：清空共享令牌桶，让所有并发协程一起放慢，再走重试退避"""
+        self.stats['rate_limited'] += 1
+        self.limiter.drain()
+
+    async def _flush(self, window: BackfillWindow, pending: list, cursor_ms: int, done: bool):
+        """把窗口内累计的 K 线写入存储 (未收盘的 K 线不落盘)，落盘成功后再推进检查点游标"""
+        pending = confirmed_candles(pending)
+        async with self._write_lock:
+            if pending:
+                df = candles_to_dataframe(pending)
+                await asyncio.to_thread(self.store.append, df)
+                self.stats['candles'] += len(df)
+            window.cursor_ms = cursor_ms
+            window.done = done
+            self._save_checkpoint()
+
+    async def _run_window(self, session: aiohttp.ClientSession, window: BackfillWindow):
+        pending = []
+        cursor = window.cursor_ms
+        while True:
+            candles = await self._fetch_page(session, cursor)
+            if not candles:
+                await self._flush(window, pending, cursor, done=True)
+                return
+
+            # 丢弃越过窗口左边界的数据 (未收盘 K 线在 _flush 落盘前剔除)
+            pending.extend(c for c in candles if int(c[0]) >= window.start_ms)
+            cursor = int(candles[-1][0])
+            reached_start = cursor <= window.start_ms
+
+            if reached_start or len(pending) >= self.flush_bars:
+                await self._flush(window, pending, cursor, done=reached_start)
+                pending = []
+            if reached_start:
+                return
+
+    async def _worker(self, session: aiohttp.ClientSession, queue: asyncio.Queue):
+        while True:
+            try:
+                window = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await self._run_window(session, window)
+            self.stats['windows'] += 1
+
+    async def run(self, start, end) -> dict:
+        """
+        回补 [start, end] 区间的 K 线 (start/end 为与本地存储一致的本地时区时间)
+
+        Returns:
+            dict: 拉取统计
+        """
+        t0 = time.perf_counter()
+        start_ms = local_to_utc_ms(pd.Timestamp(start))
+        end_ms = local_to_utc_ms(pd.Timestamp(end))
+
+        resumed = self._load_checkpoint(start_ms, end_ms)
+        if resumed is not None:
+            self._windows = resumed
+            self.stats['windows_resumed'] = sum(1 for w in resumed if w.done)
+            logger.info(f"♻️ [回补] 从检查点恢复 {self.symbol} {self.timeframe}: "
+                        f"{self.stats['windows_resumed']}/{len(resumed)} 个窗口已完成")
+        else:
+            self._windows = self._plan_windows(start_ms, end_ms)
+            self._save_checkpoint()
+
+        queue = asyncio.Queue()
+        for window in self._windows:
+            if not window.done:
+                queue.put_nowait(window)
+
+        logger.info(f"🚀 [回补] {self.symbol} {self.timeframe} {start} -> {end} | "
+                    f"{queue.qsize()} 个窗口，并发 {self.concurrency}")
+
+        async with aiohttp.ClientSession() as session:
+            workers = [asyncio.create_task(self._worker(session, queue))
+                       for _ in range(min(self.concurrency, max(queue.qsize(), 1)))]
+            await asyncio.gather(*workers)
+
+        # 全部完成后删除检查点
+        if self._checkpoint_path and os.path.exists(self._checkpoint_path):
+            os.remove(self._checkpoint_path)
+
+        self.stats['elapsed_sec'] = time.perf_counter() - t0
+        logger.info(f"✅ [回补] {self.symbol} {self.timeframe} 完成: {self.stats['candles']} 根 K 线, "
+                    f"{self.stats['requests']} 次请求, 耗时 {self.stats['elapsed_sec']:.1f}s")
+        return self.stats
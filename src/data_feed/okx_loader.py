@@ -1,10 +1,12 @@
+import asyncio
 import os
-import sqlite3
 import time
 
+import numpy as np
 import pandas as pd
 import requests
 
+from src.data_feed.candle_store import create_candle_store
 from src.utils.log import get_logger
 
 # 确保引入你的时区配置
@@ -13,13 +15,64 @@ try:
 except ImportError:
     TIMEZONE = "+8"  # 兜底默认值
 
+try:
+    from config.loader import GLOBAL_SETTINGS
+    DEFAULT_STORAGE_BACKEND = GLOBAL_SETTINGS.get('candle_storage', {}).get('backend', 'sqlite')
+except ImportError:
+    DEFAULT_STORAGE_BACKEND = "sqlite"
+
 logger = get_logger(__name__)
 
+OKX_CANDLE_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'volCcy', 'volCcyQuote', 'confirm']
+
+
+def candles_to_dataframe(candles: list) -> pd.DataFrame:
+    """
+    OKX 原始 K 线数组 -> 以本地时区 timestamp 为索引的 OHLCV DataFrame (升序)
+
+    Args:
+        candles: OKX candles 接口返回的 data 列表
+
+    Returns:
+        pd.DataFrame: 包含 'open', 'high', 'low', 'close', 'volume' 列
+    """
+    df = pd.DataFrame(candles, columns=OKX_CANDLE_COLUMNS)
+    df = df[['timestamp', 'open', 'high', 'low', 'close', 'volume']]
+
+    for col in ['open', 'high', 'low', 'close', 'volume']:
+        df[col] = df[col].astype(float)
+
+    df['timestamp'] = pd.to_datetime(df['timestamp'].astype(int), unit='ms')
+    if "+" in TIMEZONE:
+        df['timestamp'] += pd.Timedelta(hours=int(TIMEZONE.split("+")[-1]))
+    elif "-" in TIMEZONE:
+        df['timestamp'] += pd.Timedelta(hours=int(TIMEZONE.split("-")[-1]))
+
+    df.sort_values('timestamp', ascending=True, inplace=True)
+    df.set_index('timestamp', inplace=True)
+    return df
+
+
+def confirmed_candles(candles: list) -> list:
+    """只保留已收盘的 K 线 (confirm == '1')；最新一根仍在形成中的 K 线 confirm 为 '0'，不能落盘"""
+    return [c for c in candles if c[8] == '1']
+
+
+def local_to_utc_ms(ts: pd.Timestamp) -> int:
+    """把本地时区的 naive 时间剥离时区偏移，还原为 OKX 接口使用的 UTC 毫秒时间戳"""
+    utc = pd.Timestamp(ts)
+    if "+" in TIMEZONE:
+        utc -= pd.Timedelta(hours=int(TIMEZONE.split("+")[-1]))
+    elif "-" in TIMEZONE:
+        utc += pd.Timedelta(hours=int(TIMEZONE.split("-")[-1]))
+    return int(utc.timestamp() * 1000)
+
 
 class OKXDataLoader:
     BATCH_SAVE_SIZE = 10000  # 每获取10000根K线保存一次
+    BACKFILL_THRESHOLD_BARS = 20000  # 定向拉取超过该根数时改走异步并发回补引擎
 
-    def __init__(self, symbol="ETH-USDT-SWAP", timeframe="1H", db_dir=None):
+    def __init__(self, symbol="ETH-USDT-SWAP", timeframe="1H", db_dir=None, storage_backend=None, read_only=False):
         self.symbol = symbol
         self.timeframe = timeframe
         self.base_url = "https://www.okx.com"
@@ -53,11 +106,15 @@ class OKXDataLoader:
         if not os.path.exists(db_dir):
             os.makedirs(db_dir, exist_ok=True)
 
+        self.data_dir = db_dir
         self.db_path = os.path.join(db_dir, 'crypto_history.db')
         self.table_name = f"{symbol.replace('-', '_')}_{timeframe}"
 
-    def _get_db_connection(self):
-        return sqlite3.connect(self.db_path)
+        # 存储后端: sqlite (旧版整表) / columnar (按月分区列式文件)
+        # read_only: 回测/调参等多进程只读场景，只读连接不拿写锁；拉到的新数据只在内存中使用，不落盘
+        self.storage_backend = storage_backend or DEFAULT_STORAGE_BACKEND
+        self.read_only = read_only
+        self.store = create_candle_store(self.storage_backend, db_dir, symbol, timeframe, read_only=read_only)
 
     def _get_current_local_time(self):
         """获取带有配置时区偏移的当前时间"""
@@ -68,93 +125,108 @@ class OKXDataLoader:
             now_utc -= pd.Timedelta(hours=int(TIMEZONE.split("-")[-1]))
         return now_utc
 
-    def load_local_data(self) -> pd.DataFrame:
+    def load_local_data(self, start=None, end=None, last_n=None) -> pd.DataFrame:
+        """
+        读取本地 K 线，区间/条数过滤下推到存储层 (SQLite 走 timestamp 索引，列式存储只映射命中分区)
+
+        Args:
+            start: 起始时间 (含)，None 表示不限
+            end: 结束时间 (含)，None 表示不限
+            last_n: 只取最后 N 根，None 表示全部
+
+        Returns:
+            pd.DataFrame: 索引为 timestamp 的 OHLCV 数据
+        """
         try:
-            conn = self._get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute(f"SELECT count(name) FROM sqlite_master WHERE type='table' AND name='{self.table_name}'")
-            if cursor.fetchone()[0] == 0:
-                conn.close()
-                return pd.DataFrame()
-
-            df = pd.read_sql(f"SELECT * FROM {self.table_name}", conn, index_col='timestamp', parse_dates=['timestamp'])
-            conn.close()
-            return df
+            return self.store.read(start=start, end=end, last_n=last_n)
         except Exception as e:
             logger.error(f"读取本地数据库失败: {e}")
             return pd.DataFrame()
 
     def save_local_data(self, df: pd.DataFrame):
-        if df.empty:
+        if df.empty or self.read_only:
             return
-        conn = self._get_db_connection()
-        df.to_sql(self.table_name, conn, if_exists='replace', index=True)
-        conn.close()
+        self.store.replace(df)
         logger.debug(f"💾 成功将 {len(df)} 根 K 线保存至本地数据库: [{self.table_name}]")
 
     def _append_to_local_data(self, df: pd.DataFrame):
         """
-        将新数据追加到本地数据库，合并去重
+        将新数据追加到本地存储，时间戳重复时以新数据为准
+
+        SQLite 后端按 timestamp 主键批量 UPSERT，列式后端只写入 df 覆盖到的月份分区，
+        两者的代价都只与 df 的行数有关。
 
         Args:
             df: 新的K线数据
         """
-        if df.empty:
+        if df.empty or self.read_only:
             return
 
-        # 加载现有数据
-        existing_df = self.load_local_data()
+        self.store.append(df)
+        logger.debug(f"💾 追加数据: {len(df)} 根K线 -> [{self.storage_backend}] {self.table_name}")
 
-        if existing_df.empty:
-            # 没有现有数据，直接保存
-            self.save_local_data(df)
-            logger.debug(f"💾 追加数据: 无现有数据，直接保存 {len(df)} 根K线")
-        else:
-            # 合并数据，去重，按时间排序
-            combined_df = pd.concat([existing_df, df])
-            combined_df = combined_df[~combined_df.index.duplicated(keep='last')]
-            combined_df = combined_df.sort_index(ascending=True)
-
-            # 保存合并后的数据
-            self.save_local_data(combined_df)
-            logger.debug(f"💾 追加数据: 合并现有 {len(existing_df)} 根和新 {len(df)} 根，去重后 {len(combined_df)} 根K线")
     def _save_candles_batch(self, candles_batch: list):
         """
-        保存一批原始蜡烛数据到本地数据库
+        保存一批原始蜡烛数据到本地数据库 (未收盘的 K 线不落盘)
 
         Args:
             candles_batch: 原始蜡烛数据列表
         """
+        candles_batch = confirmed_candles(candles_batch)
         if not candles_batch:
             return
 
         # 转换为DataFrame
-        df = pd.DataFrame(candles_batch,
-                          columns=['timestamp', 'open', 'high', 'low', 'close', 'volume', 'volCcy', 'volCcyQuote',
-                                   'confirm'])
-        df = df[['timestamp', 'open', 'high', 'low', 'close', 'volume']]
-
-        for col in ['open', 'high', 'low', 'close', 'volume']:
-            df[col] = df[col].astype(float)
-
-        df['timestamp'] = pd.to_datetime(df['timestamp'].astype(int), unit='ms')
-        if "+" in TIMEZONE:
-            df['timestamp'] += pd.Timedelta(hours=int(TIMEZONE.split("+")[-1]))
-        elif "-" in TIMEZONE:
-            df['timestamp'] += pd.Timedelta(hours=int(TIMEZONE.split("-")[-1]))
-
-        df.sort_values('timestamp', ascending=True, inplace=True)
-        df.set_index('timestamp', inplace=True)
+        df = candles_to_dataframe(candles_batch)
 
         # 追加到本地数据库
         self._append_to_local_data(df)
         logger.debug(f"💾 保存批次数据: {len(candles_batch)} 根蜡烛，时间范围 {df.index[0]} -> {df.index[-1]}")
 
+    def _request_candles_page(self, after_ts=None, limit=100, max_retries=10, progress=""):
+        """
+        请求一页 history-candles (最多 100 根，按时间倒序)，失败自动重建会话重试
+
+        Args:
+            after_ts: 只返回早于该 UTC 毫秒时间戳 (不含) 的 K 线，None 表示从最新开始
+            limit: 本页条数
+            max_retries: 最大重试次数
+            progress: 重试日志里附带的进度描述
+
+        Returns:
+            list | None: 原始 K 线列表 (无更多数据时为空列表)，重试耗尽返回 None
+        """
+        url = f"{self.base_url}/api/v5/market/history-candles"
+        params = {
+            "instId": self.symbol,
+            "bar": self.okx_bar,
+            "limit": limit
+        }
+        if after_ts:
+            params["after"] = after_ts
+
+        for attempt in range(max_retries):
+            try:
+                response = self.session.get(url, params=params, timeout=15)
+                response.raise_for_status()
+                data = response.json()
+
+                if data.get("code") != "0":
+                    raise ValueError(f"OKX 业务报错: {data.get('msg')}")
+
+                return data.get("data", [])
+
+            except Exception as e:
+                logger.warning(
+                    f"网络颠簸 {progress}| 第 {attempt + 1}/{max_retries} 次重试... 报错: {e}")
+                self.session.close()
+                self.session = requests.Session()
+                sleep_time = 3 + (attempt * 2)
+                time.sleep(sleep_time)
+        return None
+
     def fetch_from_okx(self, limit=100, after_ts=None, max_retries=10) -> pd.DataFrame:
         """原生调用 OKX V5 接口拉取历史 K 线 (自动分批防封版)"""
-        endpoint = "/api/v5/market/history-candles"
-        url = f"{self.base_url}{endpoint}"
-
         all_candles = []
         batch_candles = []
         current_after = after_ts
@@ -164,58 +236,25 @@ class OKXDataLoader:
 
         while len(all_candles) < limit:
             fetch_size = min(100, limit - len(all_candles))
-            params = {
-                "instId": self.symbol,
-                "bar": self.okx_bar,
-                "limit": fetch_size
-            }
-            if current_after:
-                params["after"] = current_after
-
-            candles = []
-            success = False
-
-            for attempt in range(max_retries):
-                try:
-                    response = self.session.get(url, params=params, timeout=15)
-                    response.raise_for_status()
-                    data = response.json()
-
-                    if data.get("code") != "0":
-                        raise ValueError(f"OKX 业务报错: {data.get('msg')}")
-
-                    candles = data.get("data", [])
-                    if not candles:
-                        success = True
-                        break
-
-                    all_candles.extend(candles)
-                    batch_candles.extend(candles)
-                    current_after = candles[-1][0]
-                    success = True
-
-                    # 检查批次大小，如果达到阈值则保存
-                    if len(batch_candles) >= self.BATCH_SAVE_SIZE:
-                        self._save_candles_batch(batch_candles)
-                        batch_candles = []
-
-                    if len(all_candles) % 10000 == 0 or len(all_candles) == limit:
-                        logger.info(f"拉取进度: {len(all_candles)} / {limit} ...")
+            candles = self._request_candles_page(current_after, fetch_size, max_retries,
+                                                 progress=f"(进度 {len(all_candles)}/{limit}) ")
 
-                    break
-
-                except Exception as e:
-                    logger.warning(
-                        f"网络颠簸 (进度 {len(all_candles)}/{limit}) | 第 {attempt + 1}/{max_retries} 次重试... 报错: {e}")
-                    self.session.close()
-                    self.session = requests.Session()
-                    sleep_time = 3 + (attempt * 2)
-                    time.sleep(sleep_time)
-
-            if not success or not candles:
+            if not candles:
                 logger.error(f"严重网络故障或无更多数据。停止拉取！将返回已成功获取的 {len(all_candles)} 根数据。")
                 break
 
+            all_candles.extend(candles)
+            batch_candles.extend(candles)
+            current_after = candles[-1][0]
+
+            # 检查批次大小，如果达到阈值则保存
+            if len(batch_candles) >= self.BATCH_SAVE_SIZE:
+                self._save_candles_batch(batch_candles)
+                batch_candles = []
+
+            if len(all_candles) % 10000 == 0 or len(all_candles) == limit:
+                logger.info(f"拉取进度: {len(all_candles)} / {limit} ...")
+
             if len(all_candles) > 0 and len(all_candles) % batch_size_threshold == 0:
                 logger.info(f"🟢 已完成一个大批次 ({len(all_candles)}根)，强制休眠 3 秒，防封锁...")
                 time.sleep(3)
@@ -230,22 +269,7 @@ class OKXDataLoader:
         if not all_candles:
             return pd.DataFrame()
 
-        df = pd.DataFrame(all_candles,
-                          columns=['timestamp', 'open', 'high', 'low', 'close', 'volume', 'volCcy', 'volCcyQuote',
-                                   'confirm'])
-        df = df[['timestamp', 'open', 'high', 'low', 'close', 'volume']]
-
-        for col in ['open', 'high', 'low', 'close', 'volume']:
-            df[col] = df[col].astype(float)
-
-        df['timestamp'] = pd.to_datetime(df['timestamp'].astype(int), unit='ms')
-        if "+" in TIMEZONE:
-            df['timestamp'] += pd.Timedelta(hours=int(TIMEZONE.split("+")[-1]))
-        elif "-" in TIMEZONE:
-            df['timestamp'] += pd.Timedelta(hours=int(TIMEZONE.split("-")[-1]))
-
-        df.sort_values('timestamp', ascending=True, inplace=True)
-        df.set_index('timestamp', inplace=True)
+        df = candles_to_dataframe(all_candles)
 
         current_time = self._get_current_local_time()
         if not df.empty and (current_time - df.index[-1]).total_seconds() < self._get_seconds(self.timeframe):
@@ -259,12 +283,13 @@ class OKXDataLoader:
         这是原 fetch_historical_data 的核心逻辑，但不包含日期范围过滤
         """
         logger.debug(f"🔍 准备加载 {self.symbol} ({self.timeframe}) 数据...")
-        local_df = self.load_local_data()
+        # 只读最后 limit 根：本地不足 limit 根时读到的就是全部数据，步骤 2 的向左追溯逻辑不受影响
+        local_df = self.load_local_data(last_n=limit)
 
         if local_df.empty:
             logger.info(f"⚠️ 本地无数据，将从 OKX 全量拉取 {limit} 根...")
+            # fetch_from_okx 在拉取过程中已按批次落盘，无需再整体写入
             final_df = self.fetch_from_okx(limit=limit)
-            self.save_local_data(final_df)
             return final_df.tail(limit)
 
         local_count = len(local_df)
@@ -326,29 +351,21 @@ class OKXDataLoader:
         # =======================================
         missing_intervals = self._detect_missing_intervals(combined_df)
         if missing_intervals:
-            logger.debug(f"🔍 检测到 {len(missing_intervals)} 个缺失区间，开始补全...")
-            filled_dfs = []
-            for i, (start_time, end_time) in enumerate(missing_intervals):
-                logger.debug(f"  补全区间 {i+1}: {start_time} -> {end_time}")
-                filled_df = self._fill_missing_interval(start_time, end_time)
-                if not filled_df.empty:
-                    filled_dfs.append(filled_df)
-
-            if filled_dfs:
-                # 合并所有补全的数据
-                filled_combined = pd.concat(filled_dfs)
+            logger.debug(f"🔍 检测到 {len(missing_intervals)} 个缺失区间，开始合并补全...")
+            filled_df = self._fill_missing_intervals(missing_intervals)
+
+            if not filled_df.empty:
                 # 合并到主数据集
-                combined_df = pd.concat([combined_df, filled_combined])
+                combined_df = pd.concat([combined_df, filled_df])
                 combined_df = combined_df[~combined_df.index.duplicated(keep='last')]
                 combined_df = combined_df.sort_index(ascending=True)
-                logger.debug(f"✅ 成功补全 {len(filled_dfs)} 个缺失区间，新增 {len(filled_combined)} 根K线")
+                logger.debug(f"✅ 成功补全缺失区间，新增 {len(filled_df)} 根K线")
 
         # =======================================
-        # 步骤 4: 保存至本地数据库并返回
+        # 步骤 4: 返回
         # =======================================
-        # 将最终数据保存到本地数据库（增量追加）
-        self._append_to_local_data(combined_df)
-
+        # 以上每次 fetch_from_okx 拉到的数据都已按批次追加进本地存储，
+        # 这里不再把合并后的全量数据重写一遍
         return combined_df.tail(limit)
 
     def fetch_historical_data(self, limit=50000) -> pd.DataFrame:
@@ -396,20 +413,16 @@ class OKXDataLoader:
         if isinstance(end_date, str):
             end_date = pd.Timestamp(end_date)
 
-        # 1. 首先加载本地数据
-        local_df = self.load_local_data()
+        # 1. 首先加载本地数据 (只读目标区间)
+        local_in_range = self.load_local_data(start=start_date, end=end_date)
 
-        if not local_df.empty:
-            mask = (local_df.index >= start_date) & (local_df.index <= end_date)
-            local_in_range = local_df[mask]
-
-            if len(local_in_range) > 0:
-                expected_bars = self._calculate_bars_needed(start_date, end_date)
-                # 容错 5% 的缺失，如果够了直接返回
-                if len(local_in_range) >= expected_bars * 0.95:
-                    logger.debug(
-                        f"✅ 本地数据库已覆盖 {start_date.date()} 到 {end_date.date()}，共 {len(local_in_range)} 根")
-                    return local_in_range
+        if not local_in_range.empty:
+            expected_bars = self._calculate_bars_needed(start_date, end_date)
+            # 容错 5% 的缺失，如果够了直接返回
+            if len(local_in_range) >= expected_bars * 0.95:
+                logger.debug(
+                    f"✅ 本地数据库已覆盖 {start_date.date()} 到 {end_date.date()}，共 {len(local_in_range)} 根")
+                return local_in_range
 
         # 2. 本地数据不足，进行精准【定向拉取】
         bars_needed = self._calculate_bars_needed(start_date, end_date)
@@ -419,6 +432,15 @@ class OKXDataLoader:
         buffer_bars = int(bars_needed * 1.05) + 10  # 只需要 5% 的极小缓冲
         logger.debug(f"🔄 准备【定向拉取】约 {buffer_bars} 根 K 线 (目标区间: {start_date.date()} -> {end_date.date()})")
 
+        # 大区间 (如 1m 多年回测) 走并发回补引擎，直接写入本地存储后按区间读回
+        if bars_needed > self.BACKFILL_THRESHOLD_BARS and not self.read_only and not self._in_event_loop():
+            try:
+                self.backfill(start_date, end_date)
+            except Exception as e:
+                # 已完成的窗口已落盘并记入检查点，下次调用会续传；这里返回已有的部分数据
+                logger.error(f"❌ 并发回补中断: {e}，返回本地已有的 {start_date.date()} -> {end_date.date()} 数据")
+            return self.load_local_data(start=start_date, end=end_date)
+
         # 核心修复：把 end_date 转换为 OKX 认识的 UTC 毫秒时间戳，作为拉取起点！
         end_utc = end_date
         if "+" in TIMEZONE:
@@ -436,19 +458,14 @@ class OKXDataLoader:
             logger.error("❌ 定向拉取数据失败，请检查网络或 OKX 接口状态。")
             return pd.DataFrame()
 
-        # 3. 将新拉取的数据合并进本地数据库并持久化
-        if not local_df.empty:
-            combined_df = pd.concat([local_df, fetched_df])
-            combined_df = combined_df[~combined_df.index.duplicated(keep='last')]
-            combined_df = combined_df.sort_index(ascending=True)
+        # 3. 新拉取的数据已由 fetch_from_okx 按批次追加进本地存储，
+        # 4. 直接按区间从存储层再读一次即可拿到合并去重后的结果 (只读模式没有落盘，在内存中合并)
+        if self.read_only:
+            result_df = pd.concat([local_in_range, fetched_df])
+            result_df = result_df[~result_df.index.duplicated(keep='last')].sort_index(ascending=True)
+            result_df = result_df[(result_df.index >= start_date) & (result_df.index <= end_date)]
         else:
-            combined_df = fetched_df
-
-        self.save_local_data(combined_df)
-
-        # 4. 再次切片返回
-        mask = (combined_df.index >= start_date) & (combined_df.index <= end_date)
-        result_df = combined_df[mask]
+            result_df = self.load_local_data(start=start_date, end=end_date)
 
         if not result_df.empty:
             logger.debug(
@@ -456,9 +473,39 @@ class OKXDataLoader:
 
         return result_df
 
+    @staticmethod
+    def _in_event_loop() -> bool:
+        try:
+            asyncio.get_running_loop()
+            return True
+        except RuntimeError:
+            return False
+
+    def backfill(self, start_date, end_date, concurrency: int = 8) -> dict:
+        """
+        并发回补 [start_date, end_date] 区间的历史 K 线到本地存储 (同步入口)
+
+        在令牌桶限频下多窗口并发拉取，支持断点续传；不能在已运行的事件循环里调用，
+        协程环境请直接 await OKXBackfillEngine.run()。
+
+        Returns:
+            dict: 回补统计
+        """
+        from src.data_feed.okx_backfill import OKXBackfillEngine
+
+        engine = OKXBackfillEngine(
+            symbol=self.symbol,
+            timeframe=self.timeframe,
+            store=self.store,
+            base_url=self.base_url,
+            concurrency=concurrency,
+            checkpoint_dir=os.path.join(self.data_dir, 'backfill_checkpoints'),
+        )
+        return asyncio.run(engine.run(start_date, end_date))
+
     def _detect_missing_intervals(self, df: pd.DataFrame) -> list:
         """
-        检测时间序列中的缺失区间
+        检测时间序列中的缺失区间 (对 int64 时间戳做 numpy diff，一次性找出全部缺口)
 
         Args:
             df: 本地加载的K线数据，索引为timestamp
@@ -469,68 +516,93 @@ class OKXDataLoader:
         if df.empty or len(df) < 2:
             return []
 
-        # 确保按时间排序
-        df = df.sort_index(ascending=True)
-
-        # 计算理论时间间隔（秒）
-        interval_seconds = self._get_seconds(self.timeframe)
-
-        missing_intervals = []
-
-        # 遍历相邻行，检测缺失
-        for i in range(len(df) - 1):
-            current_time = df.index[i]
-            next_time = df.index[i + 1]
+        ts = np.sort(pd.DatetimeIndex(df.index).values.astype('datetime64[ns]').astype(np.int64))
+        interval_ns = self._get_seconds(self.timeframe) * 1_000_000_000
 
-            # 计算实际时间差
-            time_diff = (next_time - current_time).total_seconds()
-
-            # 允许10%的容差（考虑数据可能略有偏差）
-            if time_diff > interval_seconds * 1.1:
-                # 计算缺失的条数
-                missing_bars = int(time_diff // interval_seconds) - 1
-                if missing_bars > 0:
-                    # 计算缺失区间的开始和结束时间
-                    gap_start = current_time + pd.Timedelta(seconds=interval_seconds)
-                    gap_end = next_time - pd.Timedelta(seconds=interval_seconds)
-                    missing_intervals.append((gap_start, gap_end))
+        diffs = np.diff(ts)
+        # 允许10%的容差（考虑数据可能略有偏差），且至少缺一整根
+        gap_idx = np.flatnonzero((diffs > interval_ns * 1.1) & (diffs // interval_ns - 1 > 0))
+        if len(gap_idx) == 0:
+            return []
 
-        return missing_intervals
+        gap_starts = pd.DatetimeIndex((ts[gap_idx] + interval_ns).view('datetime64[ns]'))
+        gap_ends = pd.DatetimeIndex((ts[gap_idx + 1] - interval_ns).view('datetime64[ns]'))
+        return list(zip(gap_starts, gap_ends))
 
-    def _fill_missing_interval(self, start_time, end_time) -> pd.DataFrame:
+    def _fill_missing_intervals(self, intervals: list, max_retries=10) -> pd.DataFrame:
         """
-        填充指定时间区间的缺失数据
+        合并补全多个缺失区间
+
+        从最新的缺口开始向前翻页：每页 100 根会顺带覆盖落在它范围内的其它缺口，
+        相邻的小缺口因此共享同一次请求；缺口之间相距超过一页时才跳到下一个缺口重新定位。
+        某个缺口请求失败 (或没有更早数据) 时只放弃该缺口，其余缺口照常补全。
+        全部补回的 K 线最后一次性批量写入本地存储。
 
         Args:
-            start_time: 缺失区间开始时间
-            end_time: 缺失区间结束时间
+            intervals: _detect_missing_intervals 返回的 (start_time, end_time) 列表
 
         Returns:
-            pd.DataFrame: 填充的数据
+            pd.DataFrame: 落在缺失区间内的补全数据
         """
-        # 计算需要多少根K线
-        interval_seconds = self._get_seconds(self.timeframe)
-        total_seconds = (end_time - start_time).total_seconds()
-        bars_needed = int(total_seconds // interval_seconds) + 1
+        if not intervals:
+            return pd.DataFrame()
 
-        logger.debug(f"🔄 准备填充缺失区间: {start_time} -> {end_time}, 约{bars_needed}根K线")
+        # 缺口边界转成 UTC 毫秒，按结束时间倒序处理
+        gaps = sorted(((local_to_utc_ms(start), local_to_utc_ms(end)) for start, end in intervals),
+                      key=lambda g: g[1], reverse=True)
 
-        # 将结束时间转换为OKX API需要的UTC毫秒时间戳
-        end_utc = end_time
-        if "+" in TIMEZONE:
-            end_utc -= pd.Timedelta(hours=int(TIMEZONE.split("+")[-1]))
-        elif "-" in TIMEZONE:
-            end_utc += pd.Timedelta(hours=int(TIMEZONE.split("-")[-1]))
+        all_candles = []
+        pages = 0
+        i = 0
+        while i < len(gaps):
+            # 定位到当前缺口的右端，往前翻页直到越过该缺口左端
+            after = gaps[i][1] + 1
+            while True:
+                candles = self._request_candles_page(after, 100, max_retries, progress=f"(补缺口 {i + 1}/{len(gaps)}) ")
+                pages += 1
+                if not candles:
+                    break
+                all_candles.extend(candles)
+                oldest = int(candles[-1][0])
+                if oldest <= gaps[i][0]:
+                    break
+                after = oldest
+                time.sleep(0.15)
 
-        # 加上1000毫秒冗余
-        end_ts_ms = str(int(end_utc.timestamp() * 1000) + 1000)
+            if not candles:
+                # 只放弃当前缺口 (已拉到的部分保留)，下一个缺口重新定位
+                logger.warning(f"⚠️ 缺口 {i + 1}/{len(gaps)} 补全失败，跳过该缺口")
+                i += 1
+                time.sleep(0.15)
+                continue
+
+            # 跳过所有已被这几页覆盖到的缺口
+            while i < len(gaps) and gaps[i][0] >= oldest:
+                i += 1
+            # 部分覆盖的缺口：下一轮从已拉到的最老一根 (不含) 继续往前
+            if i < len(gaps) and gaps[i][1] >= oldest > gaps[i][0]:
+                gaps[i] = (gaps[i][0], oldest - 1)
+            time.sleep(0.15)
 
-        # 获取缺失数据
-        missing_df = self.fetch_from_okx(limit=bars_needed + 10, after_ts=end_ts_ms)
+        logger.debug(f"🔄 {len(intervals)} 个缺失区间合并为 {pages} 次分页请求")
+        if not all_candles:
+            return pd.DataFrame()
 
-        # 过滤出指定区间内的数据
-        mask = (missing_df.index >= start_time) & (missing_df.index <= end_time)
-        return missing_df[mask]
+        fetched_df = candles_to_dataframe(all_candles)
+        fetched_df = fetched_df[~fetched_df.index.duplicated(keep='last')]
+
+        # 只保留落在缺口内的 K 线 (searchsorted 一次性判定)
+        ts = fetched_df.index.values.astype('datetime64[ns]').astype(np.int64)
+        starts = np.array([pd.Timestamp(s).value for s, _ in intervals], dtype=np.int64)
+        ends = np.array([pd.Timestamp(e).value for _, e in intervals], dtype=np.int64)
+        order = np.argsort(starts)
+        starts, ends = starts[order], ends[order]
+        pos = np.searchsorted(starts, ts, side='right') - 1
+        in_gap = (pos >= 0) & (ts <= ends[np.clip(pos, 0, None)])
+        filled_df = fetched_df[in_gap]
+
+        self._append_to_local_data(filled_df)
+        return filled_df
 
     def fetch_data_by_hours(self, hours: int) -> pd.DataFrame:
         """
@@ -3,6 +3,9 @@ import json
 
 import websockets
 
+from src.data_feed.okx_trade_decoder import OKXTradeDecoder
+from src.data_feed.trade_aggregator import aggregate_fills, aggregation_enabled
+from src.data_feed.trade_tape import get_trade_tape_recorder
 from src.utils.log import get_logger
 
 logger = get_logger(__name__)
@@ -14,6 +17,12 @@ class OKXTickStreamer:
         self.on_tick_callback = on_tick_callback  # 核心：通过回调把数据抛给策略大脑
         # 使用 AWS 专线域名，在东京节点极其稳定
         self.ws_url = "wss://ws.okx.com:8443/ws/v5/public"
+        # 逐笔成交磁带：每帧只入队一次，解析与落盘在后台线程
+        self.tape_recorder = get_trade_tape_recorder()
+        # 成交帧解码器：WS 原文直接解码为列式数组，不逐笔构造中间字典
+        self.trade_decoder = OKXTradeDecoder(symbol)
+        # 同价成交聚合 (settings.yaml: trade_aggregation.okx_stream)
+        self.aggregate_fills = aggregation_enabled('okx_stream')
 
     async def connect(self):
         """建立 WebSocket 连接，保持心跳与断线重连"""
@@ -31,17 +40,29 @@ class OKXTickStreamer:
 
                     while True:
                         response = await ws.recv()
-                        data = json.loads(response)
+                        ticks = self.trade_decoder.decode(response)
+                        if ticks is None:
+                            continue
+
+                        if self.tape_recorder is not None:
+                            self.tape_recorder.record(self.symbol, ticks)
 
                         # 如果包含交易数据，且上层注册了回调函数
-                        if 'data' in data and self.on_tick_callback:
-                            for trade in data['data']:
+                        if self.on_tick_callback:
+                            if self.aggregate_fills:
+                                ticks = aggregate_fills(ticks)
+                                fills = ticks['fills'].tolist()
+                            else:
+                                fills = [1] * len(ticks)
+                            for ts, px, sz, side, n_fills in zip(ticks['ts'].tolist(), ticks['px'].tolist(),
+                                                                 ticks['sz'].tolist(), ticks['side'].tolist(), fills):
                                 # 提纯数据：只保留我们算法需要的 4 个核心字段
                                 tick_clean = {
-                                    'price': float(trade['px']),
-                                    'size': float(trade['sz']),
-                                    'side': trade['side'],
-                                    'ts': float(trade['ts']) / 1000.0  # 转为秒级时间戳
+                                    'price': px,
+                                    'size': sz,
+                                    'side': 'buy' if side == 1 else 'sell',
+                                    'ts': ts / 1000.0,  # 转为秒级时间戳
+                                    'fills': n_fills  # 同价聚合前的成交笔数
                                 }
                                 # 将干净的字典抛给 Engine3Commander 的 on_tick 函数
                                 await self.on_tick_callback(tick_clean)
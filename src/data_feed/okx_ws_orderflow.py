@@ -10,6 +10,7 @@ import sys
 import time
 from collections import deque
 
+import numpy as np
 import websockets
 
 # 添加项目根目录到 Python 路径
@@ -18,6 +19,8 @@ project_root = os.path.dirname(os.path.dirname(os.path.dirname(current_file)))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
+from src.data_feed.okx_trade_decoder import OKXTradeDecoder
+from src.data_feed.trade_aggregator import aggregate_fills, aggregation_enabled
 from src.utils.log import get_logger
 from src.utils.email_sender import send_trading_signal_email
 
@@ -33,6 +36,11 @@ class OrderFlowSniper:
         # 使用 AWS 专线域名，在东京节点极其稳定
         self.ws_url = "wss://ws.okx.com:8443/ws/v5/public"
 
+        # 成交帧解码器：WS 原文直接解码为列式数组
+        self.trade_decoder = OKXTradeDecoder(symbol)
+        # 同价成交聚合 (settings.yaml: trade_aggregation.orderflow_sniper)
+        self.aggregate_fills = aggregation_enabled('orderflow_sniper')
+
         # 实时状态
         self.cvd = 0.0
         self.current_price = 0.0
@@ -83,28 +91,28 @@ class OrderFlowSniper:
 
                     while True:
                         response = await ws.recv()
-                        data = json.loads(response)
+                        ticks = self.trade_decoder.decode(response)
 
-                        if 'data' in data:
-                            self._process_ticks(data['data'])
+                        if ticks is not None:
+                            self._process_ticks(aggregate_fills(ticks) if self.aggregate_fills else ticks)
 
             except Exception as e:
                 logger.error(f"❌ 链路断开，准备重连: {e}")
                 await asyncio.sleep(3)
 
-    def _process_ticks(self, trades):
+    def _process_ticks(self, ticks):
+        """
+        Args:
+            ticks: 一个 WS 帧的成交 (TRADE_TAPE_DTYPE 数组，side 1=买入)
+        """
         current_ts = time.time()
 
-        for trade in trades:
-            self.current_price = float(trade['px'])
-            size = float(trade['sz'])
-            side = trade['side']
+        if len(ticks):
+            self.current_price = float(ticks['px'][-1])
 
-            # CVD 核心累计 (买入增加，卖出减少)
-            if side == 'buy':
-                self.cvd += size
-            else:
-                self.cvd -= size
+            # CVD 核心累计 (买入增加，卖出减少)，逐笔累加保持与原累计顺序一致
+            for signed_size in np.where(ticks['side'] == 1, ticks['sz'], -ticks['sz']).tolist():
+                self.cvd += signed_size
 
         # 1. 科考船功能：动态更新反弹高点并归档 CSV
         self._update_trackings(current_ts)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author     : Zijun Deng
+@Date       : 3/10/26 8:25 PM
+@File       : resampler.py
+@Description: 从单一 1m 基础序列派生高周期 K 线
+
+每个交易对只维护一条 1m 基础序列 (只有它走 REST 和本地存储)，5m/15m/1H/4H/1D
+全部在本地聚合得到：open 取首根、high 取最大、low 取最小、close 取末根、volume 求和。
+桶按本地时区 (与存储一致) 对齐，UTC+8 下与 OKX 原生 K 线的切分完全一致。
+只输出已收盘的桶；CandleResampler 缓存各周期结果，新数据进来时只聚合新的桶。
+"""
+import numpy as np
+import pandas as pd
+
+from src.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+TIMEFRAME_SECONDS = {
+    '1m': 60,
+    '5m': 300,
+    '15m': 900,
+    '30m': 1800,
+    '1H': 3600,
+    '4H': 14400,
+    '1D': 86400
+}
+
+CANDLE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+def _aggregate(ts: np.ndarray, cols: dict, tf_ns: int):
+    """
+    按桶聚合 (ts 已升序)
+
+    Returns:
+        (桶起始时间数组, {列名: 聚合结果})
+    """
+    buckets = ts - ts % tf_ns
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    ends = np.concatenate((starts[1:], [len(ts)])) - 1
+    return buckets[starts], {
+        'open': cols['open'][starts],
+        'high': np.maximum.reduceat(cols['high'], starts),
+        'low': np.minimum.reduceat(cols['low'], starts),
+        'close': cols['close'][ends],
+        'volume': np.add.reduceat(cols['volume'], starts),
+    }
+
+
+def resample_candles(df: pd.DataFrame, timeframe: str, base_timeframe: str = '1m',
+                     drop_partial_head: bool = True) -> pd.DataFrame:
+    """
+    把基础周期 K 线聚合为 timeframe 周期，只保留已收盘的桶
+
+    末尾尚未走完的桶总会被丢弃；drop_partial_head 时开头不从桶起点开始的残缺桶也会被丢弃。
+
+    Args:
+        df: 基础周期 OHLCV，索引为 timestamp
+        timeframe: 目标周期，如 '15m'
+        base_timeframe: df 的周期
+        drop_partial_head: 是否丢弃开头的残缺桶 (增量续算时调用方已保证从桶起点开始)
+
+    Returns:
+        pd.DataFrame: 目标周期 OHLCV
+    """
+    if df.empty:
+        return pd.DataFrame()
+    tf_ns = TIMEFRAME_SECONDS[timeframe] * 1_000_000_000
+    base_ns = TIMEFRAME_SECONDS[base_timeframe] * 1_000_000_000
+
+    ts = pd.DatetimeIndex(df.index).values.astype('datetime64[ns]').astype(np.int64)
+    cols = {col: df[col].to_numpy(dtype=np.float64) for col in CANDLE_COLUMNS}
+    bucket_ts, agg = _aggregate(ts, cols, tf_ns)
+
+    keep = np.ones(len(bucket_ts), dtype=bool)
+    if drop_partial_head and ts[0] != bucket_ts[0]:
+        keep[0] = False  # 开头残缺桶
+    if ts[-1] < bucket_ts[-1] + tf_ns - base_ns:
+        keep[-1] = False  # 末尾未收盘的桶
+
+    index = pd.DatetimeIndex(bucket_ts[keep].view('datetime64[ns]'), name='timestamp')
+    return pd.DataFrame({col: agg[col][keep] for col in CANDLE_COLUMNS}, index=index)
+
+
+class CandleResampler:
+    """
+    带缓存的增量多周期派生器
+
+    update() 喂入最新的基础周期 K 线 (可以与之前的数据重叠)，每个目标周期只聚合
+    自己尚未收盘的那个桶及之后的数据；get() 直接返回缓存好的已收盘 K 线。
+    """
+
+    def __init__(self, timeframes: list, base_timeframe: str = '1m', max_bars: int = 5000):
+        """
+        Args:
+            timeframes: 需要派生的周期列表
+            base_timeframe: 基础周期
+            max_bars: 每个周期缓存的最大根数
+        """
+        for tf in timeframes:
+            if TIMEFRAME_SECONDS[tf] % TIMEFRAME_SECONDS[base_timeframe] != 0:
+                raise ValueError(f"{tf} 不能由 {base_timeframe} 整数倍聚合得到")
+        self.timeframes = list(timeframes)
+        self.base_timeframe = base_timeframe
+        self.max_bars = max_bars
+
+        self._frames = {tf: pd.DataFrame() for tf in self.timeframes}
+        self._next_bucket = {tf: None for tf in self.timeframes}  # 第一个未收盘桶的起点 (ns)
+
+        self.stats = {
+            'updates': 0,
+            'base_rows_aggregated': 0,
+            'bars_emitted': 0,
+        }
+
+    def bars_needed(self, limits: dict) -> int:
+        """各周期需要 limits[tf] 根时，基础序列至少要多少根 (多留一个桶吸收开头残缺)"""
+        base_sec = TIMEFRAME_SECONDS[self.base_timeframe]
+        return max((limits.get(tf, 0) + 1) * TIMEFRAME_SECONDS[tf] // base_sec for tf in self.timeframes)
+
+    def update(self, base_df: pd.DataFrame):
+        """喂入基础周期 K 线，增量刷新各周期缓存"""
+        if base_df is None or base_df.empty:
+            return
+        self.stats['updates'] += 1
+        ts = pd.DatetimeIndex(base_df.index).values.astype('datetime64[ns]').astype(np.int64)
+
+        for tf in self.timeframes:
+            next_bucket = self._next_bucket[tf]
+            lo = 0 if next_bucket is None else int(np.searchsorted(ts, next_bucket, side='left'))
+            if lo >= len(ts):
+                continue
+
+            new_bars = resample_candles(base_df.iloc[lo:], tf, self.base_timeframe,
+                                        drop_partial_head=next_bucket is None)
+            self.stats['base_rows_aggregated'] += len(ts) - lo
+            if new_bars.empty:
+                continue
+
+            frame = self._frames[tf]
+            if not frame.empty:
+                new_bars = new_bars[new_bars.index > frame.index[-1]]
+                frame = pd.concat([frame, new_bars])
+            else:
+                frame = new_bars
+            self._frames[tf] = frame.iloc[-self.max_bars:]
+            self._next_bucket[tf] = frame.index[-1].value + TIMEFRAME_SECONDS[tf] * 1_000_000_000
+            self.stats['bars_emitted'] += len(new_bars)
+
+    def get(self, timeframe: str, limit: int = None) -> pd.DataFrame:
+        """返回缓存的已收盘 K 线 (最后 limit 根)"""
+        frame = self._frames[timeframe]
+        return frame if limit is None else frame.iloc[-limit:]
+
+    def reset(self):
+        for tf in self.timeframes:
+            self._frames[tf] = pd.DataFrame()
+            self._next_bucket[tf] = None
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author     : Zijun Deng
+@Date       : 3/12/26 10:30 PM
+@File       : sqlite_pool.py
+@Description: crypto_history.db 的 SQLite 连接管理
+
+main.py 下的多个引擎子进程、回测脚本和 Optuna 调参会同时读写同一个库，这里统一：
+- 写连接开启 WAL：读者不阻塞写者，写者也不阻塞读者
+- 每个进程 (每个线程) 对每个库只保留一条长连接，不再每次调用都重新 connect
+- 连接开启语句缓存 (cached_statements)，相同 SQL 直接复用预编译语句
+- mmap_size / cache_size / busy_timeout 调优
+- 只读模式 (mode=ro + query_only)，回测与调参进程不会拿写锁
+"""
+import os
+import sqlite3
+import threading
+
+from src.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+BUSY_TIMEOUT_MS = 30_000
+CACHE_SIZE_KIB = 65_536  # 64MB 页缓存
+MMAP_SIZE = 256 * 1024 * 1024  # 256MB 内存映射
+CACHED_STATEMENTS = 256
+
+_local = threading.local()
+
+
+def _configure(conn: sqlite3.Connection, read_only: bool):
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    if read_only:
+        conn.execute("PRAGMA query_only=1")
+    else:
+        # WAL 是库级持久设置，写连接设置一次后所有进程生效
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+
+def _open(db_path: str, read_only: bool) -> sqlite3.Connection:
+    timeout = BUSY_TIMEOUT_MS / 1000
+    if read_only:
+        uri = f"file:{os.path.abspath(db_path)}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=timeout, cached_statements=CACHED_STATEMENTS)
+    else:
+        conn = sqlite3.connect(db_path, timeout=timeout, cached_statements=CACHED_STATEMENTS)
+    _configure(conn, read_only)
+    return conn
+
+
+def get_connection(db_path: str, read_only: bool = False) -> sqlite3.Connection:
+    """
+    获取当前进程/线程对 db_path 的长连接 (不存在时创建并完成 PRAGMA 配置)
+
+    连接按 (pid, 线程) 隔离：fork 出的子进程不会误用父进程的连接，
+    sqlite3 连接也不跨线程共享。调用方不要 close 返回的连接。
+
+    Args:
+        db_path: 数据库文件路径
+        read_only: 是否以只读模式打开 (库文件必须已存在)
+    """
+    pid = os.getpid()
+    if getattr(_local, 'pid', None) != pid:
+        _local.pid = pid
+        _local.connections = {}
+
+    key = (os.path.abspath(db_path), read_only)
+    conn = _local.connections.get(key)
+    if conn is None:
+        conn = _open(db_path, read_only)
+        _local.connections[key] = conn
+        logger.debug(f"🔌 [SQLite] 打开{'只读' if read_only else '读写'}长连接: {db_path} (pid={pid})")
+    return conn
+
+
+def close_connections():
+    """关闭当前线程持有的所有长连接 (进程退出或测试清理时调用)"""
+    connections = getattr(_local, 'connections', None)
+    if not connections or getattr(_local, 'pid', None) != os.getpid():
+        return
+    for conn in connections.values():
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    connections.clear()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author     : Zijun Deng
+@Date       : 3/13/26 9:20 PM
+@File       : trade_tape.py
+@Description: 逐笔成交磁带 (trade tape) 的录制与读取
+
+把 OKX trades 频道的每一笔成交按定长二进制记录追加写入
+data/trade_tape/{symbol}/{YYYY-MM-DD}.tape (按 UTC 日期切分)，供离线回放与研究复跑。
+
+- 记录格式: TRADE_TAPE_DTYPE，紧凑无对齐，每笔 33 字节，文件没有文件头
+- 录制: WS 协程里只做一次 SimpleQueue.put (每个 WS 帧一次，不解析、不落盘)，
+  字符串解析、打包和批量 write() 全部在后台线程完成；已解码的数组帧直接拼接落盘
+- 读取: np.memmap 直接映射为结构化数组，不做任何解析；
+  进程崩溃留下的末尾残缺记录会被忽略
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from src.utils.log import get_logger
+
+try:
+    from config.loader import GLOBAL_SETTINGS
+    _TAPE_SETTINGS = GLOBAL_SETTINGS.get('trade_tape', {}) or {}
+except ImportError:
+    _TAPE_SETTINGS = {}
+
+logger = get_logger(__name__)
+
+# 项目根目录：trade_tape.py -> data_feed -> src -> 根目录，与 OKXDataLoader 的 data/ 目录同一锚点
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def resolve_tape_dir(path: str) -> str:
+    """磁带目录的相对路径按项目根目录解析 (不依赖启动时的工作目录)，绝对路径原样返回"""
+    return path if os.path.isabs(path) else os.path.join(_PROJECT_ROOT, path)
+
+
+DEFAULT_TAPE_DIR = resolve_tape_dir(_TAPE_SETTINGS.get('dir', 'data/trade_tape'))
+TAPE_ENABLED = bool(_TAPE_SETTINGS.get('enabled', True))
+
+# ts: 成交时间 (UTC 毫秒，与 OKX 原始字段一致)；side: 1=buy, -1=sell
+TRADE_TAPE_DTYPE = np.dtype([
+    ('ts', '<i8'),
+    ('px', '<f8'),
+    ('sz', '<f8'),
+    ('side', 'i1'),
+    ('trade_id', '<i8'),
+])
+
+SIDE_CODES = {'buy': 1, 'sell': -1}
+
+MS_PER_DAY = 86_400_000
+
+_STOP = object()
+
+
+def tape_path(root_dir: str, symbol: str, day: str) -> str:
+    """某个交易对某一天 (YYYY-MM-DD, UTC) 的磁带文件路径"""
+    return os.path.join(root_dir, symbol, f"{day}.tape")
+
+
+def encode_trades(trades: list) -> np.ndarray:
+    """
+    把 OKX trades 频道的原始成交字典打包成 TRADE_TAPE_DTYPE 结构化数组
+
+    结果数组一次性预分配，每列只收集一次字段字符串，由 numpy 在 C 层整列转换为目标类型，
+    不再为每笔成交构造元组或调用 int() / float()。
+
+    Args:
+        trades: [{'px': '3000.1', 'sz': '0.5', 'side': 'buy', 'ts': '1700000000000', 'tradeId': '123'}, ...]
+    """
+    out = np.empty(len(trades), dtype=TRADE_TAPE_DTYPE)
+    if not trades:
+        return out
+    out['ts'] = np.array([t['ts'] for t in trades], dtype=np.int64)
+    out['px'] = np.array([t['px'] for t in trades], dtype=np.float64)
+    out['sz'] = np.array([t['sz'] for t in trades], dtype=np.float64)
+    out['side'] = [SIDE_CODES.get(t['side'], 0) for t in trades]
+    out['trade_id'] = np.array([t.get('tradeId') or 0 for t in trades], dtype=np.int64)
+    return out
+
+
+class TradeTapeRecorder:
+    """
+    后台线程批量落盘的逐笔成交录制器
+
+    record() 可以在事件循环里直接调用：只把 (symbol, trades) 的引用放进无锁队列。
+    后台线程每 flush_interval 秒 (或积压达到 max_batch_frames 帧) 把队列清空，
+    按 (symbol, 日期) 分组后每个文件只调用一次 write()。
+    """
+
+    def __init__(self, root_dir: str = DEFAULT_TAPE_DIR, flush_interval: float = 0.5,
+                 max_batch_frames: int = 10_000):
+        """
+        Args:
+            root_dir: 磁带根目录
+            flush_interval: 后台线程最长多久落盘一次 (秒)
+            max_batch_frames: 单批最多合并的 WS 帧数
+        """
+        self.root_dir = root_dir
+        self.flush_interval = flush_interval
+        self.max_batch_frames = max_batch_frames
+
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._files = {}  # symbol -> (day, 文件对象)
+
+        self.stats = {
+            'frames': 0,
+            'trades': 0,
+            'writes': 0,
+            'bytes': 0,
+            'errors': 0,
+        }
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+    def start(self) -> "TradeTapeRecorder":
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="trade-tape-writer", daemon=True)
+            self._thread.start()
+            logger.info(f"📼 [成交磁带] 录制线程已启动，目录: {self.root_dir}")
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        """把队列里剩余的数据全部落盘后停止后台线程"""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info(f"📼 [成交磁带] 录制线程已停止: {self.stats['trades']} 笔成交, "
+                    f"{self.stats['writes']} 次写入, {self.stats['bytes'] / 1e6:.1f}MB")
+
+    # ------------------------------------------------------------------
+    # 热路径
+    # ------------------------------------------------------------------
+    def record(self, symbol: str, trades: list):
+        """
+        录制一个 WS 帧里的全部成交 (热路径，只入队)
+
+        Args:
+            symbol: 交易对
+            trades: OKX trades 频道消息的 data 字段 (原样传入)，或已解码的 TRADE_TAPE_DTYPE 数组
+                    (如 OKXTradeDecoder.decode 的结果，落盘时不再重复解析)；调用方之后不要再修改它
+        """
+        self._queue.put((symbol, trades))
+
+    # ------------------------------------------------------------------
+    # 后台线程
+    # ------------------------------------------------------------------
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = []
+            while True:
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+                if len(batch) >= self.max_batch_frames:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    logger.error(f"❌ [成交磁带] 写入失败，丢弃 {len(batch)} 帧: {e}")
+
+            if not stopping:
+                # 攒一小段时间再写，把大量小帧合并成少量大块 write()
+                time.sleep(min(self.flush_interval, 0.05))
+
+        self._close_files()
+
+    def _write_batch(self, batch: list):
+        by_symbol = {}
+        for symbol, trades in batch:
+            if not isinstance(trades, np.ndarray):
+                trades = encode_trades(trades)
+            by_symbol.setdefault(symbol, []).append(trades)
+        self.stats['frames'] += len(batch)
+
+        for symbol, parts in by_symbol.items():
+            records = parts[0] if len(parts) == 1 else np.concatenate(parts)
+            if len(records) == 0:
+                continue
+            self.stats['trades'] += len(records)
+
+            days = records['ts'] // MS_PER_DAY
+            if (days == days[0]).all():
+                self._write_day(symbol, int(days[0]), records)
+                continue
+            for day in np.unique(days):
+                self._write_day(symbol, int(day), records[days == day])
+
+    def _write_day(self, symbol: str, day_index: int, records: np.ndarray):
+        day = str(np.datetime64(day_index, 'D'))
+        current = self._files.get(symbol)
+        if current is None or current[0] != day:
+            if current is not None:
+                current[1].close()
+            path = tape_path(self.root_dir, symbol, day)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            current = self._files[symbol] = (day, open(path, 'ab'))
+
+        f = current[1]
+        payload = records.tobytes()
+        f.write(payload)
+        f.flush()
+        self.stats['writes'] += 1
+        self.stats['bytes'] += len(payload)
+
+    def _close_files(self):
+        for _, f in self._files.values():
+            try:
+                f.close()
+            except OSError:
+                pass
+        self._files.clear()
+
+
+# ----------------------------------------------------------------------
+# 读取
+# ----------------------------------------------------------------------
+def read_trade_tape(path: str) -> np.ndarray:
+    """
+    以只读内存映射打开一个磁带文件
+
+    Returns:
+        np.ndarray: TRADE_TAPE_DTYPE 结构化数组 (np.memmap)，文件为空或不存在时返回空数组
+    """
+    if not os.path.exists(path):
+        return np.empty(0, dtype=TRADE_TAPE_DTYPE)
+    n = os.path.getsize(path) // TRADE_TAPE_DTYPE.itemsize
+    if n == 0:
+        return np.empty(0, dtype=TRADE_TAPE_DTYPE)
+    return np.memmap(path, dtype=TRADE_TAPE_DTYPE, mode='r', shape=(n,))
+
+
+def list_tape_days(symbol: str, root_dir: str = DEFAULT_TAPE_DIR) -> list:
+    """列出某个交易对已录制的日期 (YYYY-MM-DD，升序)"""
+    symbol_dir = os.path.join(root_dir, symbol)
+    if not os.path.isdir(symbol_dir):
+        return []
+    return sorted(name[:-len('.tape')] for name in os.listdir(symbol_dir) if name.endswith('.tape'))
+
+
+def load_trade_tape(symbol: str, start_day: str, end_day: str = None,
+                    root_dir: str = DEFAULT_TAPE_DIR) -> np.ndarray:
+    """
+    读取 [start_day, end_day] 内的全部成交
+
+    只有一天时直接返回内存映射视图 (零拷贝)；跨多天时拼接成一个新数组。
+    """
+    end_day = end_day or start_day
+    days = [d for d in list_tape_days(symbol, root_dir) if start_day <= d <= end_day]
+    parts = [read_trade_tape(tape_path(root_dir, symbol, d)) for d in days]
+    parts = [p for p in parts if len(p)]
+    if not parts:
+        return np.empty(0, dtype=TRADE_TAPE_DTYPE)
+    if len(parts) == 1:
+        return parts[0]
+    return np.concatenate(parts)
+
+
+_GLOBAL_RECORDER = None
+_GLOBAL_RECORDER_LOCK = threading.Lock()
+
+
+def get_trade_tape_recorder():
+    """
+    获取进程级共享的录制器 (首次调用时启动后台线程并注册退出时落盘)
+
+    Returns:
+        TradeTapeRecorder: 配置中 trade_tape.enabled 为 false 时返回 None
+    """
+    global _GLOBAL_RECORDER
+    if not TAPE_ENABLED:
+        return None
+    if _GLOBAL_RECORDER is None:
+        with _GLOBAL_RECORDER_LOCK:
+            if _GLOBAL_RECORDER is None:
+                _GLOBAL_RECORDER = TradeTapeRecorder().start()
+                atexit.register(_GLOBAL_RECORDER.stop)
+    return _GLOBAL_RECORDER
@@ -15,12 +15,128 @@ Range Bar工具函数 - 公共方法库
 from typing import List, Optional, Union
 import pandas as pd
 import numpy as np
+from numba import njit
 
 from src.strategy.triplea.core.data_structures import (
     NormalizedTick, RangeBar, RangeBarConfig
 )
 
 
+# DataFrame 输出列（与四号引擎 RangeBar 字段一致）
+RANGE_BAR_COLUMNS = ['open_ts', 'open_px', 'high_px', 'low_px', 'close_px',
+                     'total_buy_vol', 'total_sell_vol', 'delta', 'tick_count']
+
+
+@njit(cache=True)
+def ohlc_range_bar_kernel(ts, open_, high, low, close, half_vol, use_bar_index_ts,
+                          tick_size, tick_range, max_bars,
+                          out_open_ts, out_open, out_high, out_low, out_close,
+                          out_buy, out_sell, out_delta, out_count):
+    """
+    OHLC K线 -> Range Bar 的编译内核
+
+    逐根K线累积当前Bar：最高/最低价取各K线 high/low 的极值，收盘价与闭合判断只看K线 close；
+    闭合后以该K线收盘价开新Bar，新Bar计入该K线的成交量。结果写入预分配的 out_* 数组
+    （容量至少为 K线数 + 1），末尾未闭合的Bar同样写出。
+
+    Args:
+        ts: 每根K线的纳秒时间戳（use_bar_index_ts 为 True 时忽略）
+        half_vol: 每根K线成交量的一半（买卖各按50%计）
+        use_bar_index_ts: 没有时间信息时用“该K线之前已闭合的Bar数 * 1e9”作为时间戳
+        max_bars: 闭合Bar数量上限，< 0 表示无限制
+
+    Returns:
+        int: 写出的Bar数量
+    """
+    n = len(close)
+    if n == 0:
+        return 0
+
+    n_out = 0
+    bar_ts = 0 if use_bar_index_ts else ts[0]
+    bar_open = open_[0]
+    bar_high = high[0]
+    bar_low = low[0]
+    bar_close = close[0]
+    buy = half_vol[0]
+    sell = half_vol[0]
+    delta = buy - sell
+    count = 1
+    base = open_[0]
+
+    for i in range(1, n):
+        # 与 Python 内置 max/min 相同：只有严格更大/更小才替换
+        if high[i] > bar_high:
+            bar_high = high[i]
+        if low[i] < bar_low:
+            bar_low = low[i]
+        px = close[i]
+        bar_close = px
+        buy += half_vol[i]
+        sell += half_vol[i]
+        delta = buy - sell
+        count += 1
+
+        if abs(px - base) / tick_size >= tick_range:
+            out_open_ts[n_out] = bar_ts
+            out_open[n_out] = bar_open
+            out_high[n_out] = bar_high
+            out_low[n_out] = bar_low
+            out_close[n_out] = bar_close
+            out_buy[n_out] = buy
+            out_sell[n_out] = sell
+            out_delta[n_out] = delta
+            out_count[n_out] = count
+            n_out += 1
+
+            # 序号时间戳取闭合前的Bar数
+            bar_ts = ts[i] if not use_bar_index_ts else (n_out - 1) * 1000000000
+            bar_open = px
+            bar_high = px
+            bar_low = px
+            bar_close = px
+            buy = half_vol[i]
+            sell = half_vol[i]
+            delta = buy - sell
+            count = 1
+            base = px
+
+            if max_bars >= 0 and n_out >= max_bars:
+                break
+
+    # 未闭合的Bar
+    out_open_ts[n_out] = bar_ts
+    out_open[n_out] = bar_open
+    out_high[n_out] = bar_high
+    out_low[n_out] = bar_low
+    out_close[n_out] = bar_close
+    out_buy[n_out] = buy
+    out_sell[n_out] = sell
+    out_delta[n_out] = delta
+    out_count[n_out] = count
+    return n_out + 1
+
+
+def _ohlc_timestamps_ns(df: pd.DataFrame) -> Optional[np.ndarray]:
+    """
+    推断每根K线的纳秒时间戳：datetime 索引优先，其次 timestamp 列（秒）；
+    都没有时返回 None，由内核按已闭合Bar序号生成
+    """
+    index = df.index
+    if isinstance(index, pd.DatetimeIndex):
+        # 与 int(Timestamp.timestamp() * 1e9) 一致：先按秒保留6位小数（微秒）再换算
+        seconds = index.as_unit('ns').asi8 / 1e9
+        return (np.round(seconds, 6) * 1e9).astype(np.int64)
+    if 'timestamp' in df.columns:
+        return (df['timestamp'].to_numpy(dtype=np.float64) * 1e9).astype(np.int64)
+    return None
+
+
+def _range_bar_frame(columns: dict) -> pd.DataFrame:
+    """由各列数组一次性构建 Range Bar DataFrame"""
+    return pd.DataFrame({name: columns[name] for name in RANGE_BAR_COLUMNS})
+
+
 def create_range_bars_from_ohlc(
     df: pd.DataFrame,
     tick_range: int = 150,
@@ -33,6 +149,9 @@ def create_range_bars_from_ohlc(
     由于K线数据已经是聚合数据，我们无法获得精确的Tick级别成交量和时间戳，
     因此该方法主要关注价格信息，成交量等信息可能不精确。
 
+    直接在 open/high/low/close/volume 的 numpy 列上运行 Numba 内核，
+    结果写入预分配数组后一次性构建 DataFrame。
+
     Args:
         df: OHLC DataFrame，必须包含以下列：
             - 'open' / 'high' / 'low' / 'close' / 'volume'（可选）
@@ -62,104 +181,36 @@ def create_range_bars_from_ohlc(
     if missing_cols:
         raise ValueError(f"DataFrame缺少必需的列: {missing_cols}")
 
-    # 准备结果列表
-    range_bars = []
-    current_bar = None
-    open_price_base = 0.0
-
-    # 是否有成交量信息
-    has_volume = 'volume' in df.columns
-
-    # 按顺序处理每一行
-    for idx, row in df.iterrows():
-        # 获取价格
-        open_px = row['open']
-        high_px = row['high']
-        low_px = row['low']
-        close_px = row['close']
-
-        # 尝试获取时间戳（使用索引或列）
-        if hasattr(idx, 'timestamp'):
-            # 如果是datetime索引
-            ts_ns = int(idx.timestamp() * 1e9)
-        elif 'timestamp' in df.columns:
-            # 如果有timestamp列
-            ts_ns = int(row['timestamp'] * 1e9)
-        else:
-            # 使用序号
-            ts_ns = len(range_bars) * 1000000000
-
-        # 获取成交量（如果有）
-        volume = row['volume'] if has_volume else 0.0
-        # 简单假设50%为买入，50%为卖出（实际中可能需要更复杂的逻辑）
-        buy_vol = volume * 0.5
-        sell_vol = volume * 0.5
-
-        if current_bar is None:
-            # 初始化第一个Bar
-            current_bar = {
-                'open_ts': ts_ns,
-                'open_px': open_px,
-                'high_px': high_px,
-                'low_px': low_px,
-                'close_px': close_px,
-                'total_buy_vol': buy_vol,
-                'total_sell_vol': sell_vol,
-                'delta': buy_vol - sell_vol,
-                'tick_count': 1
-            }
-            open_price_base = open_px
-            continue
-
-        # 更新当前Bar的最高最低价
-        current_bar['high_px'] = max(current_bar['high_px'], high_px)
-        current_bar['low_px'] = min(current_bar['low_px'], low_px)
-        current_bar['close_px'] = close_px
-
-        # 更新成交量信息
-        current_bar['total_buy_vol'] += buy_vol
-        current_bar['total_sell_vol'] += sell_vol
-        current_bar['delta'] = current_bar['total_buy_vol'] - current_bar['total_sell_vol']
-        current_bar['tick_count'] += 1
-
-        # 检查是否达到闭合条件
-        # 计算从开盘基准价到当前收盘价的位移（Tick单位）
-        displacement = abs(close_px - open_price_base) / tick_size
-
-        if displacement >= tick_range:
-            # Bar闭合，添加到结果
-            range_bars.append(current_bar.copy())
-
-            # 新开Bar，使用当前收盘价作为新Bar的开盘价
-            current_bar = {
-                'open_ts': ts_ns,
-                'open_px': close_px,  # 使用当前收盘价作为新开盘价
-                'high_px': close_px,
-                'low_px': close_px,
-                'close_px': close_px,
-                'total_buy_vol': buy_vol,
-                'total_sell_vol': sell_vol,
-                'delta': buy_vol - sell_vol,
-                'tick_count': 1
-            }
-            open_price_base = close_px  # 重置基准价
-
-            # 检查是否达到最大Bar数量限制
-            if max_bars is not None and len(range_bars) >= max_bars:
-                break
+    n = len(df)
+    if n == 0:
+        return pd.DataFrame()
 
-    # 如果还有未闭合的Bar，添加到结果
-    if current_bar is not None:
-        range_bars.append(current_bar)
+    open_ = df['open'].to_numpy(dtype=np.float64)
+    high = df['high'].to_numpy(dtype=np.float64)
+    low = df['low'].to_numpy(dtype=np.float64)
+    close = df['close'].to_numpy(dtype=np.float64)
+    # 简单假设50%为买入，50%为卖出（实际中可能需要更复杂的逻辑）
+    if 'volume' in df.columns:
+        half_vol = df['volume'].to_numpy(dtype=np.float64) * 0.5
+    else:
+        half_vol = np.zeros(n, dtype=np.float64)
 
-    # 转换为DataFrame
-    result_df = pd.DataFrame(range_bars)
+    ts_ns = _ohlc_timestamps_ns(df)
+    use_bar_index_ts = ts_ns is None
+    if use_bar_index_ts:
+        ts_ns = np.zeros(n, dtype=np.int64)
 
-    # 确保数据类型正确
-    if not result_df.empty:
-        result_df['open_ts'] = result_df['open_ts'].astype(np.int64)
+    # 最多 n 根Bar（首根K线不会闭合，末尾总会写出一根未闭合Bar）
+    columns = {name: np.empty(n, dtype=np.float64) for name in RANGE_BAR_COLUMNS}
+    columns['open_ts'] = np.empty(n, dtype=np.int64)
+    columns['tick_count'] = np.empty(n, dtype=np.int64)
 
-    return result_df
+    n_out = ohlc_range_bar_kernel(
+        ts_ns, open_, high, low, close, half_vol, use_bar_index_ts,
+        float(tick_size), float(tick_range), max_bars if max_bars is not None else -1,
+        *(columns[name] for name in RANGE_BAR_COLUMNS)
+    )
+    return _range_bar_frame({name: values[:n_out] for name, values in columns.items()})
 
 
 def create_range_bars_from_ticks(
@@ -308,18 +359,8 @@ def range_bars_to_dataframe(range_bars: List[RangeBar]) -> pd.DataFrame:
     if not range_bars:
         return pd.DataFrame()
 
-    data = []
-    for bar in range_bars:
-        data.append({
-            'open_ts': bar.open_ts,
-            'open_px': bar.open_px,
-            'high_px': bar.high_px,
-            'low_px': bar.low_px,
-            'close_px': bar.close_px,
-            'total_buy_vol': bar.total_buy_vol,
-            'total_sell_vol': bar.total_sell_vol,
-            'delta': bar.delta,
-            'tick_count': bar.tick_count
-        })
-
-    return pd.DataFrame(data)
\ No newline at end of file
+    columns = {name: np.fromiter((getattr(bar, name) for bar in range_bars),
+                                 dtype=np.int64 if name in ('open_ts', 'tick_count') else np.float64,
+                                 count=len(range_bars))
+               for name in RANGE_BAR_COLUMNS}
+    return _range_bar_frame(columns)
@@ -13,7 +13,8 @@ import datetime
 import numpy as np
 import pandas as pd
 
-from src.data_feed.okx_loader import OKXDataLoader
+from src.data_feed.candle_cache import get_candle_cache
+from src.data_feed.resampler import CandleResampler, TIMEFRAME_SECONDS
 from src.utils.log import get_logger
 from src.utils.volume_profile import CompositeVolumeProfile
 
@@ -29,8 +30,14 @@ class SMCValidator:
         self.timeframes = timeframes or ["5m", "15m", "1H"]
         self.tf_limit_mapping = {"5m": 600, "15m": 200, "1H": 168}
 
-        # 为每个时间级别实例化一个专用的数据加载器
-        self.loaders = {tf: OKXDataLoader(symbol=symbol, timeframe=tf) for tf in self.timeframes}
+        # 🌟 只维护一条 1m 基础序列 (唯一走 REST 和本地存储的数据源)，各级别在本地聚合派生，
+        # 避免多个级别分别拉取导致的请求翻倍和收盘价不一致；1m 序列放在进程级共享缓存里，只增量刷新尾部
+        self.candle_cache = get_candle_cache()
+        derived_tfs = sorted(set(self.timeframes) | {"5m"}, key=lambda tf: TIMEFRAME_SECONDS[tf])
+        self.resampler = CandleResampler(derived_tfs, base_timeframe="1m")
+        limits = {tf: self.tf_limit_mapping.get(tf, 600) for tf in derived_tfs}
+        limits["5m"] = max(limits["5m"], 600)
+        self.base_limit = self.resampler.bars_needed(limits)
 
         # 存储计算出的兴趣区 (Point of Interest)
         self.active_pois = []
@@ -39,11 +46,13 @@ class SMCValidator:
     def update_structure(self):
         """定期拉取多级别 K 线，合并 SMC 支撑区，并扫描 5m 全局筹码"""
         try:
+            self._refresh_base()
+
             all_pois = []
-            # 1. 🌟 遍历多时间级别，绘制复合地图
+            # 1. 🌟 遍历多时间级别，绘制复合地图 (全部由 1m 基础序列聚合而来)
             for tf in self.timeframes:
                 limit = self.tf_limit_mapping.get(tf, 600)
-                df = self.loaders[tf].fetch_historical_data(limit=limit)
+                df = self.resampler.get(tf, limit=limit)
 
                 if df is not None and not df.empty and len(df) >= 5:
                     df = df.copy()
@@ -53,7 +62,7 @@ class SMCValidator:
             self.active_pois = all_pois
 
             # 2. 🌟 筹码测绘：永远使用 5m 的高清数据来扫描地形
-            df_5m = self.loaders["5m"].fetch_historical_data(limit=600)
+            df_5m = self.resampler.get("5m", limit=600)
             if df_5m is not None and not df_5m.empty:
                 vp_analyzer = CompositeVolumeProfile()
                 self.macro_vp_metrics = vp_analyzer.analyze_macro_profile(df_5m.copy())
@@ -64,6 +73,11 @@ class SMCValidator:
         except Exception as e:
             logger.exception(f"❌ [SMC验证器] 更新K线结构失败: {e}")
 
+    def _refresh_base(self):
+        """补齐 1m 基础序列的最新部分，并增量聚合出各级别已收盘的 K 线"""
+        base_df = self.candle_cache.get_frame(self.symbol, "1m", limit=self.base_limit)
+        self.resampler.update(base_df)
+
     # ====================================================
     # 🌟 用这个全新的宏观交叉验证，替换掉旧的 auto_verify_volume_support
     # ====================================================
@@ -292,9 +306,12 @@ class SMCValidator:
     def get_nearest_resistance(self, current_price: float):
         """🌟 进阶版：寻找上方最近的阻力位 (Bearish OB 或 实体 Swing High)"""
         try:
-            df = self.loaders["5m"].fetch_historical_data(limit=300).copy()
+            # 缓存没有新收盘 K 线时不会访问交易所，聚合也只处理新增的 1m K 线
+            self._refresh_base()
+            df = self.resampler.get("5m", limit=300)
             if df is None or df.empty:
                 return None
+            df = df.copy()
 
             resistances = []
 
@@ -55,6 +55,9 @@ from .risk.position_guard import PositionGuard
 from .signal.signal_generator import TripleASignalGenerator
 from .signal.research_generator import ResearchGenerator
 
+# 重新导出离线回放模块
+from .replay.tick_replay import TripleAReplay, ReplayResult
+
 # 重新导出订单执行模块
 from .execution.okx_executor import (
     OKXOrderExecutor,
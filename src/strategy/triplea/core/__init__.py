@@ -15,6 +15,8 @@ from .data_structures import (
     RiskManagerConfig,
     PositionState
 )
+from .clock import Clock, EventClock, WallClock
+from .ring_buffer import SoARingBuffer, TickRingBuffer, time_window_start, time_window_bounds
 
 __all__ = [
     'NormalizedTick',
@@ -22,5 +24,12 @@ __all__ = [
     'KDEEngineConfig',
     'RangeBarConfig',
     'RiskManagerConfig',
-    'PositionState'
+    'PositionState',
+    'Clock',
+    'EventClock',
+    'WallClock',
+    'SoARingBuffer',
+    'TickRingBuffer',
+    'time_window_start',
+    'time_window_bounds'
 ]
\ No newline at end of file
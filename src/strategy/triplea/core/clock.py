@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+四号引擎时钟抽象
+状态机的时间窗口、冷却期和状态超时统一从时钟取"当前时间"，而不是直接调用 time.time()
+
+- EventClock: 事件时间，由交易所 Tick 时间戳 (NormalizedTick.ts) 推进。
+  实盘中不受事件循环积压影响，回放时结果确定且可以远快于真实时间运行
+- WallClock: 墙钟时间，保留旧行为
+"""
+import time
+
+
+class Clock:
+    """时钟基类，时间单位为秒 (float)"""
+
+    def on_tick(self, ts_ns: int):
+        """用 Tick 时间戳 (纳秒) 推进时钟"""
+
+    def now(self) -> float:
+        raise NotImplementedError
+
+    def now_ns(self) -> int:
+        return int(self.now() * 1_000_000_000)
+
+    def reset(self):
+        """重置时钟状态"""
+
+
+class WallClock(Clock):
+    """墙钟：忽略 Tick 时间戳，始终返回 time.time()"""
+
+    def now(self) -> float:
+        return time.time()
+
+
+class EventClock(Clock):
+    """
+    事件时钟：当前时间 = 已处理 Tick 中最大的交易所时间戳
+
+    时间只前进不后退 (乱序 Tick 不会让窗口倒退)，处理第一笔 Tick 之前为 0。
+    """
+
+    def __init__(self):
+        self._now_ns = 0
+
+    def on_tick(self, ts_ns: int):
+        if ts_ns > self._now_ns:
+            self._now_ns = ts_ns
+
+    def now(self) -> float:
+        return self._now_ns / 1_000_000_000
+
+    def now_ns(self) -> int:
+        return self._now_ns
+
+    def reset(self):
+        self._now_ns = 0
@@ -4,9 +4,13 @@
 四号引擎v3.0 核心数据结构定义
 使用Python dataclass定义所有核心数据结构和配置类
 保持与现有API 100%兼容，支持高性能序列化
+
+高频创建的记录类（OKXRawTick / NormalizedTick / RangeBar / PositionState）声明 __slots__，
+实例不带 __dict__；这几个类的字段都没有默认值，因此可以直接在类体里写 __slots__（兼容 Python 3.9）。
+需要批量存储时优先用列式 numpy 结构（TRADE_TAPE_DTYPE、RANGE_BAR_DTYPE、TickRingBuffer）。
 """
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields, is_dataclass
 from typing import Dict, Any
 
 
@@ -14,6 +18,8 @@ from typing import Dict, Any
 @dataclass
 class OKXRawTick:
     """原始Tick输入（来自OKX WebSocket）"""
+    __slots__ = ('instId', 'tradeId', 'ts', 'px', 'sz', 'side')
+
     instId: str  # 交易对标识符，如 "ETH-USDT-SWAP"
     tradeId: str  # 撮合ID（交易所唯一标识）
     ts: int  # 纳秒级时间戳 (unix epoch nanoseconds)
@@ -25,6 +31,8 @@ class OKXRawTick:
 @dataclass
 class NormalizedTick:
     """内部标准化Tick（进入处理流水线）"""
+    __slots__ = ('ts', 'px', 'sz', 'side')
+
     ts: int  # 纳秒时间戳
     px: float  # 价格
     sz: float  # 数量
@@ -54,6 +62,9 @@ class NormalizedTick:
 @dataclass
 class RangeBar:
     """Range Bar（无时间维度容器）"""
+    __slots__ = ('open_ts', 'open_px', 'high_px', 'low_px', 'close_px',
+                 'total_buy_vol', 'total_sell_vol', 'delta', 'tick_count')
+
     open_ts: int  # 首笔Tick时间戳
     open_px: float  # 开盘价
     high_px: float  # 最高价
@@ -210,6 +221,9 @@ def encode_dataclass(obj) -> Dict[str, Any]:
         return obj.to_dict()
     elif hasattr(obj, '__dict__'):
         return obj.__dict__
+    elif is_dataclass(obj):
+        # 声明了 __slots__ 的记录类没有 __dict__
+        return {f.name: getattr(obj, f.name) for f in fields(obj)}
     else:
         raise ValueError(f"对象 {type(obj)} 不支持序列化")
 
@@ -223,6 +237,9 @@ def decode_dataclass(data: Dict[str, Any], cls) -> Any:
 @dataclass
 class PositionState:
     """仓位状态信息"""
+    __slots__ = ('position_id', 'symbol', 'direction', 'entry_price', 'current_price', 'position_size',
+                 'entry_time', 'stop_loss_price', 'take_profit_price', 'unrealized_pnl', 'realized_pnl')
+
     position_id: str  # 仓位ID
     symbol: str  # 交易对标识符，如 "ETH-USDT-SWAP"
     direction: str  # 仓位方向 "LONG" 或 "SHORT"
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+四号引擎结构化数组环形缓冲区（Struct-of-Arrays）
+每个字段一条预分配的 numpy 数组，追加 O(1)，"最近 N 条" 直接返回零拷贝的连续切片
+
+实现方式为镜像双倍缓冲：物理长度 2 * capacity，每次写入同时写 pos 与 pos + capacity，
+于是任意 n <= capacity 的最近 n 条数据都落在 [pos + capacity - n, pos + capacity) 这段连续内存上。
+"""
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+def time_window_start(times: np.ndarray, cutoff: float) -> int:
+    """
+    升序时间数组中第一个 >= cutoff 的下标（O(log n)）
+
+    等价于 int(np.sum(times < cutoff))，但不生成布尔掩码；
+    times[time_window_start(times, cutoff):] 即为 times >= cutoff 的连续切片。
+    """
+    return int(np.searchsorted(times, cutoff, side='left'))
+
+
+def time_window_bounds(times: np.ndarray, lefts: np.ndarray, rights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    一次性定位多个半开时间窗 [lefts[k], rights[k]) 在升序时间数组中的切片边界
+
+    Returns:
+        (lo, hi): 第 k 个窗口为 times[lo[k]:hi[k]]，等价于掩码 (times >= lefts[k]) & (times < rights[k])
+    """
+    return np.searchsorted(times, lefts, side='left'), np.searchsorted(times, rights, side='left')
+
+
+class SoARingBuffer:
+    """
+    多字段共享写指针的环形缓冲区
+
+    view() 返回的是缓冲区本身的切片（不拷贝），后续 append 会改写其内容，
+    调用方只能在当前 Tick 内使用，需要长期保存时请自行 .copy()。
+    """
+
+    def __init__(self, capacity: int, fields: Dict[str, np.dtype]):
+        """
+        Args:
+            capacity: 最多保留的记录数
+            fields: {字段名: dtype}，append 的参数按此顺序传入
+        """
+        if capacity <= 0:
+            raise ValueError(f"capacity必须为正数: {capacity}")
+        self.capacity = capacity
+        self.fields: Tuple[str, ...] = tuple(fields)
+        self._arrays = {name: np.zeros(2 * capacity, dtype=dtype) for name, dtype in fields.items()}
+        self._columns = tuple(self._arrays[name] for name in self.fields)
+        self._pos = 0  # 下一条记录的写入位置 [0, capacity)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, *values):
+        """追加一条记录（参数顺序与 fields 一致）"""
+        pos = self._pos
+        mirror = pos + self.capacity
+        for column, value in zip(self._columns, values):
+            column[pos] = value
+            column[mirror] = value
+        pos += 1
+        self._pos = 0 if pos == self.capacity else pos
+        if self._size < self.capacity:
+            self._size += 1
+
+    def extend(self, *columns):
+        """
+        批量追加多条记录，结果与逐条 append 相同
+
+        Args:
+            columns: 每个字段一条等长数组（顺序与 fields 一致）
+        """
+        n = len(columns[0])
+        if n == 0:
+            return
+        capacity = self.capacity
+        k = min(n, capacity)  # 超出容量的部分会被覆盖，只写最后 capacity 条
+        start = (self._pos + n - k) % capacity
+        idx = (start + np.arange(k)) % capacity
+        for column, values in zip(self._columns, columns):
+            values = np.asarray(values)[n - k:]
+            column[idx] = values
+            column[idx + capacity] = values
+        self._pos = (self._pos + n) % capacity
+        self._size = min(self._size + n, capacity)
+
+    def view(self, name: str, n: int = None) -> np.ndarray:
+        """
+        字段 name 最近 n 条记录（按时间升序）的零拷贝视图
+
+        Args:
+            name: 字段名
+            n: 条数，None 表示全部
+        """
+        size = self._size if n is None else min(n, self._size)
+        end = self._pos + self.capacity
+        return self._arrays[name][end - size:end]
+
+    def last(self, name: str):
+        """字段 name 的最新一条记录"""
+        if self._size == 0:
+            raise IndexError("缓冲区为空")
+        return self._arrays[name][self._pos + self.capacity - 1]
+
+    def clear(self):
+        self._pos = 0
+        self._size = 0
+
+
+class TickRingBuffer(SoARingBuffer):
+    """
+    状态机使用的 Tick 环形缓冲区
+
+    字段: ts（事件时间，秒）、px（成交价）、sz（成交量）、side（1=买, -1=卖）、
+    fills（同价聚合前的成交笔数，未聚合为 1）
+    """
+
+    TICK_FIELDS = {
+        'ts': np.float64,
+        'px': np.float64,
+        'sz': np.float64,
+        'side': np.int8,
+        'fills': np.int32,
+    }
+
+    def __init__(self, capacity: int = 1000):
+        super().__init__(capacity, self.TICK_FIELDS)
+        self.ts = self._arrays['ts']
+        self.px = self._arrays['px']
+        self.sz = self._arrays['sz']
+        self.side = self._arrays['side']
+        self.fills = self._arrays['fills']
+
+    def append(self, ts: float, px: float, sz: float, side: int, fills: int = 1):
+        """追加一笔 Tick（展开写入，避免通用 append 的循环开销）"""
+        pos = self._pos
+        mirror = pos + self.capacity
+        self.ts[pos] = ts
+        self.ts[mirror] = ts
+        self.px[pos] = px
+        self.px[mirror] = px
+        self.sz[pos] = sz
+        self.sz[mirror] = sz
+        self.side[pos] = side
+        self.side[mirror] = side
+        self.fills[pos] = fills
+        self.fills[mirror] = fills
+        pos += 1
+        self._pos = 0 if pos == self.capacity else pos
+        if self._size < self.capacity:
+            self._size += 1
+
+    def count_since(self, cutoff: float) -> int:
+        """时间戳 >= cutoff 的最近 Tick 数（ts 单调不减，二分查找 O(log n)）"""
+        times = self.view('ts')
+        return len(times) - time_window_start(times, cutoff)
@@ -10,11 +10,13 @@
 from .range_bar_generator import RangeBarGenerator
 from .cvd_calculator import CVDCalculator
 from .impulse_wave_detector import ImpulseWaveDetector, ImpulseWave, ImpulseWaveDirection
+from .footprint_ladder import FootprintLadder
 
 __all__ = [
     'RangeBarGenerator',
     'CVDCalculator',
     'ImpulseWaveDetector',
     'ImpulseWave',
-    'ImpulseWaveDirection'
+    'ImpulseWaveDirection',
+    'FootprintLadder'
 ]
\ No newline at end of file
@@ -7,13 +7,15 @@
 专为实时Tick流处理优化，毫秒级延迟
 """
 
-from collections import deque
-from typing import List, Dict, Optional, Deque
+import math
+from typing import List, Dict, Optional
 
 import numpy as np
 from numba import njit
 
 from src.strategy.triplea.core.data_structures import NormalizedTick
+from src.strategy.triplea.core.ring_buffer import SoARingBuffer
+from src.utils.latency_histogram import get_latency_registry
 from src.utils.log import get_logger
 
 logger = get_logger(__name__)
@@ -27,13 +29,14 @@ class CVDCalculator:
     使用增量更新算法优化性能
     """
 
-    def __init__(self, window_sizes: List[int] = None, max_history: int = 1000):
+    def __init__(self, window_sizes: List[int] = None, max_history: int = 1000, latency_source: str = 'main'):
         """
         初始化CVD计算器
 
         Args:
             window_sizes: 窗口大小列表（以Tick数为单位）
             max_history: 最大历史记录长度
+            latency_source: 延迟直方图 cvd 阶段的来源标签（main / shadow）
         """
         if window_sizes is None:
             window_sizes = [10, 30, 60, 120, 240]  # 多时间窗口分析
@@ -41,20 +44,17 @@ class CVDCalculator:
         self.window_sizes = window_sizes
         self.max_history = max_history
 
-        # 数据缓冲区
-        self.tick_buffer: Deque[NormalizedTick] = deque(maxlen=max_history)
+        # 所有窗口共享的带符号成交量序列（买为正、卖为负），窗口移出的贡献即 window 笔之前的那一笔
+        self.delta_buffer = SoARingBuffer(max(window_sizes) + 1, {'delta': np.float64})
+        self.deltas_seen = 0
+        self.window_array = np.asarray(window_sizes, dtype=np.int64)
 
-        # 每个窗口的Tick队列和当前CVD值（增量更新）
-        self.window_queues: Dict[int, Deque[NormalizedTick]] = {}
-        self.window_cvd: Dict[int, float] = {}
+        # 每个窗口的当前CVD值（增量更新）
+        self.window_cvd: Dict[int, float] = {window: 0.0 for window in window_sizes}
 
-        for window in window_sizes:
-            self.window_queues[window] = deque()
-            self.window_cvd[window] = 0.0
-
-        # CVD历史记录：每个窗口大小对应一个CVD历史队列
-        self.cvd_history: Dict[int, Deque[float]] = {
-            window: deque(maxlen=max_history) for window in window_sizes
+        # CVD历史记录：每个窗口大小对应一条CVD历史环形缓冲
+        self.cvd_history: Dict[int, SoARingBuffer] = {
+            window: SoARingBuffer(max_history, {'cvd': np.float64}) for window in window_sizes
         }
 
         # 统计特征缓存
@@ -63,12 +63,22 @@ class CVDCalculator:
             for window in window_sizes
         }
 
+        # CVD历史的滚动和 / 平方和（相对平移量 shift，减小大数相消误差），O(1) 更新均值与标准差
+        self._hist_shift: Dict[int, float] = {window: 0.0 for window in window_sizes}
+        self._hist_sum: Dict[int, float] = {window: 0.0 for window in window_sizes}
+        self._hist_sumsq: Dict[int, float] = {window: 0.0 for window in window_sizes}
+        self._hist_updates: Dict[int, int] = {window: 0 for window in window_sizes}
+        self._stats_dirty: Dict[int, bool] = {window: False for window in window_sizes}
+        # 每累计这么多次增删就按历史精确重算一次滚动和，消除浮点漂移
+        self.resync_interval = max_history
+
         # 性能统计
         self.stats = {
             'ticks_processed': 0,
             'cvd_updates': 0,
             'total_processing_time_ns': 0
         }
+        self.latency_histogram = get_latency_registry().histogram('cvd', latency_source)
 
         # 统计更新频率控制（每10个tick更新一次统计）
         self.stats_update_counter = 0
@@ -90,13 +100,15 @@ class CVDCalculator:
         start_time = time.perf_counter_ns()
 
         try:
-            # 将Tick添加到缓冲区
-            self.tick_buffer.append(tick)
+            # 计算新Tick的贡献
+            tick_contribution = tick.sz if tick.side == 1 else -tick.sz
+            self.delta_buffer.append(tick_contribution)
+            self.deltas_seen += 1
 
             # 更新所有窗口的CVD（增量更新）
             updated_cvd = {}
             for window in self.window_sizes:
-                cvd_value = self._update_window_cvd(window, tick)
+                cvd_value = self._update_window_cvd(window, tick_contribution)
                 updated_cvd[window] = cvd_value
 
             # 更新性能统计
@@ -114,42 +126,139 @@ class CVDCalculator:
         finally:
             end_time = time.perf_counter_ns()
             self.stats['total_processing_time_ns'] += (end_time - start_time)
+            self.latency_histogram.record(end_time - start_time)
 
-    def _update_window_cvd(self, window: int, tick: NormalizedTick) -> float:
+    def process_ticks(self, ts: np.ndarray, px: np.ndarray, sz: np.ndarray, side: np.ndarray) -> Dict[int, float]:
         """
-        增量更新指定窗口的CVD
+        批量处理一段列式Tick（如一个WS帧），结果与逐笔调用 on_tick 相同
+
+        窗口CVD与历史滚动和由 Numba 内核按逐笔相同的浮点运算顺序推进；
+        统计特征在批末按 stats_update_interval 计数刷新（读取时 get_statistics 仍会补算到最新）。
 
         Args:
-            window: 窗口大小
-            tick: 新到达的Tick
+            ts: 纳秒时间戳数组
+            px: 价格数组
+            sz: 成交量数组
+            side: 方向数组（1=买入, -1=卖出）
 
         Returns:
-            更新后的CVD值
+            批末的CVD值字典 {窗口大小: CVD值}
         """
-        queue = self.window_queues[window]
-        current_cvd = self.window_cvd[window]
+        import time
+        start_time = time.perf_counter_ns()
+
+        n = len(sz)
+        try:
+            if n == 0:
+                return self.window_cvd.copy()
+
+            sz = np.asarray(sz, dtype=np.float64)
+            deltas = np.where(np.asarray(side) == 1, sz, -sz)
+
+            cvd = np.array([self.window_cvd[window] for window in self.window_sizes], dtype=np.float64)
+            cvd_paths = np.empty((len(self.window_sizes), n), dtype=np.float64)
+            rolling_cvd_kernel(self.delta_buffer.view('delta'), deltas, self.deltas_seen,
+                               self.window_array, cvd, cvd_paths)
+            self.delta_buffer.extend(deltas)
+            self.deltas_seen += n
+
+            for k, window in enumerate(self.window_sizes):
+                self.window_cvd[window] = float(cvd[k])
+                self._extend_history(window, cvd_paths[k])
+
+            self.stats['ticks_processed'] += n
+            self.stats['cvd_updates'] += n * len(self.window_sizes)
+
+            self.stats_update_counter += n
+            if self.stats_update_counter >= self.stats_update_interval:
+                self._update_statistics()
+                self.stats_update_counter %= self.stats_update_interval
+
+            return self.window_cvd.copy()
+
+        finally:
+            end_time = time.perf_counter_ns()
+            self.stats['total_processing_time_ns'] += (end_time - start_time)
+            if n:
+                self.latency_histogram.record((end_time - start_time) // n, n)
 
-        # 计算新Tick的贡献
-        tick_contribution = tick.sz if tick.side == 1 else -tick.sz
+    def _update_window_cvd(self, window: int, tick_contribution: float) -> float:
+        """
+        增量更新指定窗口的CVD（新Tick的贡献已写入 delta_buffer）
 
-        # 将新Tick加入队列
-        queue.append(tick)
+        Args:
+            window: 窗口大小
+            tick_contribution: 新Tick的带符号成交量
 
+        Returns:
+            更新后的CVD值
+        """
         # 更新CVD：加上新Tick的贡献
-        current_cvd += tick_contribution
+        current_cvd = self.window_cvd[window] + tick_contribution
 
-        # 如果队列大小超过窗口，移除最旧的Tick并减去其贡献
-        if len(queue) > window:
-            old_tick = queue.popleft()
-            old_contribution = old_tick.sz if old_tick.side == 1 else -old_tick.sz
-            current_cvd -= old_contribution
+        # 如果窗口内Tick数超过窗口大小，减去移出窗口那一笔的贡献
+        if self.deltas_seen > window:
+            current_cvd -= float(self.delta_buffer.view('delta', window + 1)[0])
 
         # 更新当前CVD值
         self.window_cvd[window] = current_cvd
-        self.cvd_history[window].append(current_cvd)
+        self._append_history(window, current_cvd)
 
         return current_cvd
 
+    def _append_history(self, window: int, value: float):
+        """追加CVD历史并增量维护滚动和（被挤出的最旧值同步减去）"""
+        history = self.cvd_history[window]
+        if not len(history):
+            self._hist_shift[window] = value
+        shift = self._hist_shift[window]
+        if len(history) == history.capacity:
+            old = float(history.view('cvd')[0]) - shift
+            self._hist_sum[window] -= old
+            self._hist_sumsq[window] -= old * old
+        history.append(value)
+        new = value - shift
+        self._hist_sum[window] += new
+        self._hist_sumsq[window] += new * new
+        self._stats_dirty[window] = True
+
+        self._hist_updates[window] += 1
+        if self._hist_updates[window] >= self.resync_interval:
+            self._resync_history_sums(window)
+
+    def _extend_history(self, window: int, values: np.ndarray):
+        """批量追加CVD历史；按 resync_interval 切段，每段末尾与逐笔追加一样精确重算滚动和"""
+        history = self.cvd_history[window]
+        sums = np.empty(2, dtype=np.float64)
+        pos = 0
+        while pos < len(values):
+            if not len(history):
+                self._hist_shift[window] = float(values[pos])
+            take = min(len(values) - pos, max(self.resync_interval - self._hist_updates[window], 1))
+            chunk = values[pos:pos + take]
+
+            sums[0] = self._hist_sum[window]
+            sums[1] = self._hist_sumsq[window]
+            history_sums_kernel(history.view('cvd'), chunk, history.capacity, self._hist_shift[window], sums)
+            self._hist_sum[window] = float(sums[0])
+            self._hist_sumsq[window] = float(sums[1])
+            history.extend(chunk)
+
+            self._hist_updates[window] += take
+            if self._hist_updates[window] >= self.resync_interval:
+                self._resync_history_sums(window)
+            pos += take
+        self._stats_dirty[window] = True
+
+    def _resync_history_sums(self, window: int):
+        """按当前历史精确重算滚动和，并把平移量移到最新值附近"""
+        history = self.cvd_history[window].view('cvd').tolist()
+        shift = history[-1] if history else 0.0
+        self._hist_shift[window] = shift
+        self._hist_sum[window] = math.fsum(v - shift for v in history)
+        self._hist_sumsq[window] = math.fsum((v - shift) * (v - shift) for v in history)
+        self._hist_updates[window] = 0
+
     def _update_statistics(self, window: Optional[int] = None):
         """更新CVD统计特征（均值、标准差、Z-score）
 
@@ -162,13 +271,19 @@ class CVDCalculator:
             windows = self.window_sizes
 
         for window in windows:
-            history = list(self.cvd_history[window])
-            if len(history) < 2:
+            # 自上次计算后没有新数据，直接复用缓存
+            if not self._stats_dirty[window]:
+                continue
+            n = len(self.cvd_history[window])
+            if n < 2:
                 continue
+            self._stats_dirty[window] = False
 
-            # 计算均值和标准差
-            mean_val = np.mean(history)
-            std_val = np.std(history, ddof=1) if len(history) > 1 else 0.0
+            # 由滚动和计算均值和样本标准差（ddof=1）
+            shifted_mean = self._hist_sum[window] / n
+            variance = (self._hist_sumsq[window] - shifted_mean * self._hist_sum[window]) / (n - 1)
+            mean_val = shifted_mean + self._hist_shift[window]
+            std_val = math.sqrt(variance) if variance > 0 else 0.0
 
             # 计算当前Z-score
             current_val = self.window_cvd[window]
@@ -222,19 +337,24 @@ class CVDCalculator:
         Returns:
             CVD历史列表（最新的在前）
         """
-        history = list(self.cvd_history[window])
+        history = self.cvd_history[window].view('cvd').tolist()
         if n_points is not None:
             return history[-n_points:]
         return history
 
     def reset(self):
         """重置计算器状态"""
-        self.tick_buffer.clear()
+        self.delta_buffer.clear()
+        self.deltas_seen = 0
         for window in self.window_sizes:
-            self.window_queues[window].clear()
             self.window_cvd[window] = 0.0
             self.cvd_history[window].clear()
             self.cvd_stats[window] = {'mean': 0.0, 'std': 0.0, 'z_score': 0.0}
+            self._hist_shift[window] = 0.0
+            self._hist_sum[window] = 0.0
+            self._hist_sumsq[window] = 0.0
+            self._hist_updates[window] = 0
+            self._stats_dirty[window] = False
 
         self.stats = {
             'ticks_processed': 0,
@@ -394,6 +514,68 @@ class BatchCVDCalculator:
 
 
 # Numba加速函数
+@njit(cache=True)
+def rolling_cvd_kernel(
+        prev_deltas: np.ndarray,
+        deltas: np.ndarray,
+        n_seen: int,
+        windows: np.ndarray,
+        cvd: np.ndarray,
+        out: np.ndarray
+):
+    """
+    多窗口滚动CVD内核（与 CVDCalculator 逐笔增量更新的运算顺序一致：先加新贡献，再减移出的贡献）
+
+    Args:
+        prev_deltas: 之前最近的带符号成交量（按时间升序，长度至少为 min(n_seen, max(windows) + 1)）
+        deltas: 本批带符号成交量
+        n_seen: 本批之前已处理的Tick总数
+        windows: 窗口大小数组
+        cvd: 各窗口当前CVD，原地更新为批末的值
+        out: (窗口数, 本批Tick数) 输出，逐笔的CVD值
+    """
+    n_prev = len(prev_deltas)
+    for k in range(len(windows)):
+        window = windows[k]
+        value = cvd[k]
+        for i in range(len(deltas)):
+            value += deltas[i]
+            if n_seen + i + 1 > window:
+                j = i - window  # 移出窗口的那一笔（负数表示落在 prev_deltas 中）
+                value -= deltas[j] if j >= 0 else prev_deltas[n_prev + j]
+            out[k, i] = value
+        cvd[k] = value
+
+
+@njit(cache=True)
+def history_sums_kernel(history: np.ndarray, values: np.ndarray, maxlen: int, shift: float, sums: np.ndarray):
+    """
+    CVD历史滚动和内核：依次追加 values，历史满 maxlen 时先减去被挤出的最旧值
+
+    Args:
+        history: 当前历史（按时间升序）
+        values: 新追加的CVD值
+        maxlen: 历史最大长度
+        shift: 平移量
+        sums: [滚动和, 滚动平方和]，原地更新
+    """
+    n_prev = len(history)
+    s = sums[0]
+    sq = sums[1]
+    for i in range(len(values)):
+        j = n_prev + i
+        if j >= maxlen:
+            k = j - maxlen
+            old = (history[k] if k < n_prev else values[k - n_prev]) - shift
+            s -= old
+            sq -= old * old
+        new = values[i] - shift
+        s += new
+        sq += new * new
+    sums[0] = s
+    sums[1] = sq
+
+
 @njit(cache=True)
 def calculate_cvd_numba(
         sizes: np.ndarray,
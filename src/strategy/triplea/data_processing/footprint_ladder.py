@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+四号引擎增量足迹价格阶梯（Footprint Ladder）
+按量化价格档位累计最近 window_ticks 笔成交的主动买/卖量
+
+每笔新 Tick 加到所在档位，滑出窗口的旧 Tick 从其档位减去，
+读取时只需遍历当前窗口内出现过的档位，不再每个 Tick 重扫整段历史重建字典。
+"""
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+
+from src.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 档位数据下标: [主动买量, 主动卖量, 买单笔数, 卖单笔数]
+BUY_VOL, SELL_VOL, BUY_N, SELL_N = 0, 1, 2, 3
+
+
+class FootprintLadder:
+    """
+    滑动 Tick 窗口的足迹价格阶梯
+
+    档位键为整数 round(px / tick_size)，对应价格 key * tick_size。
+    某一侧的成交全部滑出窗口后该侧成交量直接归零，避免浮点加减残留；
+    两侧都为空的档位会被删除，因此 levels 只包含窗口内真实出现过的档位。
+    """
+
+    def __init__(self, tick_size: float, window_ticks: int):
+        """
+        Args:
+            tick_size: 最小价格变动单位（档位宽度）
+            window_ticks: 窗口长度（Tick 数）
+        """
+        if window_ticks <= 0:
+            raise ValueError(f"window_ticks必须为正数: {window_ticks}")
+        self.tick_size = max(tick_size, 1e-8)
+        self.window_ticks = window_ticks
+        self.levels: Dict[int, List[float]] = {}
+        self.total_volume = 0.0  # 窗口内正成交量之和（含方向未知的成交）
+        self._volume_n = 0
+        self._window: Deque[Tuple[int, float, int]] = deque()
+
+    def __len__(self) -> int:
+        """窗口内的 Tick 数"""
+        return len(self._window)
+
+    def level_key(self, px: float) -> int:
+        return int(round(px / self.tick_size))
+
+    def add(self, px: float, sz: float, side: int):
+        """追加一笔成交，超出窗口的最旧成交随之移出"""
+        if len(self._window) >= self.window_ticks:
+            self._remove(*self._window.popleft())
+
+        # 非正成交量只占窗口位置；方向未知的成交只计入总量，不计入任何档位
+        if sz <= 0:
+            self._window.append((0, 0.0, 0))
+            return
+        self.total_volume += sz
+        self._volume_n += 1
+        if side == 0:
+            self._window.append((0, sz, 0))
+            return
+
+        key = self.level_key(px)
+        self._window.append((key, sz, side))
+        level = self.levels.get(key)
+        if level is None:
+            level = self.levels[key] = [0.0, 0.0, 0, 0]
+        if side > 0:
+            level[BUY_VOL] += sz
+            level[BUY_N] += 1
+        else:
+            level[SELL_VOL] += sz
+            level[SELL_N] += 1
+
+    def _remove(self, key: int, sz: float, side: int):
+        if sz <= 0:
+            return
+        self._volume_n -= 1
+        self.total_volume = self.total_volume - sz if self._volume_n else 0.0
+        if side == 0:
+            return
+        level = self.levels[key]
+        if side > 0:
+            level[BUY_N] -= 1
+            level[BUY_VOL] = level[BUY_VOL] - sz if level[BUY_N] else 0.0
+        else:
+            level[SELL_N] -= 1
+            level[SELL_VOL] = level[SELL_VOL] - sz if level[SELL_N] else 0.0
+        if not level[BUY_N] and not level[SELL_N]:
+            del self.levels[key]
+
+    def rebuild(self, prices, sizes, sides, window_ticks: int = None, tick_size: float = None):
+        """用一段历史成交（按时间升序）重建阶梯，可同时调整窗口长度与档位宽度"""
+        if window_ticks is not None:
+            self.window_ticks = window_ticks
+        if tick_size is not None:
+            self.tick_size = max(tick_size, 1e-8)
+        self.clear()
+        start = max(len(prices) - self.window_ticks, 0)
+        for px, sz, side in zip(prices[start:], sizes[start:], sides[start:]):
+            self.add(float(px), float(sz), int(side))
+
+    def clear(self):
+        self.levels.clear()
+        self._window.clear()
+        self.total_volume = 0.0
+        self._volume_n = 0
+
+    def sorted_levels(self) -> List[Tuple[float, float, float]]:
+        """按价格升序返回 [(档位价格, 主动买量, 主动卖量), ...]"""
+        tick_size = self.tick_size
+        return [(key * tick_size, level[BUY_VOL], level[SELL_VOL])
+                for key, level in sorted(self.levels.items())]
+
+    def diagonal_imbalances(self, eps: float = 1e-8) -> List[Tuple[float, float, float]]:
+        """
+        对角失衡：档位 k 的主动买量 vs 档位 k-1 的主动卖量（卖方失衡则相反）
+
+        Returns:
+            [(档位价格, 买方对角失衡倍数, 卖方对角失衡倍数), ...]，缺失的相邻档位按 0 处理
+        """
+        tick_size = self.tick_size
+        levels = self.levels
+        empty = (0.0, 0.0, 0, 0)
+        result = []
+        for key in sorted(levels):
+            level = levels[key]
+            below = levels.get(key - 1, empty)
+            above = levels.get(key + 1, empty)
+            buy_ratio = level[BUY_VOL] / max(below[SELL_VOL], eps)
+            sell_ratio = level[SELL_VOL] / max(above[BUY_VOL], eps)
+            result.append((key * tick_size, buy_ratio, sell_ratio))
+        return result
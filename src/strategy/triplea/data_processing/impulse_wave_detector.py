@@ -4,16 +4,21 @@
 四号引擎v3.0 脉冲波检测器
 基于真实交易数据的专业脉冲波检测算法
 结合价格变化率、成交量异常、波动率突破等多维度指标
+
+Tick 写入结构化环形缓冲区，逐笔收益率与涨跌方向在写入时算好一次，
+回看窗口的起止价格/时间、方向计数都是 O(1) 读取；均值与标准差直接在零拷贝视图上做 numpy 规约，
+与原先先转 list 再建数组的实现结果逐位一致。
 """
 
 import time
-from collections import deque
-from dataclasses import dataclass, field
-from typing import List, Optional, Tuple, Dict, Deque
+from dataclasses import dataclass
+from typing import List, Optional, Dict
 from enum import Enum
 
 import numpy as np
 
+from src.strategy.triplea.core.clock import Clock, EventClock
+from src.strategy.triplea.core.ring_buffer import SoARingBuffer
 from src.strategy.triplea.core.data_structures import (
     NormalizedTick, KDEEngineConfig
 )
@@ -62,20 +67,31 @@ class ImpulseWaveDetector:
     基于多维度指标的专业脉冲波检测算法
     """
 
-    def __init__(self, config: KDEEngineConfig):
+    def __init__(self, config: KDEEngineConfig, clock: Optional[Clock] = None):
         """
         初始化脉冲波检测器
 
         Args:
             config: KDE引擎配置
+            clock: 时钟，默认使用由Tick时间戳驱动的EventClock
         """
         self.config = config
-
-        # 数据缓冲区
-        self.tick_buffer: Deque[NormalizedTick] = deque(maxlen=200)
-        self.price_buffer: Deque[float] = deque(maxlen=200)
-        self.volume_buffer: Deque[float] = deque(maxlen=200)
-        self.timestamp_buffer: Deque[int] = deque(maxlen=200)  # 纳秒时间戳
+        self.clock = clock if clock is not None else EventClock()
+
+        # 数据缓冲区：ts 纳秒时间戳；ret 相对上一笔的收益率；move 相对上一笔的涨跌方向（1/-1/0）
+        self.tick_buffer = SoARingBuffer(200, {
+            'ts': np.int64,
+            'px': np.float64,
+            'sz': np.float64,
+            'ret': np.float64,
+            'move': np.int8,
+        })
+        self._last_px: Optional[float] = None
+
+        # 回看窗口内 (lookback - 1) 个价格变动中上涨/下跌的笔数（滑动计数）
+        self._move_window = 0
+        self._up_moves = 0
+        self._down_moves = 0
 
         # 统计信息
         self.avg_volume: float = 0.0
@@ -108,10 +124,8 @@ class ImpulseWaveDetector:
         Returns:
             如果检测到脉冲波结束，返回脉冲波对象；否则返回None
         """
-        self.tick_buffer.append(tick)
-        self.price_buffer.append(tick.px)
-        self.volume_buffer.append(tick.sz)
-        self.timestamp_buffer.append(tick.ts)
+        self.clock.on_tick(tick.ts)
+        self._append_tick(tick)
         self.stats['total_ticks_processed'] += 1
 
         # 更新统计信息
@@ -135,18 +149,55 @@ class ImpulseWaveDetector:
 
         return completed_wave
 
+    def _append_tick(self, tick: NormalizedTick) -> None:
+        """写入环形缓冲，并滑动更新最近 (lookback - 1) 笔的涨跌计数"""
+        last_px = self._last_px
+        if last_px is None:
+            ret, move = 0.0, 0
+        else:
+            ret = (tick.px - last_px) / last_px
+            move = 1 if tick.px > last_px else (-1 if tick.px < last_px else 0)
+        self._last_px = tick.px
+
+        buffer = self.tick_buffer
+        window = self.config.lookback_window_ticks - 1
+        if window != self._move_window:
+            # 回看窗口长度变化（配置调整）时按缓冲重新计数
+            buffer.append(tick.ts, tick.px, tick.sz, ret, move)
+            self._move_window = window
+            self._recount_moves()
+            return
+
+        # 追加前窗口已满，则最旧的一笔随之滑出（第一笔 Tick 的 move 为 0，不影响计数）
+        if 0 < window < buffer.capacity and len(buffer) >= window:
+            leaving = buffer.view('move', window)[0]
+            if leaving > 0:
+                self._up_moves -= 1
+            elif leaving < 0:
+                self._down_moves -= 1
+        buffer.append(tick.ts, tick.px, tick.sz, ret, move)
+        if window > 0:
+            if move > 0:
+                self._up_moves += 1
+            elif move < 0:
+                self._down_moves += 1
+
+    def _recount_moves(self) -> None:
+        moves = self.tick_buffer.view('move', max(self._move_window, 0))
+        self._up_moves = int(np.count_nonzero(moves > 0))
+        self._down_moves = int(np.count_nonzero(moves < 0))
+
     def _update_statistics(self) -> None:
         """更新统计信息（成交量、波动率等）"""
-        if len(self.volume_buffer) >= 50:
-            volumes = np.array(list(self.volume_buffer)[-50:])
+        buffer = self.tick_buffer
+        if len(buffer) >= 50:
+            volumes = buffer.view('sz', 50)
             self.avg_volume = np.mean(volumes)
             self.volume_std = np.std(volumes)
 
-        if len(self.price_buffer) >= 100:
-            prices = np.array(list(self.price_buffer)[-100:])
-            returns = np.diff(prices) / prices[:-1]
-            if len(returns) > 0:
-                self.historical_volatility = np.std(returns)
+        if len(buffer) >= 100:
+            # 最近100笔价格之间的99个收益率
+            self.historical_volatility = np.std(buffer.view('ret', 99))
 
     def _detect_impulse_wave(self, current_tick: NormalizedTick) -> Dict:
         """
@@ -169,11 +220,10 @@ class ImpulseWaveDetector:
                 'confidence': 0.0
             }
 
-        # 提取回看窗口内的数据
-        recent_ticks = list(self.tick_buffer)[-lookback:]
-        recent_prices = np.array([t.px for t in recent_ticks])
-        recent_volumes = np.array([t.sz for t in recent_ticks])
-        recent_timestamps = np.array([t.ts for t in recent_ticks])
+        # 回看窗口的零拷贝视图
+        buffer = self.tick_buffer
+        recent_prices = buffer.view('px', lookback)
+        recent_timestamps = buffer.view('ts', lookback)
 
         # 计算时间窗口（纳秒转换为秒）
         time_window_ns = recent_timestamps[-1] - recent_timestamps[0]
@@ -185,18 +235,17 @@ class ImpulseWaveDetector:
         price_change_pct = abs((end_price - start_price) / start_price * 100)
 
         # 2. 计算成交量异常
-        recent_avg_volume = np.mean(recent_volumes)
+        recent_avg_volume = np.mean(buffer.view('sz', lookback))
         volume_multiplier = recent_avg_volume / self.avg_volume if self.avg_volume > 0 else 0
 
-        # 3. 计算波动率突破
-        recent_returns = np.diff(recent_prices) / recent_prices[:-1]
-        recent_volatility = np.std(recent_returns) if len(recent_returns) > 0 else 0
+        # 3. 计算波动率突破（窗口内 lookback 笔价格之间的 lookback - 1 个收益率）
+        recent_volatility = np.std(buffer.view('ret', lookback - 1)) if lookback > 1 else 0
         volatility_ratio = (recent_volatility / self.historical_volatility
                             if self.historical_volatility > 0 else 0)
 
         # 4. 计算价格变化方向一致性
         price_direction = 1 if end_price > start_price else -1
-        directional_consistency = self._calculate_directional_consistency(recent_prices)
+        directional_consistency = self._directional_consistency_from_counts(lookback - 1)
 
         # 5. 多维度评分
         confidence = self._calculate_confidence(
@@ -232,32 +281,11 @@ class ImpulseWaveDetector:
             'time_window_seconds': time_window_seconds
         }
 
-    def _calculate_directional_consistency(self, prices: np.ndarray) -> float:
-        """
-        计算价格变化方向一致性
-
-        Args:
-            prices: 价格数组
-
-        Returns:
-            一致性评分（0-1）
-        """
-        if len(prices) < 2:
+    def _directional_consistency_from_counts(self, total_diffs: int) -> float:
+        """用滑动涨跌计数计算方向一致性：窗口内主要方向（上涨或下跌）的价差数 / 价差总数（0-1）"""
+        if total_diffs <= 0:
             return 0.0
-
-        diffs = np.diff(prices)
-        positive_diffs = np.sum(diffs > 0)
-        negative_diffs = np.sum(diffs < 0)
-
-        total_diffs = len(diffs)
-        if total_diffs == 0:
-            return 0.0
-
-        # 计算主要方向的比例
-        max_same_direction = max(positive_diffs, negative_diffs)
-        consistency = max_same_direction / total_diffs
-
-        return consistency
+        return max(self._up_moves, self._down_moves) / total_diffs
 
     def _calculate_confidence(
             self,
@@ -318,7 +346,7 @@ class ImpulseWaveDetector:
     def _start_new_wave(self, tick: NormalizedTick, wave_result: Dict) -> None:
         """开始新的脉冲波"""
         self.current_wave = ImpulseWave(
-            start_time=time.time(),
+            start_time=self.clock.now(),
             start_price=tick.px,
             max_price=tick.px,
             min_price=tick.px,
@@ -359,7 +387,7 @@ class ImpulseWaveDetector:
         self.current_wave.net_volume += tick.sz if tick.side == 1 else -tick.sz
 
         # 检查脉冲波是否结束
-        wave_duration = time.time() - self.current_wave.start_time
+        wave_duration = self.clock.now() - self.current_wave.start_time
         is_expired = wave_duration > self.config.max_impulse_duration_seconds
 
         # 检查脉冲波是否被破坏（价格反向运动）
@@ -385,7 +413,7 @@ class ImpulseWaveDetector:
             raise RuntimeError("没有当前脉冲波可以完成")
 
         # 设置结束信息
-        self.current_wave.end_time = time.time()
+        self.current_wave.end_time = self.clock.now()
         self.current_wave.end_price = final_tick.px
         self.current_wave.is_active = False
 
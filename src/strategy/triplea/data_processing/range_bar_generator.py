@@ -7,7 +7,7 @@
 """
 
 from collections import deque
-from typing import Optional, List, Tuple, Deque
+from typing import Optional, List, Deque
 
 import numpy as np
 import pandas as pd
@@ -16,20 +16,40 @@ from numba import njit
 from src.strategy.triplea.core.data_structures import (
     NormalizedTick, RangeBar, RangeBarConfig
 )
+from src.utils.latency_histogram import get_latency_registry
 from src.utils.log import get_logger
 
 logger = get_logger(__name__)
 
+# 批量生成器输出的闭合Bar（ts 与输入 Tick 同单位，duration = close_ts - open_ts）
+RANGE_BAR_DTYPE = np.dtype([
+    ('open_ts', np.int64),
+    ('close_ts', np.int64),
+    ('duration', np.int64),
+    ('open_px', np.float64),
+    ('high_px', np.float64),
+    ('low_px', np.float64),
+    ('close_px', np.float64),
+    ('total_buy_vol', np.float64),
+    ('total_sell_vol', np.float64),
+    ('delta', np.float64),
+    ('tick_count', np.int64),
+])
+
+BAR_INT_STATE_SIZE = 3
+BAR_FLOAT_STATE_SIZE = 6
+
 
 class RangeBarGenerator:
     """Range Bar生成器（高性能无循环版本）"""
 
-    def __init__(self, config: RangeBarConfig):
+    def __init__(self, config: RangeBarConfig, latency_source: str = 'main'):
         """
         初始化Range Bar生成器
 
         Args:
             config: Range Bar配置
+            latency_source: 延迟直方图 range_bar 阶段的来源标签（main / shadow）
         """
         self.config = config
         self.current_bar: Optional[RangeBar] = None
@@ -43,6 +63,7 @@ class RangeBarGenerator:
             'avg_ticks_per_bar': 0.0,
             'total_processing_time_ns': 0
         }
+        self.latency_histogram = get_latency_registry().histogram('range_bar', latency_source)
 
         logger.info(f"RangeBarGenerator初始化完成，配置: {config}")
 
@@ -114,6 +135,7 @@ class RangeBarGenerator:
         finally:
             end_time = time.perf_counter_ns()
             self.stats['total_processing_time_ns'] += (end_time - start_time)
+            self.latency_histogram.record(end_time - start_time)
 
     def on_tick_batch(self, ticks: List[NormalizedTick]) -> List[RangeBar]:
         """
@@ -128,22 +150,89 @@ class RangeBarGenerator:
         if not ticks:
             return []
 
+        n = len(ticks)
+        return self.process_ticks(
+            np.fromiter((t.ts for t in ticks), dtype=np.int64, count=n),
+            np.fromiter((t.px for t in ticks), dtype=np.float64, count=n),
+            np.fromiter((t.sz for t in ticks), dtype=np.float64, count=n),
+            np.fromiter((t.side for t in ticks), dtype=np.int8, count=n)
+        )
+
+    def process_ticks(self, ts: np.ndarray, px: np.ndarray, sz: np.ndarray, side: np.ndarray) -> List[RangeBar]:
+        """
+        批量处理一段列式Tick（如一个WS帧），与逐笔 on_tick 结果相同
+
+        未闭合Bar在调用前后与 range_bar_kernel 的状态数组互相转换，因此可以与 on_tick 交替使用。
+
+        Args:
+            ts: 时间戳数组（int64）
+            px: 价格数组
+            sz: 成交量数组
+            side: 方向数组（1=买入，-1=卖出）
+
+        Returns:
+            闭合的RangeBar列表
+        """
+        n = len(px)
+        if n == 0:
+            return []
+
         import time
         start_time = time.perf_counter_ns()
 
         try:
-            completed_bars = []
+            int_state = np.zeros(BAR_INT_STATE_SIZE, dtype=np.int64)
+            float_state = np.zeros(BAR_FLOAT_STATE_SIZE, dtype=np.float64)
+            bar = self.current_bar
+            if bar is not None:
+                int_state[:] = (1, bar.open_ts, bar.tick_count)
+                float_state[:] = (self.open_px_base, bar.high_px, bar.low_px, bar.close_px,
+                                  bar.total_buy_vol, bar.total_sell_vol)
+
+            # 每笔Tick最多闭合一根Bar
+            out = np.zeros(n, dtype=RANGE_BAR_DTYPE)
+            n_bars = range_bar_kernel(
+                np.ascontiguousarray(ts, dtype=np.int64),
+                np.ascontiguousarray(px, dtype=np.float64),
+                np.ascontiguousarray(sz, dtype=np.float64),
+                np.ascontiguousarray(side, dtype=np.int8),
+                float(self.config.tick_size),
+                float(self.config.tick_range),
+                int_state,
+                float_state,
+                out['open_ts'], out['close_ts'], out['duration'],
+                out['open_px'], out['high_px'], out['low_px'], out['close_px'],
+                out['total_buy_vol'], out['total_sell_vol'], out['delta'], out['tick_count']
+            )
+
+            completed_bars = range_bars_from_array(out[:n_bars])
+            self.bar_history.extend(completed_bars)
 
-            for tick in ticks:
-                result = self.on_tick(tick)
-                if result is not None:
-                    completed_bars.append(result)
+            open_px, high_px, low_px, close_px, buy_vol, sell_vol = float_state.tolist()
+            self.current_bar = RangeBar(
+                open_ts=int(int_state[1]),
+                open_px=open_px,
+                high_px=high_px,
+                low_px=low_px,
+                close_px=close_px,
+                total_buy_vol=buy_vol,
+                total_sell_vol=sell_vol,
+                delta=buy_vol - sell_vol,
+                tick_count=int(int_state[2])
+            )
+            self.open_px_base = open_px
+
+            self.stats['ticks_processed'] += n
+            if n_bars:
+                self.stats['bars_generated'] += n_bars
+                self._update_stats()
 
             return completed_bars
 
         finally:
             end_time = time.perf_counter_ns()
             self.stats['total_processing_time_ns'] += (end_time - start_time)
+            self.latency_histogram.record((end_time - start_time) // n, n)
 
     def _close_bar_and_emit(self, overflow_tick: NormalizedTick) -> RangeBar:
         """
@@ -218,35 +307,100 @@ class RangeBarGenerator:
 
 
 class BatchRangeBarGenerator:
-    """批量Range Bar生成器（Numpy加速版本）"""
+    """
+    批量Range Bar生成器（Numba内核版本）
+
+    Tick 以列数组形式一次性交给 range_bar_kernel，闭合的 Bar 写入预分配的结构化输出数组，
+    未闭合 Bar 的状态保存在两个小数组里跨批次延续。逐 Tick 语义与 RangeBarGenerator.on_tick 完全一致。
+    """
 
-    def __init__(self, config: RangeBarConfig):
+    def __init__(self, config: RangeBarConfig, output_capacity: int = 1024):
         """
         初始化批量Range Bar生成器
 
         Args:
             config: Range Bar配置
+            output_capacity: 输出数组的初始容量（单批可闭合的Bar数，不足时自动扩容）
         """
         self.config = config
-
-        # 缓冲区
-        self.tick_buffer: List[NormalizedTick] = []
         self.bar_history: Deque[RangeBar] = deque(maxlen=config.max_bar_history)
 
-        # 当前Bar状态
-        self.current_bar: Optional[RangeBar] = None
-        self.open_px_base: float = 0.0
+        # 未闭合Bar的状态：整数部分 [是否有Bar, 开盘时间戳, Tick数]，浮点部分 [开, 高, 低, 收, 主动买量, 主动卖量]
+        self._int_state = np.zeros(BAR_INT_STATE_SIZE, dtype=np.int64)
+        self._float_state = np.zeros(BAR_FLOAT_STATE_SIZE, dtype=np.float64)
 
-        # 性能优化：预分配数组
-        self.buffer_size = 1000  # 缓冲区大小
-        self.price_buffer = np.zeros(self.buffer_size, dtype=np.float64)
-        self.side_buffer = np.zeros(self.buffer_size, dtype=np.int8)
-        self.size_buffer = np.zeros(self.buffer_size, dtype=np.float64)
-        self.ts_buffer = np.zeros(self.buffer_size, dtype=np.int64)
-        self.buffer_idx = 0
+        # 预分配的闭合Bar输出数组
+        self._output = np.zeros(output_capacity, dtype=RANGE_BAR_DTYPE)
+
+        self.stats = {
+            'bars_generated': 0,
+            'ticks_processed': 0
+        }
 
         logger.info(f"BatchRangeBarGenerator初始化完成，配置: {config}")
 
+    @property
+    def current_bar(self) -> Optional[RangeBar]:
+        """当前正在构建的Bar（由内核状态组装）"""
+        if not self._int_state[0]:
+            return None
+        open_px, high_px, low_px, close_px, buy_vol, sell_vol = self._float_state.tolist()
+        return RangeBar(
+            open_ts=int(self._int_state[1]),
+            open_px=open_px,
+            high_px=high_px,
+            low_px=low_px,
+            close_px=close_px,
+            total_buy_vol=buy_vol,
+            total_sell_vol=sell_vol,
+            delta=buy_vol - sell_vol,
+            tick_count=int(self._int_state[2])
+        )
+
+    @property
+    def open_px_base(self) -> float:
+        return float(self._float_state[0])
+
+    def add_tick_arrays(self, ts: np.ndarray, px: np.ndarray, sz: np.ndarray, side: np.ndarray) -> np.ndarray:
+        """
+        批量添加列式Tick并生成Bar
+
+        Args:
+            ts: 时间戳数组（int64）
+            px: 价格数组
+            sz: 成交量数组
+            side: 方向数组（1=买入，-1=卖出）
+
+        Returns:
+            本批闭合的Bar，RANGE_BAR_DTYPE结构化数组（拷贝）
+        """
+        n = len(px)
+        if n == 0:
+            return self._output[:0].copy()
+        if n > len(self._output):
+            self._output = np.zeros(max(n, 2 * len(self._output)), dtype=RANGE_BAR_DTYPE)
+
+        out = self._output
+        n_bars = range_bar_kernel(
+            np.ascontiguousarray(ts, dtype=np.int64),
+            np.ascontiguousarray(px, dtype=np.float64),
+            np.ascontiguousarray(sz, dtype=np.float64),
+            np.ascontiguousarray(side, dtype=np.int8),
+            float(self.config.tick_size),
+            float(self.config.tick_range),
+            self._int_state,
+            self._float_state,
+            out['open_ts'], out['close_ts'], out['duration'],
+            out['open_px'], out['high_px'], out['low_px'], out['close_px'],
+            out['total_buy_vol'], out['total_sell_vol'], out['delta'], out['tick_count']
+        )
+
+        bars = out[:n_bars].copy()
+        self.bar_history.extend(range_bars_from_array(bars))
+        self.stats['ticks_processed'] += n
+        self.stats['bars_generated'] += n_bars
+        return bars
+
     def add_ticks(self, ticks: List[NormalizedTick]) -> List[RangeBar]:
         """
         批量添加Tick并生成Bar
@@ -260,184 +414,357 @@ class BatchRangeBarGenerator:
         if not ticks:
             return []
 
-        # 将Tick添加到缓冲区
-        self.tick_buffer.extend(ticks)
-
-        # 处理缓冲区中的Tick
-        completed_bars = self._process_buffer()
-
-        return completed_bars
+        n = len(ticks)
+        bars = self.add_tick_arrays(
+            np.fromiter((t.ts for t in ticks), dtype=np.int64, count=n),
+            np.fromiter((t.px for t in ticks), dtype=np.float64, count=n),
+            np.fromiter((t.sz for t in ticks), dtype=np.float64, count=n),
+            np.fromiter((t.side for t in ticks), dtype=np.int8, count=n)
+        )
+        return range_bars_from_array(bars)
 
-    def _process_buffer(self) -> List[RangeBar]:
+    def flush(self) -> List[RangeBar]:
         """
-        处理缓冲区中的Tick（批量计算版本）
+        兼容旧接口：内核每批都会处理完全部Tick，没有待处理的缓冲
 
         Returns:
-            闭合的RangeBar列表
+            空列表（未闭合的Bar仍保留在 current_bar 中）
         """
-        if not self.tick_buffer:
-            return []
+        return []
 
-        completed_bars = []
+    def reset(self):
+        """重置生成器状态"""
+        self._int_state[:] = 0
+        self._float_state[:] = 0.0
+        self.bar_history.clear()
+        self.stats = {
+            'bars_generated': 0,
+            'ticks_processed': 0
+        }
+        logger.info("BatchRangeBarGenerator已重置")
 
-        # 如果当前没有活跃的Bar，初始化一个
-        if self.current_bar is None and self.tick_buffer:
-            first_tick = self.tick_buffer[0]
-            self.current_bar = RangeBar(
-                open_ts=first_tick.ts,
-                open_px=first_tick.px,
-                high_px=first_tick.px,
-                low_px=first_tick.px,
-                close_px=first_tick.px,
-                total_buy_vol=first_tick.sz if first_tick.side == 1 else 0.0,
-                total_sell_vol=first_tick.sz if first_tick.side == -1 else 0.0,
-                delta=first_tick.sz if first_tick.side == 1 else -first_tick.sz,
-                tick_count=1
-            )
-            self.open_px_base = first_tick.px
-            self.tick_buffer.pop(0)
 
-        # 处理剩余的Tick
-        while self.tick_buffer and self.current_bar:
-            tick = self.tick_buffer[0]
+class MultiRangeBarGenerator:
+    """
+    多阈值Range Bar生成器（一次遍历同时生成K种Bar大小）
 
-            # 更新当前Bar
-            self.current_bar.high_px = max(self.current_bar.high_px, tick.px)
-            self.current_bar.low_px = min(self.current_bar.low_px, tick.px)
-            self.current_bar.close_px = tick.px
+    研究/参数扫描用：同一段Tick只遍历一次，每个阈值各自维护未闭合Bar，
+    输出为每个阈值一组列数组（struct-of-arrays），逐 Tick 语义与 RangeBarGenerator.on_tick 一致。
 
-            if tick.side == 1:
-                self.current_bar.total_buy_vol += tick.sz
-            else:
-                self.current_bar.total_sell_vol += tick.sz
+    用法:
+        generator = MultiRangeBarGenerator([75, 150, 300])
+        bars = generator.add_tick_arrays(ts, px, sz, side)
+        df_150 = pd.DataFrame(bars[150])
+    """
 
-            self.current_bar.delta = self.current_bar.total_buy_vol - self.current_bar.total_sell_vol
-            self.current_bar.tick_count += 1
+    def __init__(self, tick_ranges, tick_size: float = 0.01, output_capacity: int = 1024):
+        """
+        Args:
+            tick_ranges: 各Bar大小（位移Tick数）
+            tick_size: 最小价格变动单位
+            output_capacity: 每个阈值单批可闭合Bar数的初始容量（不足时自动扩容）
+        """
+        self.tick_ranges = np.asarray(tick_ranges, dtype=np.float64)
+        if self.tick_ranges.ndim != 1 or len(self.tick_ranges) == 0:
+            raise ValueError(f"tick_ranges必须是非空一维序列: {tick_ranges}")
+        self.tick_size = tick_size
+        k = len(self.tick_ranges)
+        self._keys = [int(r) if float(r).is_integer() else float(r) for r in self.tick_ranges]
+
+        self._int_state = np.zeros((k, BAR_INT_STATE_SIZE), dtype=np.int64)
+        self._float_state = np.zeros((k, BAR_FLOAT_STATE_SIZE), dtype=np.float64)
+        self._n_bars = np.zeros(k, dtype=np.int64)
+        self._columns = self._allocate(output_capacity)
+
+        logger.info(f"MultiRangeBarGenerator初始化完成，阈值: {self._keys}, tick_size: {tick_size}")
+
+    @classmethod
+    def from_percentages(cls, percentages, reference_price: float, tick_size: float = 0.01,
+                         **kwargs) -> 'MultiRangeBarGenerator':
+        """
+        按价格百分比指定Bar大小（在参考价格处换算为Tick数，如 0.05% @ 3000 = 150 ticks）
 
-            # 检查是否触发闭合条件
-            displacement = abs(tick.px - self.open_px_base) / self.config.tick_size
-            if displacement >= self.config.tick_range:  # 达到tick_range个Tick位移（150ticks=1.5U）
-                completed_bar = self.current_bar
-                self.bar_history.append(completed_bar)
-                completed_bars.append(completed_bar)
+        Args:
+            percentages: Bar大小（百分比，0.1 表示 0.1%）
+            reference_price: 换算用的参考价格
+            tick_size: 最小价格变动单位
+        """
+        tick_ranges = [round(pct / 100 * reference_price / tick_size) for pct in percentages]
+        return cls(tick_ranges, tick_size=tick_size, **kwargs)
 
-                # 新开Bar，使用当前Tick
-                self.current_bar = RangeBar(
-                    open_ts=tick.ts,
-                    open_px=tick.px,
-                    high_px=tick.px,
-                    low_px=tick.px,
-                    close_px=tick.px,
-                    total_buy_vol=tick.sz if tick.side == 1 else 0.0,
-                    total_sell_vol=tick.sz if tick.side == -1 else 0.0,
-                    delta=tick.sz if tick.side == 1 else -tick.sz,
-                    tick_count=1
-                )
-                self.open_px_base = tick.px
-            else:
-                # 移除已处理的Tick
-                self.tick_buffer.pop(0)
+    def _allocate(self, capacity: int) -> dict:
+        k = len(self.tick_ranges)
+        return {name: np.zeros((k, capacity), dtype=RANGE_BAR_DTYPE[name]) for name in RANGE_BAR_DTYPE.names}
 
-        return completed_bars
+    def _grow(self):
+        old = self._columns
+        capacity = old['open_ts'].shape[1]
+        self._columns = self._allocate(2 * capacity)
+        for name, column in old.items():
+            self._columns[name][:, :capacity] = column
 
-    def flush(self) -> List[RangeBar]:
+    def add_tick_arrays(self, ts: np.ndarray, px: np.ndarray, sz: np.ndarray, side: np.ndarray) -> dict:
         """
-        强制处理缓冲区中的所有Tick
+        批量添加列式Tick，同时推进所有阈值
 
         Returns:
-            闭合的RangeBar列表
+            {阈值: {字段名: 本批闭合Bar的列数组}}，字段同 RANGE_BAR_DTYPE
         """
-        completed_bars = []
-
-        while self.tick_buffer:
-            bars = self._process_buffer()
-            completed_bars.extend(bars)
-
-        return completed_bars
+        ts = np.ascontiguousarray(ts, dtype=np.int64)
+        px = np.ascontiguousarray(px, dtype=np.float64)
+        sz = np.ascontiguousarray(sz, dtype=np.float64)
+        side = np.ascontiguousarray(side, dtype=np.int8)
+
+        self._n_bars[:] = 0
+        pos = 0
+        while True:
+            columns = self._columns
+            pos = multi_range_bar_kernel(
+                ts, px, sz, side, pos, float(self.tick_size), self.tick_ranges,
+                self._int_state, self._float_state, self._n_bars,
+                columns['open_ts'], columns['close_ts'], columns['duration'],
+                columns['open_px'], columns['high_px'], columns['low_px'], columns['close_px'],
+                columns['total_buy_vol'], columns['total_sell_vol'], columns['delta'], columns['tick_count']
+            )
+            if pos >= len(px):
+                break
+            # 某个阈值的输出已满：扩容后从中断处继续
+            self._grow()
+
+        return {
+            key: {name: column[j, :self._n_bars[j]].copy() for name, column in self._columns.items()}
+            for j, key in enumerate(self._keys)
+        }
 
     def reset(self):
-        """重置生成器状态"""
-        self.current_bar = None
-        self.open_px_base = 0.0
-        self.tick_buffer.clear()
-        self.bar_history.clear()
-        self.buffer_idx = 0
-        logger.info("BatchRangeBarGenerator已重置")
+        """重置所有阈值的未闭合Bar"""
+        self._int_state[:] = 0
+        self._float_state[:] = 0.0
+        logger.info("MultiRangeBarGenerator已重置")
+
+
+def range_bars_from_array(bars: np.ndarray) -> List[RangeBar]:
+    """把 RANGE_BAR_DTYPE 结构化数组转换为 RangeBar 对象列表"""
+    return [
+        RangeBar(
+            open_ts=int(bar['open_ts']),
+            open_px=float(bar['open_px']),
+            high_px=float(bar['high_px']),
+            low_px=float(bar['low_px']),
+            close_px=float(bar['close_px']),
+            total_buy_vol=float(bar['total_buy_vol']),
+            total_sell_vol=float(bar['total_sell_vol']),
+            delta=float(bar['delta']),
+            tick_count=int(bar['tick_count'])
+        )
+        for bar in bars
+    ]
 
 
 # Numba加速函数
 @njit(cache=True)
-def compute_displacement_batch(
-        prices: np.ndarray,
-        open_price: float,
-        tick_range: float
-) -> np.ndarray:
-    """
-    批量计算价格位移
-
-    Args:
-        prices: 价格数组
-        open_price: 开盘价
-        tick_range: Tick范围
-
-    Returns:
-        位移数组（以Tick_range为单位）
+def range_bar_kernel(
+        ts: np.ndarray,
+        px: np.ndarray,
+        sz: np.ndarray,
+        side: np.ndarray,
+        tick_size: float,
+        tick_range: float,
+        int_state: np.ndarray,
+        float_state: np.ndarray,
+        out_open_ts: np.ndarray,
+        out_close_ts: np.ndarray,
+        out_duration: np.ndarray,
+        out_open: np.ndarray,
+        out_high: np.ndarray,
+        out_low: np.ndarray,
+        out_close: np.ndarray,
+        out_buy: np.ndarray,
+        out_sell: np.ndarray,
+        out_delta: np.ndarray,
+        out_count: np.ndarray
+) -> int:
     """
-    displacements = np.abs(prices - open_price) / tick_range
-    return displacements
-
+    Range Bar 生成内核（逐 Tick 语义与 RangeBarGenerator.on_tick 相同）
 
-@njit(cache=True)
-def update_bar_stats_batch(
-        high_px: float,
-        low_px: float,
-        prices: np.ndarray
-) -> Tuple[float, float]:
-    """
-    批量更新Bar统计
+    - 第一笔 Tick 开出新 Bar；其后每笔更新高低收、主动买卖量与 Tick 数
+    - |px - 开盘价| / tick_size >= tick_range 时闭合：触发 Tick 计入被闭合的 Bar，同时作为下一根 Bar 的第一笔
 
     Args:
-        high_px: 当前最高价
-        low_px: 当前最低价
-        prices: 价格数组
+        ts, px, sz, side: 本批 Tick 列数组
+        tick_size: 最小价格变动单位
+        tick_range: 闭合所需的位移（Tick 数）
+        int_state: 未闭合 Bar 的整数状态 [是否有Bar, 开盘时间戳, Tick数]，原地更新
+        float_state: 未闭合 Bar 的浮点状态 [开, 高, 低, 收, 主动买量, 主动卖量]，原地更新
+        out_*: 闭合 Bar 的输出列（长度 >= len(px)）
 
     Returns:
-        更新后的(high_px, low_px)
+        本批闭合的 Bar 数
     """
-    max_price = np.max(prices)
-    min_price = np.min(prices)
-
-    new_high = max(high_px, max_price)
-    new_low = min(low_px, min_price)
-
-    return new_high, new_low
+    has_bar = int_state[0]
+    open_ts = int_state[1]
+    tick_count = int_state[2]
+    open_px = float_state[0]
+    high_px = float_state[1]
+    low_px = float_state[2]
+    close_px = float_state[3]
+    buy_vol = float_state[4]
+    sell_vol = float_state[5]
+
+    n_bars = 0
+    for i in range(len(px)):
+        p = px[i]
+        s = sz[i]
+        d = side[i]
+
+        if has_bar == 0:
+            has_bar = 1
+            open_ts = ts[i]
+            open_px = p
+            high_px = p
+            low_px = p
+            close_px = p
+            buy_vol = s if d == 1 else 0.0
+            sell_vol = s if d == -1 else 0.0
+            tick_count = 1
+            continue
+
+        if p > high_px:
+            high_px = p
+        if p < low_px:
+            low_px = p
+        close_px = p
+        if d == 1:
+            buy_vol += s
+        else:
+            sell_vol += s
+        tick_count += 1
+
+        if abs(p - open_px) / tick_size >= tick_range:
+            out_open_ts[n_bars] = open_ts
+            out_close_ts[n_bars] = ts[i]
+            out_duration[n_bars] = ts[i] - open_ts
+            out_open[n_bars] = open_px
+            out_high[n_bars] = high_px
+            out_low[n_bars] = low_px
+            out_close[n_bars] = close_px
+            out_buy[n_bars] = buy_vol
+            out_sell[n_bars] = sell_vol
+            out_delta[n_bars] = buy_vol - sell_vol
+            out_count[n_bars] = tick_count
+            n_bars += 1
+
+            # 触发闭合的 Tick 开出下一根 Bar
+            open_ts = ts[i]
+            open_px = p
+            high_px = p
+            low_px = p
+            close_px = p
+            buy_vol = s if d == 1 else 0.0
+            sell_vol = s if d == -1 else 0.0
+            tick_count = 1
+
+    int_state[0] = has_bar
+    int_state[1] = open_ts
+    int_state[2] = tick_count
+    float_state[0] = open_px
+    float_state[1] = high_px
+    float_state[2] = low_px
+    float_state[3] = close_px
+    float_state[4] = buy_vol
+    float_state[5] = sell_vol
+    return n_bars
 
 
 @njit(cache=True)
-def accumulate_volume_batch(
-        total_buy_vol: float,
-        total_sell_vol: float,
-        sizes: np.ndarray,
-        sides: np.ndarray
-) -> Tuple[float, float]:
+def multi_range_bar_kernel(
+        ts: np.ndarray,
+        px: np.ndarray,
+        sz: np.ndarray,
+        side: np.ndarray,
+        start: int,
+        tick_size: float,
+        tick_ranges: np.ndarray,
+        int_state: np.ndarray,
+        float_state: np.ndarray,
+        n_bars: np.ndarray,
+        out_open_ts: np.ndarray,
+        out_close_ts: np.ndarray,
+        out_duration: np.ndarray,
+        out_open: np.ndarray,
+        out_high: np.ndarray,
+        out_low: np.ndarray,
+        out_close: np.ndarray,
+        out_buy: np.ndarray,
+        out_sell: np.ndarray,
+        out_delta: np.ndarray,
+        out_count: np.ndarray
+) -> int:
     """
-    批量累积成交量
+    多阈值 Range Bar 内核：Tick 只遍历一次，内层对 K 个阈值分别推进（单阈值语义同 range_bar_kernel）
 
-    Args:
-        total_buy_vol: 当前买入成交量
-        total_sell_vol: 当前卖出成交量
-        sizes: 成交量数组
-        sides: 方向数组（1=买入，-1=卖出）
+    状态与输出都是二维的，第 j 行对应 tick_ranges[j]；n_bars[j] 为第 j 个阈值已写入的Bar数。
+    任一阈值的输出列写满时提前返回，调用方扩容后以返回值作为 start 继续。
 
     Returns:
-        更新后的(total_buy_vol, total_sell)
+        下一笔待处理 Tick 的下标（== len(px) 表示全部处理完）
     """
-    buy_mask = sides == 1
-    sell_mask = sides == -1
-
-    total_buy = total_buy_vol + np.sum(sizes[buy_mask])
-    total_sell = total_sell_vol + np.sum(sizes[sell_mask])
-
-    return total_buy, total_sell
-
-
+    k = len(tick_ranges)
+    capacity = out_open_ts.shape[1]
+    for i in range(start, len(px)):
+        for j in range(k):
+            if n_bars[j] >= capacity:
+                return i
+
+        p = px[i]
+        s = sz[i]
+        d = side[i]
+        for j in range(k):
+            if int_state[j, 0] == 0:
+                int_state[j, 0] = 1
+                int_state[j, 1] = ts[i]
+                int_state[j, 2] = 1
+                float_state[j, 0] = p
+                float_state[j, 1] = p
+                float_state[j, 2] = p
+                float_state[j, 3] = p
+                float_state[j, 4] = s if d == 1 else 0.0
+                float_state[j, 5] = s if d == -1 else 0.0
+                continue
+
+            if p > float_state[j, 1]:
+                float_state[j, 1] = p
+            if p < float_state[j, 2]:
+                float_state[j, 2] = p
+            float_state[j, 3] = p
+            if d == 1:
+                float_state[j, 4] += s
+            else:
+                float_state[j, 5] += s
+            int_state[j, 2] += 1
+
+            if abs(p - float_state[j, 0]) / tick_size >= tick_ranges[j]:
+                b = n_bars[j]
+                out_open_ts[j, b] = int_state[j, 1]
+                out_close_ts[j, b] = ts[i]
+                out_duration[j, b] = ts[i] - int_state[j, 1]
+                out_open[j, b] = float_state[j, 0]
+                out_high[j, b] = float_state[j, 1]
+                out_low[j, b] = float_state[j, 2]
+                out_close[j, b] = float_state[j, 3]
+                out_buy[j, b] = float_state[j, 4]
+                out_sell[j, b] = float_state[j, 5]
+                out_delta[j, b] = float_state[j, 4] - float_state[j, 5]
+                out_count[j, b] = int_state[j, 2]
+                n_bars[j] = b + 1
+
+                # 触发闭合的 Tick 开出下一根 Bar
+                int_state[j, 1] = ts[i]
+                int_state[j, 2] = 1
+                float_state[j, 0] = p
+                float_state[j, 1] = p
+                float_state[j, 2] = p
+                float_state[j, 3] = p
+                float_state[j, 4] = s if d == 1 else 0.0
+                float_state[j, 5] = s if d == -1 else 0.0
+    return len(px)
@@ -0,0 +1,22 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author     : Zijun Deng
+@Date       : 3/14/26 10:05 PM
+@File       : __init__.py
+@Description: 四号引擎离线回放模块 - 成交磁带极速回放与信号评估
+"""
+
+from .tick_replay import (
+    TripleAReplay,
+    ReplayResult,
+    drive_coroutine,
+    make_synthetic_ticks
+)
+
+__all__ = [
+    'TripleAReplay',
+    'ReplayResult',
+    'drive_coroutine',
+    'make_synthetic_ticks'
+]
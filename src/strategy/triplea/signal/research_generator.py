@@ -4,8 +4,11 @@
 影子引擎专用信号生成器（适配v3.0状态机）
 """
 import time
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
+import numpy as np
+
+from src.strategy.triplea.core.clock import Clock
 from src.strategy.triplea.signal.signal_generator import TripleASignalGenerator
 from src.strategy.triplea.state_machine.state_machine import TripleAState
 from src.utils.log import get_logger
@@ -23,8 +26,9 @@ class ResearchTripleASignalGenerator(TripleASignalGenerator):
     4. 增强信号数据（供orchestrator写入CSV）
     """
 
-    def __init__(self, symbol: str = "ETH-USDT-SWAP", account_size_usdt: float = 300.0):
-        super().__init__(symbol, is_shadow=True, account_size_usdt=account_size_usdt)
+    def __init__(self, symbol: str = "ETH-USDT-SWAP", account_size_usdt: float = 300.0,
+                 clock: Optional[Clock] = None):
+        super().__init__(symbol, is_shadow=True, account_size_usdt=account_size_usdt, clock=clock)
 
         # 状态转换时间戳跟踪（适配v3.0 5状态模型）
         self.state_timestamps = {
@@ -75,6 +79,18 @@ class ResearchTripleASignalGenerator(TripleASignalGenerator):
 
         return signal
 
+    async def process_ticks(self, ticks: np.ndarray) -> List[Dict]:
+        """重写：研究数据（状态时间戳、阶段指标、MFE/MAE）需要逐笔的状态，这里逐笔走 process_tick"""
+        signals = []
+        fills = ticks['fills'].tolist() if 'fills' in ticks.dtype.names else [1] * len(ticks)
+        for ts, px, sz, side, n_fills in zip(ticks['ts'].tolist(), ticks['px'].tolist(),
+                                             ticks['sz'].tolist(), ticks['side'].tolist(), fills):
+            tick = {'price': px, 'size': sz, 'side': 'buy' if side == 1 else 'sell', 'ts': ts, 'fills': n_fills}
+            signal = await self.process_tick(tick)
+            if signal:
+                signals.append(signal)
+        return signals
+
     def _track_state_transitions(self):
         """跟踪状态机状态转换并记录时间戳"""
         current_state = self.state_machine.context.current_state
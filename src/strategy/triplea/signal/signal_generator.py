@@ -4,12 +4,16 @@
 四号引擎v3.0 信号生成器（集成状态机）
 """
 import time
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any
 
+import numpy as np
+
+from src.strategy.triplea.core.clock import Clock
 from src.strategy.triplea.core.data_structures import (
     TripleAEngineConfig, NormalizedTick
 )
 from src.strategy.triplea.state_machine.state_machine import TripleAStateMachine, TripleAState
+from src.utils.latency_histogram import get_latency_registry
 from src.utils.log import get_logger
 
 logger = get_logger(__name__)
@@ -22,7 +26,8 @@ class TripleASignalGenerator:
     保持与现有orchestrator.py接口100%兼容。
     """
 
-    def __init__(self, symbol: str = "ETH-USDT-SWAP", is_shadow: bool = False, account_size_usdt: float = 300.0):
+    def __init__(self, symbol: str = "ETH-USDT-SWAP", is_shadow: bool = False, account_size_usdt: float = 300.0,
+                 clock: Optional[Clock] = None):
         self.symbol = symbol
         self.is_shadow = is_shadow
 
@@ -43,7 +48,8 @@ class TripleASignalGenerator:
             self.config.risk_manager.min_rr_ratio = 1.5  # 影子引擎降低盈亏比要求
 
         # 初始化状态机（核心算法引擎）
-        self.state_machine = TripleAStateMachine(self.config, is_shadow=is_shadow)
+        # clock为None时状态机使用由Tick时间戳驱动的EventClock
+        self.state_machine = TripleAStateMachine(self.config, is_shadow=is_shadow, clock=clock)
 
         # 兼容性属性（供orchestrator和轨迹矿工访问）
         self.status = "IDLE"  # 兼容性状态（映射到状态机状态）
@@ -65,6 +71,7 @@ class TripleASignalGenerator:
         # 性能监控
         self.processed_ticks = 0
         self.last_signal_time = 0.0
+        self.signal_latency = get_latency_registry().histogram('signal_emit', 'shadow' if is_shadow else 'main')
 
         logger.info(f"TripleASignalGenerator 初始化完成 (symbol={symbol}, is_shadow={is_shadow})")
 
@@ -72,7 +79,7 @@ class TripleASignalGenerator:
         """处理单个Tick，驱动状态机并返回交易信号（兼容性接口）
 
         Args:
-            tick: 包含price, size, side, ts字段的字典
+            tick: 包含price, size, side, ts字段的字典（可选 fills：同价聚合前的成交笔数）
 
         Returns:
             交易信号字典（如果状态机生成信号），否则返回None
@@ -84,7 +91,7 @@ class TripleASignalGenerator:
             normalized_tick = self._convert_to_normalized_tick(tick)
 
             # 2. 驱动状态机处理Tick
-            state_machine_signal = await self.state_machine.process_tick(normalized_tick)
+            state_machine_signal = await self.state_machine.process_tick(normalized_tick, int(tick.get('fills', 1)))
 
             # 3. 同步状态机状态到兼容性状态
             self._sync_state_from_state_machine()
@@ -99,6 +106,47 @@ class TripleASignalGenerator:
             logger.error(f"处理Tick时出错: {e}", exc_info=True)
             return None
 
+    async def process_ticks(self, ticks: np.ndarray) -> List[Dict]:
+        """批量处理一个WS帧里的全部成交，返回按时间顺序的交易信号（兼容性格式）
+
+        逐笔语义与对每笔调用 process_tick 相同，但整帧一次性交给状态机的 process_ticks。
+
+        Args:
+            ticks: TRADE_TAPE_DTYPE 结构化数组（ts 为毫秒，side 1=买入，其余视为卖出），
+                   可由 src.data_feed.trade_tape.encode_trades 从 OKX trades 消息生成；
+                   也可以是同价聚合后的 AGGREGATED_TRADE_DTYPE 数组（fills 列传给状态机）
+
+        Returns:
+            交易信号列表，没有信号时为空列表
+        """
+        n = len(ticks)
+        if n == 0:
+            return []
+        self.processed_ticks += n
+
+        signals = []
+
+        def on_signal(_, state_machine_signal: Dict):
+            # 信号产生时上下文仍停留在该笔Tick，此时同步兼容性状态与逐笔处理一致
+            self._sync_state_from_state_machine()
+            signals.append(self._convert_state_machine_signal(state_machine_signal))
+
+        try:
+            await self.state_machine.process_ticks(
+                ticks['ts'].astype(np.int64) * 1_000_000,  # 毫秒转纳秒
+                ticks['px'],
+                ticks['sz'],
+                np.where(ticks['side'] == 1, 1, -1).astype(np.int8),
+                on_signal=on_signal,
+                fills=ticks['fills'] if 'fills' in ticks.dtype.names else None
+            )
+        except Exception as e:
+            logger.error(f"批量处理Tick时出错: {e}", exc_info=True)
+        finally:
+            self._sync_state_from_state_machine()
+
+        return signals
+
     def _convert_to_normalized_tick(self, tick_dict: Dict) -> NormalizedTick:
         """将orchestrator tick字典转换为NormalizedTick"""
         # 原始tick格式：{'price': 3000.0, 'size': 1.0, 'side': 'buy', 'ts': 1234567890000}
@@ -168,6 +216,8 @@ class TripleASignalGenerator:
             ...
         }
         """
+        start_time_ns = time.perf_counter_ns()
+
         # 提取状态机信号中的关键信息
         action = state_machine_signal.get('action', '')
         price = state_machine_signal.get('price', 0.0)
@@ -207,6 +257,7 @@ class TripleASignalGenerator:
         else:
             logger.info(log_message)
 
+        self.signal_latency.record(time.perf_counter_ns() - start_time_ns)
         return compatible_signal
 
     def _reset_to_idle(self):
@@ -9,14 +9,16 @@
 
 import asyncio
 import time
-from collections import deque
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Optional, Dict, List, Any, Tuple
+from typing import Optional, Dict, List, Any, Tuple, Callable
 
 import numpy as np
 
 from src.strategy.triplea.data_processing.cvd_calculator import CVDCalculator
+from src.strategy.triplea.data_processing.footprint_ladder import FootprintLadder
+from src.strategy.triplea.core.clock import Clock, EventClock, WallClock
+from src.strategy.triplea.core.ring_buffer import TickRingBuffer, time_window_bounds
 from src.strategy.triplea.core.data_structures import (
     NormalizedTick, TripleAEngineConfig
 )
@@ -24,7 +26,9 @@ from src.strategy.triplea.lvn.lvn_manager import LVNManager
 from src.strategy.triplea.data_processing.range_bar_generator import RangeBarGenerator
 from src.strategy.triplea.risk.risk_manager import RiskManager
 from src.strategy.triplea.kde.kde_engine import KDEEngine
+from src.utils.latency_histogram import LatencyHistogram, get_latency_registry
 from src.utils.log import get_logger
+from src.utils.rolling_quantile import RollingQuantile
 
 logger = get_logger(__name__)
 
@@ -65,6 +69,9 @@ class StateContext:
     # 是否为影子引擎
     is_shadow: bool = False
 
+    # 时钟（状态切换时间、事件时间戳均取自它）
+    clock: Clock = field(default_factory=WallClock, repr=False)
+
     # 活跃的LVN区域信息
     active_lvn_region: Optional[Dict[str, Any]] = None
     lvn_regions: List[Dict[str, Any]] = field(default_factory=list)
@@ -96,6 +103,7 @@ class StateContext:
     large_order_hits: int = 0
     large_order_ratio: float = 0.0
     large_order_direction: Optional[str] = None  # "BULLISH" / "BEARISH" / "NEUTRAL"
+    large_order_fills_per_aggressor: float = 0.0  # 命中大单的平均成交笔数（同价聚合后才大于1）
     footprint_imbalance_detected: bool = False
     footprint_max_imbalance: float = 0.0
     footprint_consecutive_levels: int = 0
@@ -118,7 +126,6 @@ class StateContext:
     # 性能统计
     stats: Dict[str, Any] = field(default_factory=lambda: {
         'total_ticks_processed': 0,
-        'avg_processing_time_ns': 0,
         'state_transitions': 0,
         'events_triggered': 0,
         'cvd_divergence_count': 0,
@@ -140,7 +147,7 @@ class StateContext:
         if old_state == new_state:
             return
 
-        current_time = time.time()
+        current_time = self.clock.now()
 
         # 检查是否与最近一次状态转换相同（在1秒内）
         if self.last_state_transition:
@@ -278,7 +285,7 @@ class StateContext:
         # 保存到历史（完整细节）
         self.event_history.append((
             event,
-            time.time(),
+            self.clock.now(),
             details
         ))
         self.stats['events_triggered'] += 1
@@ -304,25 +311,29 @@ class TripleAStateMachine:
     - ACCUMULATING -> IDLE: 波动率压缩失败或超时（120秒）
     """
 
-    def __init__(self, config: TripleAEngineConfig, is_shadow: bool = False):
+    def __init__(self, config: TripleAEngineConfig, is_shadow: bool = False, clock: Optional[Clock] = None):
         """
         初始化状态机
 
         Args:
             config: 四号引擎完整配置
             is_shadow: 是否为影子引擎
+            clock: 时钟，默认使用由Tick时间戳驱动的EventClock
         """
         self.config = config
         self.is_shadow = is_shadow
+        self.clock = clock if clock is not None else EventClock()
 
         # 核心组件初始化
         # 注释掉KDE和LVN，暂时不运行
         self.kde_engine = None  # KDEEngine(config)
         self.lvn_manager = None  # LVNManager(config.kde_engine)
+        latency_source = 'shadow' if is_shadow else 'main'
         self.cvd_calculator = CVDCalculator(
-            window_sizes=[60, 120, 240, 500, 1000]  # 多时间窗口分析，包含1000窗口
+            window_sizes=[60, 120, 240, 500, 1000],  # 多时间窗口分析，包含1000窗口
+            latency_source=latency_source
         )
-        self.range_bar_generator = RangeBarGenerator(config.range_bar)
+        self.range_bar_generator = RangeBarGenerator(config.range_bar, latency_source)
         self.risk_manager = RiskManager(config.risk_manager)
 
         # 事件循环检测
@@ -334,7 +345,8 @@ class TripleAStateMachine:
             self.loop_running = False
 
         # 状态机上下文
-        self.context = StateContext(is_shadow=is_shadow)
+        self.context = StateContext(is_shadow=is_shadow, clock=self.clock)
+        self.context.state_enter_time = self.clock.now()
 
         # 时间窗口配置（秒）
         self.monitoring_timeout = 120  # 监控状态超时（2分钟）
@@ -372,21 +384,31 @@ class TripleAStateMachine:
         self.large_order_ratio_window_ticks = 30  # 比例触发窗口（最近M ticks）
         self.large_order_ratio_threshold = 0.20  # 比例触发阈值（15%~25%）
         self.large_order_cooldown_seconds = 8.0  # 大单触发冷却期
+        self.large_order_min_fills_per_aggressor = 1.0  # 命中大单的最小平均成交笔数（1=不限制，需开启同价聚合）
         self.last_large_order_trigger_ts = 0.0
         self.footprint_imbalance_threshold = 3.0  # 足迹失衡阈值（倍数）
         self.min_consecutive_levels = 3  # 最小连续失衡档位数
         self.footprint_window_ticks = 120  # 足迹聚合窗口（建议80~200）
         self.footprint_min_total_volume = 20.0  # 足迹最小总成交量门槛
 
-        # 实时数据缓存（用于计算指标）
-        self.price_buffer = deque(maxlen=1000)
-        self.tick_time_buffer = deque(maxlen=1000)
-        self.order_size_buffer = deque(maxlen=1000)
-        self.tick_side_buffer = deque(maxlen=1000)
-        self.tick_price_buffer = deque(maxlen=1000)
-
-        # 性能监控
-        self.processing_times = deque(maxlen=100)
+        # 实时数据缓存（用于计算指标）：所有检测器共享的 SoA 环形缓冲，按需取零拷贝视图
+        self.tick_buffer = TickRingBuffer(capacity=1000)
+        # 足迹价格阶梯随 Tick 增量维护，足迹检测不再每次重扫窗口
+        self.footprint_ladder = FootprintLadder(self.config.market.tick_size, self.footprint_window_ticks)
+        # 大单时间窗内成交量的有序窗口，分位数阈值 O(1) 读取（与 np.percentile 结果一致）
+        self.large_order_sizes = RollingQuantile(maxlen=self.tick_buffer.capacity)
+        self._large_order_cutoff = float('-inf')
+
+        # 批量处理（process_ticks）期间尚未计入CVD的Tick：(ts, px, sz, side) 列数组与已同步/已写入缓冲的位置
+        self._cvd_block: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None
+        self._cvd_synced = 0
+        self._cvd_cursor = 0
+
+        # 性能监控：每笔Tick的处理耗时计入进程级延迟直方图（state_machine 阶段，主/影子分开，供 Prometheus 抓取），
+        # 同时计入本实例自己的直方图（get_performance_stats 只反映本实例，reset() 时清零）
+        self.latency_histogram = get_latency_registry().histogram(
+            'state_machine', 'shadow' if self.is_shadow else 'main')
+        self.processing_latency = LatencyHistogram()
         self.last_processing_time_ns = 0
 
         # 根据是否为影子引擎决定日志级别
@@ -400,12 +422,13 @@ class TripleAStateMachine:
         else:
             logger.info(f"状态模型: IDLE → MONITORING → CONFIRMED → ACCUMULATING → POSITION")
 
-    async def process_tick(self, tick: NormalizedTick) -> Optional[Dict[str, Any]]:
+    async def process_tick(self, tick: NormalizedTick, fills: int = 1) -> Optional[Dict[str, Any]]:
         """
         处理单个Tick，更新状态机并返回交易信号
 
         Args:
             tick: 标准化Tick
+            fills: 同价聚合前的成交笔数（未聚合为1）
 
         Returns:
             交易信号字典（如有），否则返回None
@@ -416,11 +439,12 @@ class TripleAStateMachine:
             # 调试日志：Tick处理开始
             logger.debug(f"[DEBUG] 处理Tick: 价格={tick.px:.2f}, 大小={tick.sz:.4f}, 方向={'BUY' if tick.side > 0 else 'SELL'}, 当前状态={self.context.current_state}")
 
-            # 保存当前tick时间戳
+            # 保存当前tick时间戳，并用它推进时钟
             self.context.current_tick_time_ns = tick.ts
+            self.clock.on_tick(tick.ts)
 
             # 更新实时数据缓存
-            self._update_data_buffers(tick)
+            self._update_data_buffers(tick, fills)
 
             # 更新核心计算组件
             cvd_values = self.cvd_calculator.on_tick(tick)
@@ -444,22 +468,7 @@ class TripleAStateMachine:
             #     logger.warning(f"KDE处理失败: {e}", exc_info=True)
 
             # 根据当前状态执行不同逻辑
-            signal = None
-
-            if self.context.current_state == TripleAState.IDLE:
-                signal = self._handle_idle_state(tick)
-
-            elif self.context.current_state == TripleAState.MONITORING:
-                signal = self._handle_monitoring_state(tick)
-
-            elif self.context.current_state == TripleAState.CONFIRMED:
-                signal = self._handle_confirmed_state(tick)
-
-            elif self.context.current_state == TripleAState.ACCUMULATING:
-                signal = self._handle_accumulating_state(tick)
-
-            elif self.context.current_state == TripleAState.POSITION:
-                signal = self._handle_position_state(tick)
+            signal = self._dispatch_state(tick)
 
             # 更新性能统计
             self.context.stats['total_ticks_processed'] += 1
@@ -472,10 +481,132 @@ class TripleAStateMachine:
         finally:
             end_time_ns = time.perf_counter_ns()
             self.last_processing_time_ns = end_time_ns - start_time_ns
-            # 更新性能统计
-            self.processing_times.append(self.last_processing_time_ns)
-            self.context.stats['avg_processing_time_ns'] = np.mean(
-                self.processing_times) if self.processing_times else 0
+            self.latency_histogram.record(self.last_processing_time_ns)
+            self.processing_latency.record(self.last_processing_time_ns)
+
+    async def process_ticks(self, ts: np.ndarray, px: np.ndarray, sz: np.ndarray, side: np.ndarray,
+                            on_signal: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+                            fills: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """
+        批量处理一段列式Tick（如一个WS帧），状态与信号和逐笔调用 process_tick 完全一致
+
+        逐笔的 Python 分发只留给真正依赖逐笔窗口内容的状态检测：
+        - POSITION 状态只看止损/止盈，向量化定位第一笔触及的Tick，其间的Tick整段写入缓冲
+        - CVD 不参与状态判断，按段交给 CVDCalculator.process_ticks，只在产生背离事件和批末时同步
+
+        Args:
+            ts: 纳秒时间戳数组
+            px: 价格数组
+            sz: 成交量数组
+            side: 方向数组（1=买入, -1=卖出）
+            on_signal: 每产生一个信号立即回调 (批内下标, 信号)，此时上下文仍停留在产生信号的那笔Tick
+            fills: 同价聚合前的成交笔数数组（None 表示未聚合，每笔为1）
+
+        Returns:
+            本批产生的信号列表（按时间顺序）
+        """
+        n = len(px)
+        if n == 0:
+            return []
+
+        start_time_ns = time.perf_counter_ns()
+        ts = np.asarray(ts, dtype=np.int64)
+        px = np.asarray(px, dtype=np.float64)
+        sz = np.asarray(sz, dtype=np.float64)
+        side = np.asarray(side, dtype=np.int8)
+        fills = np.ones(n, dtype=np.int32) if fills is None else np.asarray(fills, dtype=np.int32)
+        ts_list, px_list, sz_list, side_list = ts.tolist(), px.tolist(), sz.tolist(), side.tolist()
+        fills_list = fills.tolist()
+
+        self._cvd_block = (ts, px, sz, side)
+        self._cvd_synced = 0
+        self._cvd_cursor = 0
+        signals = []
+        try:
+            i = 0
+            while i < n:
+                try:
+                    if self.context.current_state == TripleAState.POSITION:
+                        # 持仓期间不触及止损/止盈的Tick不会改变状态，整段写入
+                        exit_index = self._find_position_exit(px, i)
+                        if exit_index > i:
+                            self._update_data_buffers_batch(ts[i:exit_index], px[i:exit_index],
+                                                            sz[i:exit_index], side[i:exit_index], fills[i:exit_index])
+                            self.context.stats['total_ticks_processed'] += exit_index - i
+                            self._cvd_cursor = i = exit_index
+                            continue
+
+                    tick = NormalizedTick(ts=ts_list[i], px=px_list[i], sz=sz_list[i], side=side_list[i])
+                    self.context.current_tick_time_ns = tick.ts
+                    self.clock.on_tick(tick.ts)
+                    self._update_data_buffers(tick, fills_list[i])
+                    self._cvd_cursor = i + 1
+
+                    signal = self._dispatch_state(tick)
+                    self.context.stats['total_ticks_processed'] += 1
+                    self._check_state_timeout()
+
+                    if signal:
+                        signals.append(signal)
+                        if on_signal is not None:
+                            on_signal(i, signal)
+                except Exception as e:
+                    # 与逐笔调用时上层对每笔 process_tick 的异常处理一致：只丢弃出错的这一笔，帧内其余Tick照常处理
+                    logger.error(f"处理Tick时出错 (批内第 {i} 笔): {e}", exc_info=True)
+                i += 1
+
+            return signals
+
+        finally:
+            self._sync_cvd()
+            self._cvd_block = None
+
+            end_time_ns = time.perf_counter_ns()
+            # 批内按每笔平均耗时记 n 次
+            self.last_processing_time_ns = (end_time_ns - start_time_ns) // n
+            self.latency_histogram.record(self.last_processing_time_ns, n)
+            self.processing_latency.record(self.last_processing_time_ns, n)
+
+    def _dispatch_state(self, tick: NormalizedTick) -> Optional[Dict[str, Any]]:
+        """按当前状态执行对应的处理逻辑"""
+        if self.context.current_state == TripleAState.IDLE:
+            return self._handle_idle_state(tick)
+
+        elif self.context.current_state == TripleAState.MONITORING:
+            return self._handle_monitoring_state(tick)
+
+        elif self.context.current_state == TripleAState.CONFIRMED:
+            return self._handle_confirmed_state(tick)
+
+        elif self.context.current_state == TripleAState.ACCUMULATING:
+            return self._handle_accumulating_state(tick)
+
+        elif self.context.current_state == TripleAState.POSITION:
+            return self._handle_position_state(tick)
+
+        return None
+
+    def _find_position_exit(self, px: np.ndarray, start: int) -> int:
+        """POSITION 状态下从 start 起第一笔触及止损/止盈的Tick下标（没有则为 len(px)），判断条件同 _handle_position_state"""
+        prices = px[start:]
+        if self.context.trade_direction == "LONG":
+            hit = (prices <= self.context.stop_loss_price) | (prices >= self.context.take_profit_price)
+        elif self.context.trade_direction == "SHORT":
+            hit = (prices >= self.context.stop_loss_price) | (prices <= self.context.take_profit_price)
+        else:
+            return len(px)
+        k = int(np.argmax(hit))
+        return start + k if hit[k] else len(px)
+
+    def _sync_cvd(self):
+        """批量处理期间：把已写入缓冲但尚未计入CVD的Tick补算到CVD，并刷新上下文中的CVD值与统计"""
+        if self._cvd_block is None or self._cvd_cursor <= self._cvd_synced:
+            return
+        lo, hi = self._cvd_synced, self._cvd_cursor
+        ts, px, sz, side = self._cvd_block
+        self.context.current_cvd_values = self.cvd_calculator.process_ticks(ts[lo:hi], px[lo:hi], sz[lo:hi], side[lo:hi])
+        self.context.cvd_statistics = self.cvd_calculator.get_statistics()
+        self._cvd_synced = hi
 
     def _handle_idle_state(self, tick: NormalizedTick) -> Optional[Dict[str, Any]]:
         """
@@ -525,6 +656,8 @@ class TripleAStateMachine:
         logger.debug(f"[DEBUG] 微结构吸收检测结果: {absorption_detected}, 方向={direction}, 指标={absorption_metrics}")
 
         if absorption_detected:
+            # 批量处理时CVD是延后计算的，事件记录前先补算到当前Tick
+            self._sync_cvd()
             self.context.cvd_divergence_detected = True
             self.context.absorption_metrics = absorption_metrics
 
@@ -587,7 +720,7 @@ class TripleAStateMachine:
             # 计算持续时间
             duration = 0.0
             if self.context.compression_start_time:
-                duration = time.time() - self.context.compression_start_time
+                duration = self.clock.now() - self.context.compression_start_time
 
             # 构建详细数据
             details = {
@@ -659,6 +792,7 @@ class TripleAStateMachine:
                     '大单命中数': self.context.large_order_hits,
                     '大单命中占比': self.context.large_order_ratio,
                     '大单方向': self.context.large_order_direction,
+                    '大单成交笔数/主动单': self.context.large_order_fills_per_aggressor,
                     '足迹失衡检测': footprint_imbalance,
                     '波动率压缩有效': self._is_vol_compression_valid()
                 }
@@ -683,6 +817,7 @@ class TripleAStateMachine:
                 '大单命中数': self.context.large_order_hits,
                 '大单命中占比': self.context.large_order_ratio,
                 '大单方向': self.context.large_order_direction,
+                '大单成交笔数/主动单': self.context.large_order_fills_per_aggressor,
                 '足迹失衡检测': footprint_imbalance
             }
             self.context.update_state(
@@ -842,27 +977,22 @@ class TripleAStateMachine:
 
     def _detect_microstructure_absorption(self) -> Tuple[bool, str, Dict[str, float]]:
         """检测A1微结构吸收信号（主动量主导 + 价格打不动 + 持续性）"""
-        now = time.time()
+        now = self.clock.now()
         if now - self.last_absorption_trigger_ts < self.absorption_cooldown_seconds:
             return False, "UNKNOWN", {'cooldown_remaining': self.absorption_cooldown_seconds - (now - self.last_absorption_trigger_ts)}
 
-        if len(self.tick_time_buffer) < self.absorption_min_ticks:
+        if len(self.tick_buffer) < self.absorption_min_ticks:
             return False, "UNKNOWN", {}
 
-        times = np.array(self.tick_time_buffer, dtype=float)
-        prices = np.array(self.price_buffer, dtype=float)
-        sizes = np.array(self.order_size_buffer, dtype=float)
-        sides = np.array(self.tick_side_buffer, dtype=float)
-
-        cutoff = now - self.absorption_window_seconds
-        mask = times >= cutoff
-        if mask.sum() < self.absorption_min_ticks:
+        # 缓冲区时间戳单调不减，时间窗即最近 n 笔的连续切片（二分定位，零拷贝）
+        n = self.tick_buffer.count_since(now - self.absorption_window_seconds)
+        if n < self.absorption_min_ticks:
             return False, "UNKNOWN", {}
 
-        w_times = times[mask]
-        w_prices = prices[mask]
-        w_sizes = sizes[mask]
-        w_sides = sides[mask]
+        w_times = self.tick_buffer.view('ts', n)
+        w_prices = self.tick_buffer.view('px', n)
+        w_sizes = self.tick_buffer.view('sz', n)
+        w_sides = self.tick_buffer.view('side', n)
 
         buy_volume = float(np.sum(w_sizes[w_sides > 0]))
         sell_volume = float(np.sum(w_sizes[w_sides < 0]))
@@ -956,11 +1086,11 @@ class TripleAStateMachine:
 
     def _compute_absorption_thresholds(self) -> Tuple[float, float, float]:
         """基于近期市场活跃度计算A1阈值。"""
-        if len(self.order_size_buffer) < 50:
+        if len(self.tick_buffer) < 50:
             return 5.0, 2.0, 4.0
 
-        recent_sizes = np.array(list(self.order_size_buffer)[-300:], dtype=float)
-        recent_prices = np.array(list(self.price_buffer)[-300:], dtype=float)
+        recent_sizes = self.tick_buffer.view('sz', 300)
+        recent_prices = self.tick_buffer.view('px', 300)
         tick_size = max(self.config.market.tick_size, 1e-8)
 
         median_size = float(np.median(recent_sizes))
@@ -996,16 +1126,16 @@ class TripleAStateMachine:
         if windows <= 0:
             return 0.0
 
+        # 子窗口 [left, right) 的边界一次性二分定位
+        lefts = start_time + np.arange(windows) * sub_win
+        lo_bounds, hi_bounds = time_window_bounds(times, lefts, lefts + sub_win)
         match_count = 0
         valid_count = 0
-        for idx in range(windows):
-            left = start_time + idx * sub_win
-            right = left + sub_win
-            mask = (times >= left) & (times < right)
-            if not np.any(mask):
+        for lo, hi in zip(lo_bounds.tolist(), hi_bounds.tolist()):
+            if lo >= hi:
                 continue
-            sub_sizes = sizes[mask]
-            sub_sides = sides[mask]
+            sub_sizes = sizes[lo:hi]
+            sub_sides = sides[lo:hi]
             sub_buy = float(np.sum(sub_sizes[sub_sides > 0]))
             sub_sell = float(np.sum(sub_sizes[sub_sides < 0]))
             if sub_buy + sub_sell <= 0:
@@ -1023,14 +1153,14 @@ class TripleAStateMachine:
 
         """检测波动率压缩信号"""
 
-        if len(self.price_buffer) < 50:
+        if len(self.tick_buffer) < 50:
             return False
 
         # 计算最近价格范围（以Tick为单位）
 
-        recent_prices = list(self.price_buffer)[-50:] # 取最后50个
+        recent_prices = self.tick_buffer.view('px', 50)  # 取最后50个
 
-        price_range = max(recent_prices) - min(recent_prices)
+        price_range = float(recent_prices.max() - recent_prices.min())
 
         tick_size = self.config.market.tick_size
 
@@ -1041,7 +1171,7 @@ class TripleAStateMachine:
         if price_range_ticks < self.vol_compression_threshold:
 
             if self.context.compression_start_time is None:
-                self.context.compression_start_time = time.time()
+                self.context.compression_start_time = self.clock.now()
 
                 self.context.ticks_in_compression = 0
 
@@ -1049,7 +1179,7 @@ class TripleAStateMachine:
 
             # 检查持续时间是否达标
 
-            duration = time.time() - self.context.compression_start_time
+            duration = self.clock.now() - self.context.compression_start_time
 
             if duration >= self.min_compression_duration:
                 self.context.volatility_compression_detected = True
@@ -1083,19 +1213,16 @@ class TripleAStateMachine:
 
         """检测高Tick密度信号"""
 
-        if len(self.tick_time_buffer) < 10:
+        if len(self.tick_buffer) < 10:
             return False
 
         # 计算最近Tick频率
 
-        recent_times = list(self.tick_time_buffer)
-
-        if len(recent_times) < 2:
-            return False
+        recent_times = self.tick_buffer.view('ts')
 
         # 计算每秒Tick数
 
-        time_window = min(60.0, recent_times[-1] - recent_times[0])
+        time_window = min(60.0, float(recent_times[-1] - recent_times[0]))
 
         if time_window <= 0:
             return False
@@ -1128,9 +1255,10 @@ class TripleAStateMachine:
         self.context.large_order_hits = 0
         self.context.large_order_ratio = 0.0
         self.context.large_order_direction = None
+        self.context.large_order_fills_per_aggressor = 0.0
 
         # 冷却检查
-        now = time.time()
+        now = self.clock.now()
         cooldown_elapsed = now - self.last_large_order_trigger_ts
         if cooldown_elapsed < self.large_order_cooldown_seconds:
             logger.debug(
@@ -1139,7 +1267,7 @@ class TripleAStateMachine:
             return False
 
         # 调试日志：大单检测输入
-        buffer_size = len(self.order_size_buffer)
+        buffer_size = len(self.tick_buffer)
         logger.debug(
             f"[DEBUG] _detect_large_order_bubble: 缓冲区大小={buffer_size}, time_window={self.large_order_window_seconds}s"
         )
@@ -1148,19 +1276,22 @@ class TripleAStateMachine:
             return False
 
         # 滚动时间窗统计
-        times = np.array(self.tick_time_buffer, dtype=float)
-        sizes = np.array(self.order_size_buffer, dtype=float)
-        sides = np.array(self.tick_side_buffer, dtype=float)
+        sizes = self.tick_buffer.view('sz')
+        sides = self.tick_buffer.view('side')
         cutoff = now - self.large_order_window_seconds
-        window_mask = times >= cutoff
-        if window_mask.sum() < max(30, self.large_order_ratio_window_ticks):
+        window_sizes = self.large_order_sizes
+        if cutoff < self._large_order_cutoff:
+            # 时间窗向过去扩展（调大了窗口参数或墙钟回拨），已淘汰的样本需要从环形缓冲补回
+            window_sizes.rebuild(sizes, self.tick_buffer.view('ts'))
+        window_sizes.evict_before(cutoff)
+        self._large_order_cutoff = cutoff
+        if len(window_sizes) < max(30, self.large_order_ratio_window_ticks):
             logger.debug("[DEBUG] 大单检测: 时间窗内样本不足")
             return False
 
         try:
-            window_sizes = sizes[window_mask]
-            quantile_threshold = float(np.percentile(window_sizes, self.large_order_quantile))
-            median_floor = float(np.median(window_sizes) * self.large_order_median_multiplier)
+            quantile_threshold = float(window_sizes.percentile(self.large_order_quantile))
+            median_floor = float(window_sizes.median() * self.large_order_median_multiplier)
             large_order_threshold = max(quantile_threshold, median_floor)
             self.context.large_order_threshold = large_order_threshold
 
@@ -1174,8 +1305,9 @@ class TripleAStateMachine:
             self.context.large_order_hits = hits
             self.context.large_order_ratio = ratio
 
-            # 大单方向：命中样本的主导主动方向
+            # 大单方向：命中样本的主导主动方向；每个主动单的成交笔数：命中样本的平均 fills
             if hits > 0:
+                self.context.large_order_fills_per_aggressor = float(np.mean(self.tick_buffer.view('fills', m)[hit_mask]))
                 hit_sides = recent_sides[hit_mask]
                 buy_hits = int(np.sum(hit_sides > 0))
                 sell_hits = int(np.sum(hit_sides < 0))
@@ -1188,12 +1320,17 @@ class TripleAStateMachine:
 
             logger.debug(
                 f"[DEBUG] 大单阈值={large_order_threshold:.6f} (Q={self.large_order_quantile}, median*k={median_floor:.6f}), "
-                f"命中={hits}/{m}, ratio={ratio:.2%}, 方向={self.context.large_order_direction}"
+                f"命中={hits}/{m}, ratio={ratio:.2%}, 方向={self.context.large_order_direction}, "
+                f"成交笔数/主动单={self.context.large_order_fills_per_aggressor:.2f}"
             )
 
             if ratio < self.large_order_ratio_threshold:
                 return False
 
+            # 大单需由扫过多个挂单的主动单构成（未开启同价聚合时 fills 恒为1，默认阈值1不限制）
+            if self.context.large_order_fills_per_aggressor < self.large_order_min_fills_per_aggressor:
+                return False
+
             # 与A1方向一致性校验：不一致时只记录，不触发A3
             a1_direction = self.context.cvd_divergence_direction
             if (
@@ -1239,18 +1376,22 @@ class TripleAStateMachine:
         self.context.footprint_consecutive_levels = 0
         self.context.footprint_direction = None
 
-        window_ticks = min(self.footprint_window_ticks, len(self.tick_price_buffer))
+        ladder = self.footprint_ladder
+        target_window = min(self.footprint_window_ticks, self.tick_buffer.capacity)
+        tick_size = max(self.config.market.tick_size, 1e-8)
+        if ladder.window_ticks != target_window or ladder.tick_size != tick_size:
+            # 运行中调整了窗口或档位宽度：用环形缓冲里的历史重建一次
+            ladder.rebuild(self.tick_buffer.view('px'), self.tick_buffer.view('sz'), self.tick_buffer.view('side'),
+                           window_ticks=target_window, tick_size=tick_size)
+
+        window_ticks = len(ladder)
         logger.debug(f"[DEBUG] _detect_footprint_imbalance: window_ticks={window_ticks}")
 
         if window_ticks < max(20, self.min_consecutive_levels + 5):
             logger.debug("[DEBUG] 足迹失衡检测: 有效tick不足")
             return False
 
-        prices = np.array(list(self.tick_price_buffer)[-window_ticks:], dtype=float)
-        sizes = np.array(list(self.order_size_buffer)[-window_ticks:], dtype=float)
-        sides = np.array(list(self.tick_side_buffer)[-window_ticks:], dtype=float)
-
-        total_volume = float(np.sum(np.clip(sizes, 0.0, None)))
+        total_volume = ladder.total_volume
         if total_volume < self.footprint_min_total_volume:
             logger.debug(
                 f"[DEBUG] 足迹失衡检测: 总量不足 total_volume={total_volume:.4f}, "
@@ -1258,29 +1399,13 @@ class TripleAStateMachine:
             )
             return False
 
-        tick_size = max(self.config.market.tick_size, 1e-8)
-        price_levels = np.round(prices / tick_size) * tick_size
-
-        level_stats: Dict[float, Dict[str, float]] = {}
-        for px, sz, side in zip(price_levels, sizes, sides):
-            if sz <= 0:
-                continue
-            if px not in level_stats:
-                level_stats[px] = {'buy_vol': 0.0, 'sell_vol': 0.0}
-            if side > 0:
-                level_stats[px]['buy_vol'] += float(sz)
-            elif side < 0:
-                level_stats[px]['sell_vol'] += float(sz)
-
-        if not level_stats:
+        if not ladder.levels:
             return False
 
         eps = 1e-8
         ordered_levels = []
         max_imbalance = 0.0
-        for px in sorted(level_stats.keys()):
-            buy_vol = level_stats[px]['buy_vol']
-            sell_vol = level_stats[px]['sell_vol']
+        for px, buy_vol, sell_vol in ladder.sorted_levels():
             larger = max(buy_vol, sell_vol)
             smaller = min(buy_vol, sell_vol)
             imbalance = larger / max(smaller, eps)
@@ -1536,7 +1661,7 @@ class TripleAStateMachine:
             'breakeven_price': position_result.breakeven_px,
             'risk_amount_usd': self.config.risk_manager.account_size_usdt * (
                     self.config.risk_manager.max_risk_per_trade_pct / 100.0),
-            'timestamp': time.time(),
+            'timestamp': self.clock.now(),
             'state_transition': {
                 'from': TripleAState.ACCUMULATING,
                 'to': TripleAState.POSITION
@@ -1562,31 +1687,44 @@ class TripleAStateMachine:
 
         return signal
 
-    def _update_data_buffers(self, tick: NormalizedTick):
+    def _update_data_buffers(self, tick: NormalizedTick, fills: int = 1):
 
         """更新数据缓冲区（用于计算指标）"""
 
-        current_time = time.time()
-
-        # 价格缓存
-
-        self.price_buffer.append(tick.px)
-
-        # Tick时间缓存（用于频率计算）
-
-        self.tick_time_buffer.append(current_time)
-
-        # 订单大小缓存（用于大单检测）
-
-        self.order_size_buffer.append(tick.sz)
-        self.tick_side_buffer.append(tick.side)
-        self.tick_price_buffer.append(tick.px)
+        # 时间（频率计算）、价格、订单大小、方向与成交笔数（大单/足迹检测）写入同一条环形缓冲
+
+        now = self.clock.now()
+        self.tick_buffer.append(now, tick.px, tick.sz, tick.side, fills)
+        self.footprint_ladder.add(tick.px, tick.sz, tick.side)
+        self.large_order_sizes.add(tick.sz, now)
+
+    def _update_data_buffers_batch(self, ts: np.ndarray, px: np.ndarray, sz: np.ndarray, side: np.ndarray,
+                                   fills: np.ndarray):
+        """整段写入数据缓冲区，结果与逐笔 _update_data_buffers 相同（含时钟推进）"""
+        self.context.current_tick_time_ns = int(ts[-1])
+        if isinstance(self.clock, EventClock):
+            # 事件时钟的当前时间即时间戳的前缀最大值；用 Python 整数除法保证与 now() 逐位一致
+            now_ns = np.maximum.accumulate(np.maximum(ts, self.clock.now_ns()))
+            self.clock.on_tick(int(now_ns[-1]))
+            times = [t / 1_000_000_000 for t in now_ns.tolist()]
+        else:
+            times = []
+            for t in ts.tolist():
+                self.clock.on_tick(t)
+                times.append(self.clock.now())
+
+        self.tick_buffer.extend(times, px, sz, side, fills)
+        sz_list = sz.tolist()
+        for p, size, direction in zip(px.tolist(), sz_list, side.tolist()):
+            self.footprint_ladder.add(p, size, direction)
+        for size, now in zip(sz_list, times):
+            self.large_order_sizes.add(size, now)
 
     def _check_state_timeout(self):
 
         """检查状态超时（防止状态卡死）"""
 
-        current_time = time.time()
+        current_time = self.clock.now()
 
         state_duration = current_time - self.context.state_enter_time
 
@@ -1635,13 +1773,21 @@ class TripleAStateMachine:
 
     def get_performance_stats(self) -> Dict[str, Any]:
 
-        """获取性能统计"""
+        """获取性能统计（平均值与分位数来自本实例的处理耗时直方图）"""
+
+        latency = self.processing_latency.snapshot()
 
         return {
 
             'last_processing_time_ns': self.last_processing_time_ns,
 
-            'avg_processing_time_ns': self.context.stats['avg_processing_time_ns'],
+            'avg_processing_time_ns': latency['mean_ns'],
+
+            'p50_processing_time_ns': latency['p50_ns'],
+
+            'p99_processing_time_ns': latency['p99_ns'],
+
+            'p999_processing_time_ns': latency['p999_ns'],
 
             'total_ticks_processed': self.context.stats['total_ticks_processed'],
 
@@ -1651,7 +1797,7 @@ class TripleAStateMachine:
 
             'current_state': self.context.current_state.value,
 
-            'state_duration_seconds': time.time() - self.context.state_enter_time
+            'state_duration_seconds': self.clock.now() - self.context.state_enter_time
 
         }
 
@@ -1667,18 +1813,23 @@ class TripleAStateMachine:
 
         self.range_bar_generator.reset()
 
-        # 重置上下文
+        # 重置上下文与时钟
 
-        self.context = StateContext(is_shadow=self.is_shadow)
+        self.clock.reset()
 
-        # 重置数据缓存
+        self.context = StateContext(is_shadow=self.is_shadow, clock=self.clock)
+        self.context.state_enter_time = self.clock.now()
 
-        self.price_buffer.clear()
+        # 重置数据缓存
 
-        self.tick_time_buffer.clear()
+        self.tick_buffer.clear()
+        self.footprint_ladder.clear()
+        self.large_order_sizes.clear()
+        self._large_order_cutoff = float('-inf')
 
-        self.order_size_buffer.clear()
-        self.tick_side_buffer.clear()
+        # 重置本实例的耗时统计（进程级直方图是累计计数，不随单个实例重置）
+        self.processing_latency.reset()
+        self.last_processing_time_ns = 0
 
         # 根据是否为影子引擎决定日志级别
         if self.is_shadow:
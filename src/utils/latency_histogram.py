@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author     : Zijun Deng
+@Date       : 3/22/26 11:30 AM
+@File       : latency_histogram.py
+@Description: 分阶段延迟直方图（HDR 风格固定分桶，进程内聚合，Prometheus 文本导出）
+
+热路径只做 time.perf_counter_ns() 两次相减加一次 record()：
+record() 是 O(1) 的整数位运算 + 列表计数，不保留样本、不做任何统计计算；
+分位数 (p50/p99/p999) 只在被抓取/查询时从计数数组累加得到。
+
+分桶方式 (对数-线性，同 HdrHistogram)：
+- v < 2^(p+1) 纳秒的值每 1ns 一个桶 (精确)
+- 之后每个 2 的幂区间 [2^m, 2^(m+1)) 再等分 2^p 个子桶，相对误差 <= 2^-p (p=4 时 6.25%)
+- 2 的幂恰好是桶边界，导出给 Prometheus 的按倍数分桶 (le=2^k ns) 计数是精确的
+
+用法:
+    registry = get_latency_registry()
+    start = time.perf_counter_ns()
+    ...
+    registry.record('cvd', time.perf_counter_ns() - start)
+    registry.snapshot()           # {(stage, source): {'p50_ns': ..., 'p99_ns': ..., ...}}
+    registry.prometheus_text()    # Prometheus 文本格式
+"""
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# TripleA 流水线的标准阶段名
+LATENCY_STAGES = ('decode', 'range_bar', 'cvd', 'state_machine', 'signal_emit', 'order_submit')
+
+DEFAULT_QUANTILES = (0.5, 0.99, 0.999)
+
+
+class LatencyHistogram:
+    """单个阶段的纳秒延迟直方图"""
+
+    def __init__(self, precision_bits: int = 4, max_ns: int = 60_000_000_000):
+        """
+        Args:
+            precision_bits: 每个 2 的幂区间的子桶位数 p（子桶数 2^p，相对误差 <= 2^-p）
+            max_ns: 可区分的最大值，超出的记录计入最后一个桶
+        """
+        if precision_bits < 1:
+            raise ValueError(f"precision_bits必须为正数: {precision_bits}")
+        self.precision_bits = precision_bits
+        self._sub_count = 1 << precision_bits
+        self._linear_limit = 1 << (precision_bits + 1)
+        self._max_index = self._index(int(max_ns))
+        self.counts: List[int] = [0] * (self._max_index + 1)
+        self.count = 0
+        self.sum_ns = 0
+        self.max_ns = 0
+
+    def _index(self, value: int) -> int:
+        if value < self._linear_limit:
+            return value
+        shift = value.bit_length() - 1 - self.precision_bits
+        return (shift << self.precision_bits) + (value >> shift)
+
+    def _upper_bound(self, index: int) -> int:
+        """桶 index 内的最大值（含）"""
+        if index < self._linear_limit:
+            return index
+        shift = (index >> self.precision_bits) - 1
+        mantissa = index - (shift << self.precision_bits)
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, value_ns: int, count: int = 1):
+        """
+        记录一次（或 count 次相同的）延迟
+
+        Args:
+            value_ns: 延迟（纳秒，负值按 0 计）
+            count: 次数，批量处理按每笔平均耗时记录时传入批大小
+        """
+        value_ns = int(value_ns)
+        if value_ns < 0:
+            value_ns = 0
+        index = self._index(value_ns)
+        if index > self._max_index:
+            index = self._max_index
+        self.counts[index] += count
+        self.count += count
+        self.sum_ns += value_ns * count
+        if value_ns > self.max_ns:
+            self.max_ns = value_ns
+
+    def mean(self) -> float:
+        return self.sum_ns / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> int:
+        """
+        第 q 百分位（0~100）所在桶的上界（纳秒，不超过实际最大值）；没有记录时返回 0
+        """
+        if not 0 <= q <= 100:
+            raise ValueError(f"q必须在[0, 100]内: {q}")
+        if self.count == 0:
+            return 0
+        rank = max(1, -(-self.count * q // 100))  # ceil(count * q / 100)
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(self._upper_bound(index), self.max_ns)
+        return self.max_ns
+
+    def octave_buckets(self) -> List[Tuple[int, int]]:
+        """按 2 的幂导出的累计分桶 [(上界 ns（含）, 累计次数), ...]，上界到覆盖 max_ns 为止"""
+        buckets = []
+        cumulative = 0
+        index = 0
+        bound = 1
+        while True:
+            last_index = min(self._index(bound), self._max_index)
+            cumulative += sum(self.counts[index:last_index + 1])
+            index = last_index + 1
+            buckets.append((bound, cumulative))
+            if bound >= self.max_ns or index > self._max_index:
+                return buckets
+            bound = bound * 2 + 1
+
+    def snapshot(self, quantiles: Iterable[float] = DEFAULT_QUANTILES) -> Dict[str, float]:
+        """{'count', 'mean_ns', 'max_ns', 'p50_ns', 'p99_ns', 'p999_ns', ...}"""
+        result = {'count': self.count, 'mean_ns': self.mean(), 'max_ns': self.max_ns}
+        for q in quantiles:
+            result[f"p{_quantile_label(q)}_ns"] = self.percentile(q * 100)
+        return result
+
+    def merge(self, other: 'LatencyHistogram'):
+        """把另一个同配置直方图的计数并入本直方图"""
+        if other.precision_bits != self.precision_bits or len(other.counts) != len(self.counts):
+            raise ValueError("只能合并相同分桶配置的直方图")
+        for index, n in enumerate(other.counts):
+            if n:
+                self.counts[index] += n
+        self.count += other.count
+        self.sum_ns += other.sum_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+
+    def reset(self):
+        self.counts = [0] * (self._max_index + 1)
+        self.count = 0
+        self.sum_ns = 0
+        self.max_ns = 0
+
+
+def _quantile_label(q: float) -> str:
+    """0.5 -> '50', 0.99 -> '99', 0.999 -> '999'"""
+    return f"{q:.6f}".rstrip('0').split('.')[1].ljust(2, '0')
+
+
+class LatencyRegistry:
+    """
+    进程内各阶段延迟直方图的注册表
+
+    以 (stage, source) 为键，source 区分同一阶段的不同实例（如主引擎 / 影子引擎）。
+    record() 不加锁：asyncio 单线程内调用是安全的；跨线程抓取时读到的是近似一致的快照。
+    """
+
+    def __init__(self, precision_bits: int = 4):
+        self.precision_bits = precision_bits
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage: str, source: str = 'main') -> LatencyHistogram:
+        """获取（首次调用时创建）某阶段的直方图；热路径应缓存返回值直接 record()"""
+        key = (stage, source)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, LatencyHistogram(self.precision_bits))
+        return histogram
+
+    def record(self, stage: str, value_ns: int, count: int = 1, source: str = 'main'):
+        self.histogram(stage, source).record(value_ns, count)
+
+    def items(self) -> List[Tuple[Tuple[str, str], LatencyHistogram]]:
+        return sorted(self._histograms.items())
+
+    def snapshot(self, quantiles: Iterable[float] = DEFAULT_QUANTILES) -> Dict[Tuple[str, str], Dict[str, float]]:
+        quantiles = tuple(quantiles)
+        return {key: histogram.snapshot(quantiles) for key, histogram in self.items()}
+
+    def reset(self):
+        for _, histogram in self.items():
+            histogram.reset()
+
+    def prometheus_text(self, name: str = 'triplea_stage_latency_seconds',
+                        quantiles: Iterable[float] = DEFAULT_QUANTILES) -> str:
+        """
+        Prometheus 文本格式导出
+
+        - {name}: histogram，按 2 的幂分桶（le 为秒），含 _sum / _count
+        - {name}_quantile: gauge，进程内直方图算出的分位数（quantile 标签）
+        - {name}_max: gauge，最大值
+        """
+        items = self.items()
+        quantiles = tuple(quantiles)
+        lines = [f"# HELP {name} TripleA 各阶段处理延迟（秒）", f"# TYPE {name} histogram"]
+        for (stage, source), histogram in items:
+            labels = f'stage="{stage}",source="{source}"'
+            for bound_ns, cumulative in histogram.octave_buckets():
+                lines.append(f'{name}_bucket{{{labels},le="{_seconds(bound_ns)}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{{labels}}} {_seconds(histogram.sum_ns)}')
+            lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+        lines += [f"# HELP {name}_quantile TripleA 各阶段处理延迟分位数（秒，进程内聚合）",
+                  f"# TYPE {name}_quantile gauge"]
+        for (stage, source), histogram in items:
+            for q in quantiles:
+                lines.append(f'{name}_quantile{{stage="{stage}",source="{source}",quantile="{q}"}} '
+                             f'{_seconds(histogram.percentile(q * 100))}')
+
+        lines += [f"# HELP {name}_max TripleA 各阶段处理延迟最大值（秒）", f"# TYPE {name}_max gauge"]
+        for (stage, source), histogram in items:
+            lines.append(f'{name}_max{{stage="{stage}",source="{source}"}} {_seconds(histogram.max_ns)}')
+        return "\n".join(lines) + "\n"
+
+
+def _seconds(value_ns: int) -> str:
+    return repr(value_ns / 1e9)
+
+
+_GLOBAL_REGISTRY: Optional[LatencyRegistry] = None
+_GLOBAL_REGISTRY_LOCK = threading.Lock()
+
+
+def get_latency_registry() -> LatencyRegistry:
+    """进程级共享的延迟直方图注册表"""
+    global _GLOBAL_REGISTRY
+    if _GLOBAL_REGISTRY is None:
+        with _GLOBAL_REGISTRY_LOCK:
+            if _GLOBAL_REGISTRY is None:
+                _GLOBAL_REGISTRY = LatencyRegistry()
+    return _GLOBAL_REGISTRY
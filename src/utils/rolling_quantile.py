@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author     : Zijun Deng
+@Date       : 3/14/26 10:05 AM
+@File       : rolling_quantile.py
+@Description: 滑动窗口分位数（有序窗口的顺序统计量）
+
+窗口内的值同时保存在 FIFO 队列（按到达顺序，用于过期淘汰）与有序列表（用于取分位数）中，
+追加/淘汰都是一次二分定位加一次列表内存移动，取分位数 O(1)，不需要每次对整窗做 np.percentile。
+
+结果是精确值而不是近似：percentile() 按 numpy 默认的 linear 插值公式逐步复刻，
+与 np.percentile(window, q) / np.median(window) 逐位一致。
+
+用法:
+    rq = RollingQuantile(maxlen=1000)
+    rq.add(size, ts)
+    rq.evict_before(now - 60.0)
+    p95 = rq.percentile(95)
+"""
+from bisect import bisect_left, insort
+from collections import deque
+from math import floor
+from typing import Deque, Iterable, List, Optional, Tuple
+
+
+class RollingQuantile:
+    """
+    按数量上限和/或时间戳淘汰的滑动窗口分位数
+
+    时间淘汰要求时间戳单调不减（事件时钟下的 Tick 时间戳满足该条件）。
+    """
+
+    def __init__(self, maxlen: Optional[int] = None):
+        """
+        Args:
+            maxlen: 窗口最多保留的值个数，None 表示只按时间淘汰
+        """
+        if maxlen is not None and maxlen <= 0:
+            raise ValueError(f"maxlen必须为正数: {maxlen}")
+        self.maxlen = maxlen
+        self._fifo: Deque[Tuple[float, float]] = deque()  # (时间戳, 值)
+        self._sorted: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self._sorted)
+
+    def add(self, value: float, ts: float = 0.0):
+        """追加一个值，超出 maxlen 时淘汰最旧的值"""
+        if self.maxlen is not None and len(self._fifo) >= self.maxlen:
+            self._discard(self._fifo.popleft()[1])
+        self._fifo.append((ts, value))
+        insort(self._sorted, value)
+
+    def evict_before(self, cutoff: float) -> int:
+        """淘汰时间戳 < cutoff 的值，返回淘汰个数"""
+        fifo = self._fifo
+        evicted = 0
+        while fifo and fifo[0][0] < cutoff:
+            self._discard(fifo.popleft()[1])
+            evicted += 1
+        return evicted
+
+    def _discard(self, value: float):
+        del self._sorted[bisect_left(self._sorted, value)]
+
+    def rebuild(self, values: Iterable[float], timestamps: Iterable[float] = None):
+        """用一段按时间升序的历史重建窗口（窗口需要向过去扩展时使用）"""
+        self.clear()
+        if timestamps is None:
+            for value in values:
+                self.add(float(value))
+        else:
+            for ts, value in zip(timestamps, values):
+                self.add(float(value), float(ts))
+
+    def clear(self):
+        self._fifo.clear()
+        self._sorted.clear()
+
+    def percentile(self, q: float) -> float:
+        """
+        窗口内第 q 百分位数（0 <= q <= 100），与 np.percentile(window, q) 结果一致
+
+        Raises:
+            ValueError: 窗口为空或 q 越界
+        """
+        if not 0 <= q <= 100:
+            raise ValueError(f"百分位必须在[0, 100]之间: {q}")
+        return self._interpolate(q / 100)
+
+    def quantile(self, q: float) -> float:
+        """窗口内第 q 分位数（0 <= q <= 1），与 np.quantile(window, q) 结果一致"""
+        if not 0 <= q <= 1:
+            raise ValueError(f"分位数必须在[0, 1]之间: {q}")
+        return self._interpolate(q)
+
+    def _interpolate(self, q: float) -> float:
+        n = len(self._sorted)
+        if n == 0:
+            raise ValueError("窗口为空，无法计算分位数")
+
+        # 与 numpy 的 linear 方法保持相同的浮点运算顺序
+        virtual_index = (n - 1) * q
+        if virtual_index >= n - 1:
+            return self._sorted[-1]
+        previous_index = floor(virtual_index)
+        gamma = virtual_index - previous_index
+        a = self._sorted[previous_index]
+        b = self._sorted[previous_index + 1]
+        diff_b_a = b - a
+        if gamma >= 0.5:
+            return b - diff_b_a * (1 - gamma)
+        return a + diff_b_a * gamma
+
+    def median(self) -> float:
+        """中位数，与 np.median(window) 一致"""
+        n = len(self._sorted)
+        if n == 0:
+            raise ValueError("窗口为空，无法计算中位数")
+        mid = n // 2
+        if n % 2:
+            return self._sorted[mid]
+        return (self._sorted[mid - 1] + self._sorted[mid]) / 2
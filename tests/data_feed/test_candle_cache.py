@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+进程内 K 线缓存测试
+验证环形缓冲的零拷贝只读视图、尾部增量刷新，以及旧视图不会被后续写入改写
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+import src.data_feed.candle_cache as candle_cache_module
+from src.data_feed.candle_cache import CANDLE_COLUMNS, CandleCache, CandleRing
+
+HISTORY = pd.DataFrame(
+    {col: np.arange(1000.0) for col in CANDLE_COLUMNS},
+    index=pd.date_range('2024-01-01', periods=1000, freq='1h', name='timestamp'))
+
+
+class FakeLoader:
+    """按可调的"当前时间"返回已收盘 K 线，并记录调用"""
+    now = HISTORY.index[499] + pd.Timedelta(minutes=61)
+    calls = []
+
+    def __init__(self, symbol, timeframe):
+        pass
+
+    def _closed(self, limit):
+        return HISTORY[HISTORY.index <= FakeLoader.now - pd.Timedelta(hours=1)].tail(limit)
+
+    def fetch_historical_data(self, limit):
+        FakeLoader.calls.append(('full', limit))
+        return self._closed(limit)
+
+    def fetch_from_okx(self, limit):
+        FakeLoader.calls.append(('tail', limit))
+        return self._closed(limit)
+
+    def _get_seconds(self, timeframe):
+        return 3600
+
+    def _get_current_local_time(self):
+        return FakeLoader.now
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(candle_cache_module, 'OKXDataLoader', FakeLoader)
+    FakeLoader.now = HISTORY.index[499] + pd.Timedelta(minutes=61)
+    FakeLoader.calls = []
+    return CandleCache(capacity=100)
+
+
+def test_ring_views_are_stable_and_read_only():
+    ring = CandleRing(capacity=5)
+    views = []
+    for i in range(23):
+        ring.append(np.array([i]), {col: np.array([float(i)]) for col in CANDLE_COLUMNS})
+        views.append(ring.view(3))
+
+    assert len(ring) == 5
+    assert list(views[-1][0]) == [20, 21, 22]
+    # 多次搬迁之后，早先交出去的视图内容保持不变
+    assert list(views[3][0]) == [1, 2, 3]
+    with pytest.raises(ValueError):
+        views[-1][1]['close'][0] = -1.0
+
+
+def test_warmup_then_hit_then_tail_refresh(cache):
+    df = cache.get_frame('ETH-USDT-SWAP', '1H', limit=50)
+    assert len(df) == 50 and df.index[-1] == HISTORY.index[499]
+    assert FakeLoader.calls == [('full', 50)]
+
+    # 没有新 K 线收盘：不访问交易所
+    cache.get_frame('ETH-USDT-SWAP', '1H', limit=50)
+    assert len(FakeLoader.calls) == 1 and cache.stats['hits'] == 1
+
+    # 3 小时后：只拉尾部增量
+    FakeLoader.now += pd.Timedelta(hours=3)
+    df2 = cache.get_frame('ETH-USDT-SWAP', '1H', limit=50)
+    assert FakeLoader.calls[-1][0] == 'tail'
+    assert df2.index[-1] == HISTORY.index[502]
+    assert cache.stats['bars_appended'] == 3
+    np.testing.assert_array_equal(df2['close'].to_numpy(), HISTORY['close'].to_numpy()[453:503])
+    # 之前拿到的 DataFrame 不受影响
+    assert df.index[-1] == HISTORY.index[499]
+
+
+def test_frame_is_zero_copy_and_accepts_new_columns(cache):
+    df = cache.get_frame('ETH-USDT-SWAP', '1H', limit=20)
+    ts, cols = cache.get_arrays('ETH-USDT-SWAP', '1H', limit=20)
+    assert np.shares_memory(df['close'].to_numpy(), cols['close'])
+    df['ATR'] = 1.0
+    assert 'ATR' in df.columns
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+K 线存储后端测试
+验证列式存储的跨月追加去重、区间读取的分区裁剪，以及 SQLite -> 列式迁移工具的往返一致性
+"""
+
+import os
+import sqlite3
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+import tools.migrate_candles_to_columnar as migrate_tool
+from src.data_feed.candle_store import ColumnarCandleStore, SQLiteCandleStore, create_candle_store
+
+
+def make_candles(start, periods, freq='1h', base=3000.0):
+    index = pd.date_range(start, periods=periods, freq=freq, name='timestamp')
+    px = base + np.arange(periods, dtype=np.float64)
+    return pd.DataFrame({'open': px, 'high': px + 1, 'low': px - 1, 'close': px + 0.5,
+                         'volume': np.full(periods, 10.0)}, index=index)
+
+
+def test_append_dedups_across_month_boundary(tmp_path):
+    store = ColumnarCandleStore(str(tmp_path), 'ETH-USDT-SWAP', '1H')
+    store.append(make_candles('2024-01-31 18:00', 6))  # 18:00 ~ 23:00，只落在 1 月
+    # 与已有数据重叠 2 根并跨进 2 月，重叠部分以新数据为准
+    store.append(make_candles('2024-01-31 22:00', 6, base=5000.0))
+
+    assert store.partitions() == ['2024-01', '2024-02']
+    df = store.read()
+    assert len(df) == 10
+    assert df.index.is_monotonic_increasing and not df.index.duplicated().any()
+    assert df.loc['2024-01-31 21:00', 'open'] == 3003.0
+    assert df.loc['2024-01-31 22:00', 'open'] == 5000.0
+    assert df.loc['2024-02-01 03:00', 'open'] == 5005.0
+
+    # 乱序且带重复时间戳的批次：同批内重复保留最后一行
+    batch = pd.concat([make_candles('2024-02-01 02:00', 1, base=7000.0),
+                       make_candles('2024-01-31 19:00', 1, base=8000.0),
+                       make_candles('2024-02-01 02:00', 1, base=9000.0)])
+    store.append(batch)
+    df = store.read()
+    assert len(df) == 10
+    assert df.loc['2024-01-31 19:00', 'open'] == 8000.0
+    assert df.loc['2024-02-01 02:00', 'open'] == 9000.0
+
+    # replace 覆盖全部分区
+    store.replace(make_candles('2024-03-01', 3))
+    assert store.partitions() == ['2024-03']
+    assert len(store.read()) == 3
+
+
+def test_range_read_only_touches_needed_partitions(tmp_path, monkeypatch):
+    store = ColumnarCandleStore(str(tmp_path), 'ETH-USDT-SWAP', '1H')
+    store.append(make_candles('2024-01-01', 24 * 91))  # 2024-01 ~ 2024-03
+    assert store.partitions() == ['2024-01', '2024-02', '2024-03']
+
+    loaded = []
+    load_partition = store._load_partition
+    monkeypatch.setattr(store, '_load_partition', lambda part: loaded.append(part) or load_partition(part))
+
+    df = store.read(start='2024-02-10', end='2024-02-20 05:00')
+    assert loaded == ['2024-02']
+    assert df.index[0] == pd.Timestamp('2024-02-10') and df.index[-1] == pd.Timestamp('2024-02-20 05:00')
+
+    loaded.clear()
+    df = store.read(last_n=5)
+    assert loaded == ['2024-03']
+    assert len(df) == 5 and df.index[-1] == pd.Timestamp('2024-03-31 23:00')
+
+    # last_n 跨分区时从最新分区往回取，够数即停
+    loaded.clear()
+    df = store.read(end='2024-02-01 01:00', last_n=4)
+    assert loaded == ['2024-02', '2024-01']
+    assert list(df.index) == list(pd.date_range('2024-01-31 22:00', periods=4, freq='1h'))
+
+
+def test_migrated_columnar_copy_matches_sqlite(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'crypto_history.db')
+    sqlite_store = SQLiteCandleStore(db_path, 'ETH_USDT_SWAP_1H')
+    sqlite_store.append(make_candles('2023-12-20', 24 * 50))
+    sqlite_store.append(make_candles('2024-01-15', 5, base=100.0))  # 覆盖中间几根
+
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE "notes" (id INTEGER)')
+    conn.commit()
+    # 分块迁移：每块 100 行，覆盖多块追加的路径
+    monkeypatch.setattr(migrate_tool, 'CHUNK_SIZE', 100)
+    out_dir = str(tmp_path / 'candles')
+    try:
+        assert migrate_tool.migrate_table(conn, 'ETH_USDT_SWAP_1H', out_dir) == 24 * 50
+        assert migrate_tool.migrate_table(conn, 'notes', out_dir) == 0
+    finally:
+        conn.close()
+
+    columnar = create_candle_store('columnar', str(tmp_path), 'ETH-USDT-SWAP', '1H')
+    assert columnar.partitions() == ['2023-12', '2024-01', '2024-02']
+    expected = sqlite_store.read()
+    actual = columnar.read()
+    pd.testing.assert_frame_equal(actual, expected, check_index_type=False)
+    assert (actual.index == expected.index).all()
+
+
+def test_legacy_sqlite_table_migrates_on_first_write_only(tmp_path):
+    db_path = str(tmp_path / 'crypto_history.db')
+    legacy = make_candles('2024-01-01', 48)
+    conn = sqlite3.connect(db_path)
+    legacy.to_sql('ETH_USDT_SWAP_1H', conn, index=True)  # 旧版 to_sql 建的无主键表
+    conn.close()
+
+    def has_primary_key():
+        with sqlite3.connect(db_path) as check:
+            return any(col[1] == 'timestamp' and col[5]
+                       for col in check.execute('PRAGMA table_info("ETH_USDT_SWAP_1H")'))
+
+    store = SQLiteCandleStore(db_path, 'ETH_USDT_SWAP_1H')
+    df = store.read(start='2024-01-01 10:00', last_n=5)
+    assert list(df.index) == list(legacy.index[-5:])
+    assert not has_primary_key()
+
+    store.append(make_candles('2024-01-02 23:00', 3, base=5000.0))
+    assert has_primary_key()
+    df = store.read()
+    assert len(df) == 50 and df.loc['2024-01-02 23:00', 'open'] == 5000.0
+
+
+@pytest.mark.parametrize("table_name,expected", [
+    ('ETH_USDT_SWAP_1H', ('ETH-USDT-SWAP', '1H')),
+    ('BTC_USDT_1m', ('BTC-USDT', '1m')),
+    ('ETH_USDT_SWAP_2H', None),
+    ('notes', None),
+])
+def test_parse_table_name(table_name, expected):
+    assert migrate_tool.parse_table_name(table_name) == expected
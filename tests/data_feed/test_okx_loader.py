@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+OKXDataLoader 测试
+用内存中的假分页接口替换 _request_candles_page，验证 K 线拉取、落盘与补缺口逻辑
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+import src.data_feed.okx_loader as okx_loader
+from src.data_feed.okx_loader import OKXDataLoader, candles_to_dataframe
+
+HOUR_MS = 3_600_000
+
+
+def make_candle(ts_ms: int, confirm: str = '1') -> list:
+    px = 3000.0 + (ts_ms // HOUR_MS) % 100
+    return [str(ts_ms), str(px), str(px + 1), str(px - 1), str(px), "10", "1", "3000", confirm]
+
+
+class FakeCandlePages:
+    """按 OKX history-candles 语义返回 after 之前 (不含) 的最多 limit 根 K 线 (倒序)"""
+
+    def __init__(self, timestamps, forming_ts=None, fail_requests=()):
+        self.timestamps = sorted(timestamps)
+        self.forming_ts = forming_ts
+        self.fail_requests = set(fail_requests)
+        self.requests = 0
+        self.afters = []
+
+    def __call__(self, after_ts=None, limit=100, max_retries=10, progress=""):
+        self.requests += 1
+        self.afters.append(after_ts)
+        if self.requests in self.fail_requests:
+            return None
+        after = int(after_ts) if after_ts else float('inf')
+        older = [ts for ts in self.timestamps if ts < after][-limit:]
+        return [make_candle(ts, '0' if ts == self.forming_ts else '1') for ts in reversed(older)]
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(okx_loader.time, 'sleep', lambda seconds: None)
+
+
+def make_loader(tmp_path, backend, pages, monkeypatch):
+    loader = OKXDataLoader(timeframe='1H', db_dir=str(tmp_path), storage_backend=backend)
+    monkeypatch.setattr(loader, '_request_candles_page', pages)
+    return loader
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "columnar"])
+def test_forming_candle_is_not_stored(tmp_path, monkeypatch, backend):
+    # 当前小时的 K 线仍在形成中 (confirm == '0')
+    forming = pd.Timestamp.now('UTC').floor('h').value // 1_000_000
+    pages = FakeCandlePages([forming - k * HOUR_MS for k in range(200)], forming_ts=forming)
+    loader = make_loader(tmp_path, backend, pages, monkeypatch)
+
+    first = loader.fetch_historical_data(limit=50)
+    stored = loader.load_local_data()
+    assert len(first) == 49
+    assert len(stored) == 49
+    assert stored.index[-1] == first.index[-1]
+
+    # 同一小时内再次调用：最新一根仍是已收盘的 K 线，未收盘的那根没有被缓存下来
+    second = loader.fetch_historical_data(limit=50)
+    assert second.index[-1] == first.index[-1]
+    assert loader.load_local_data().index[-1] == first.index[-1]
+
+
+def frame_of(timestamps) -> pd.DataFrame:
+    return candles_to_dataframe([make_candle(ts) for ts in timestamps])
+
+
+def fill_gaps(tmp_path, monkeypatch, missing, fail_requests=()):
+    """600 根 1H K 线中挖掉 missing 下标，检测并补全缺口"""
+    timestamps = [1_704_067_200_000 + k * HOUR_MS for k in range(600)]
+    pages = FakeCandlePages(timestamps, fail_requests=fail_requests)
+    loader = make_loader(tmp_path, 'sqlite', pages, monkeypatch)
+    missing = set(missing)
+    local_df = frame_of([ts for k, ts in enumerate(timestamps) if k not in missing])
+
+    intervals = loader._detect_missing_intervals(local_df)
+    filled = loader._fill_missing_intervals(intervals)
+    return pages, intervals, filled, timestamps
+
+
+def test_nearby_gaps_share_pages(tmp_path, monkeypatch):
+    # 3 个相距不到一页的小缺口合并为 1 次请求，第 4 个远处的缺口单独定位
+    missing = [500, 501, 520, 540, 541, 542, 100]
+    pages, intervals, filled, timestamps = fill_gaps(tmp_path, monkeypatch, missing)
+
+    assert len(intervals) == 4
+    assert pages.requests == 2
+    assert list(filled.index) == list(frame_of(sorted(timestamps[k] for k in missing)).index)
+
+
+def test_gap_spanning_page_boundary_continues_from_oldest(tmp_path, monkeypatch):
+    # 第一页 (after=缺口 550 右端) 只覆盖到下标 451，第二个缺口 [400, 460] 被部分覆盖，
+    # 下一页应从已拉到的最老一根继续，而不是重新定位到缺口右端
+    missing = [550] + list(range(400, 461))
+    pages, intervals, filled, timestamps = fill_gaps(tmp_path, monkeypatch, missing)
+
+    assert len(intervals) == 2
+    assert pages.requests == 2
+    assert pages.afters[1] == timestamps[451]
+    assert len(filled) == len(missing)
+
+
+def test_failed_gap_does_not_abandon_the_rest(tmp_path, monkeypatch):
+    # 第一个缺口的请求失败，只放弃该缺口，后两个缺口照常补全
+    missing = [550, 551, 300, 50, 51, 52]
+    pages, intervals, filled, timestamps = fill_gaps(tmp_path, monkeypatch, missing, fail_requests={1})
+
+    assert len(intervals) == 3
+    assert pages.requests == 3
+    assert list(filled.index) == list(frame_of([timestamps[k] for k in [50, 51, 52, 300]]).index)
+
+
+def detect_missing_intervals_pairwise(df: pd.DataFrame, interval_seconds: int) -> list:
+    """旧版逐行比较的缺口检测，作为向量化实现的对照"""
+    if df.empty or len(df) < 2:
+        return []
+    df = df.sort_index(ascending=True)
+    missing_intervals = []
+    for i in range(len(df) - 1):
+        current_time = df.index[i]
+        next_time = df.index[i + 1]
+        time_diff = (next_time - current_time).total_seconds()
+        if time_diff > interval_seconds * 1.1:
+            missing_bars = int(time_diff // interval_seconds) - 1
+            if missing_bars > 0:
+                missing_intervals.append((current_time + pd.Timedelta(seconds=interval_seconds),
+                                          next_time - pd.Timedelta(seconds=interval_seconds)))
+    return missing_intervals
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_vectorised_gap_detection_matches_pairwise_loop(tmp_path, seed):
+    loader = OKXDataLoader(timeframe='1H', db_dir=str(tmp_path), storage_backend='sqlite')
+    rng = np.random.default_rng(seed)
+    # 整点序列随机挖洞，并混入 1.05 / 1.5 / 1.95 倍间隔等不足一整根的偏移
+    steps = rng.choice([1.0, 1.0, 1.0, 2.0, 3.0, 7.0, 1.05, 1.5, 1.95], size=2000)
+    index = pd.Timestamp('2024-01-01') + pd.to_timedelta(np.cumsum(steps) * 3600, unit='s')
+    df = pd.DataFrame({'close': np.arange(len(index), dtype=float)}, index=index)
+    df = df.iloc[rng.permutation(len(df))]  # 乱序输入
+
+    expected = detect_missing_intervals_pairwise(df, 3600)
+    assert len(expected) > 100
+    assert loader._detect_missing_intervals(df) == expected
+    assert loader._detect_missing_intervals(df.iloc[:1]) == []
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "columnar"])
+def test_load_local_data_pushdown(tmp_path, backend):
+    loader = OKXDataLoader(timeframe='1H', db_dir=str(tmp_path), storage_backend=backend)
+    # 空表
+    assert loader.load_local_data().empty
+    assert loader.load_local_data(start='2024-01-01', end='2024-02-01', last_n=5).empty
+
+    full = frame_of([1_704_067_200_000 + k * HOUR_MS for k in range(24 * 40)])  # 跨两个月
+    loader.save_local_data(full)
+
+    # start / end 两端都包含
+    start, end = full.index[100], full.index[900]
+    df = loader.load_local_data(start=start, end=end)
+    assert df.index[0] == start and df.index[-1] == end and len(df) == 801
+    pd.testing.assert_frame_equal(df, full.loc[start:end], check_freq=False, check_index_type=False)
+    assert len(loader.load_local_data(start=start)) == len(full) - 100
+    assert len(loader.load_local_data(end=end)) == 901
+    # 不落在整点上的边界
+    assert loader.load_local_data(start=start + pd.Timedelta(minutes=1)).index[0] == full.index[101]
+    assert loader.load_local_data(end=end - pd.Timedelta(minutes=1)).index[-1] == full.index[899]
+
+    # last_n: 取满足区间条件的最后 N 根
+    assert list(loader.load_local_data(last_n=30).index) == list(full.index[-30:])
+    assert list(loader.load_local_data(end=end, last_n=30).index) == list(full.index[871:901])
+    assert list(loader.load_local_data(start=start, end=end, last_n=900).index) == list(full.index[100:901])
+    # last_n 大于总行数时返回全部
+    assert len(loader.load_local_data(last_n=100_000)) == len(full)
+    # 区间内没有数据
+    assert loader.load_local_data(start='2030-01-01').empty
+
+
+def test_backfill_failure_returns_local_data(tmp_path, monkeypatch):
+    loader = OKXDataLoader(timeframe='1m', db_dir=str(tmp_path), storage_backend='sqlite')
+    start, end = pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-20 23:59')  # 28800 根，走并发回补
+
+    def failing_backfill(start_date, end_date, concurrency=8):
+        # 前两天的窗口已落盘，之后某个窗口重试耗尽
+        loader.save_local_data(pd.DataFrame(
+            {col: 3000.0 for col in ['open', 'high', 'low', 'close', 'volume']},
+            index=pd.date_range(start_date, periods=2 * 1440, freq='1min', name='timestamp')))
+        raise RuntimeError("OKX 业务报错 [50000]: 窗口重试耗尽")
+
+    monkeypatch.setattr(loader, 'backfill', failing_backfill)
+    df = loader.fetch_data_by_date_range(start, end)
+    assert len(df) == 2 * 1440
+    assert df.index[0] == start
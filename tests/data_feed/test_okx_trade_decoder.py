@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+OKX 成交帧解码器测试
+验证解码结果与 json.loads + encode_trades 一致、非成交帧与其他交易对帧被丢弃，以及解码数组直接录入成交磁带
+"""
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.data_feed.okx_trade_decoder import OKXTradeDecoder, decode_trade_frame
+from src.data_feed.trade_tape import TRADE_TAPE_DTYPE, TradeTapeRecorder, encode_trades, read_trade_tape, tape_path
+
+SYMBOL = "ETH-USDT-SWAP"
+T0 = 1_700_000_000_000 - 1_700_000_000_000 % 86_400_000
+
+
+def make_trades(n, start=0):
+    return [{
+        'instId': SYMBOL,
+        'tradeId': str(5000 + i),
+        'px': f"{3000 + i * 0.01:.2f}",
+        'sz': f"{0.1 + i % 7:.3f}",
+        'side': 'buy' if i % 3 else 'sell',
+        'ts': str(T0 + i * 7),
+        'count': '1',
+    } for i in range(start, start + n)]
+
+
+def make_frame(trades, channel='trades', inst_id=SYMBOL):
+    return json.dumps({'arg': {'channel': channel, 'instId': inst_id}, 'data': trades}, separators=(',', ':'))
+
+
+@pytest.mark.parametrize("channel", ['trades', 'trades-all'])
+def test_decode_matches_json_and_encode_trades(channel):
+    trades = make_trades(60)
+    decoder = OKXTradeDecoder(SYMBOL)
+    ticks = decoder.decode(make_frame(trades, channel))
+    assert ticks.dtype == TRADE_TAPE_DTYPE
+    np.testing.assert_array_equal(ticks, encode_trades(trades))
+    assert ticks['side'].tolist() == [1 if i % 3 else -1 for i in range(60)]
+
+    # bytes 原文同样支持
+    np.testing.assert_array_equal(decoder.decode(make_frame(trades, channel).encode()), ticks)
+    assert decoder.stats['frames'] == 2
+    assert decoder.stats['trades'] == 120
+
+
+def test_non_trade_and_foreign_frames_are_dropped():
+    decoder = OKXTradeDecoder(SYMBOL)
+    assert decoder.decode('{"event":"subscribe","arg":{"channel":"trades","instId":"ETH-USDT-SWAP"}}') is None
+    assert decoder.decode('pong') is None
+    assert decoder.decode(make_frame(make_trades(3), inst_id='BTC-USDT-SWAP')) is None
+    assert decoder.decode(make_frame(make_trades(3), channel='books5')) is None
+    assert decoder.stats == {'frames': 0, 'trades': 0, 'skipped': 2, 'rejected': 2}
+
+    assert len(decode_trade_frame(make_frame([]), SYMBOL)) == 0
+    with pytest.raises(ValueError):
+        decoder.decode('{"data": [')
+
+
+def test_decoded_frames_record_to_tape(tmp_path):
+    decoder = OKXTradeDecoder(SYMBOL)
+    recorder = TradeTapeRecorder(root_dir=str(tmp_path), flush_interval=0.05).start()
+    for k in range(10):
+        # 解码数组与原始字典帧可以混合录入
+        trades = make_trades(20, start=k * 20)
+        recorder.record(SYMBOL, decoder.decode(make_frame(trades)) if k % 2 else trades)
+    recorder.stop()
+
+    tape = read_trade_tape(tape_path(str(tmp_path), SYMBOL, '2023-11-14'))
+    np.testing.assert_array_equal(np.asarray(tape), encode_trades(make_trades(200)))
+    assert recorder.stats['trades'] == 200
+
+
+def test_encode_trades_fills_typed_columns():
+    trades = [
+        {'ts': '1700000000001', 'px': '3000.25', 'sz': '0.5', 'side': 'buy', 'tradeId': '42'},
+        {'ts': '1700000000002', 'px': '1e3', 'sz': '2', 'side': 'sell', 'tradeId': ''},
+        {'ts': '1700000000003', 'px': '2999.5', 'sz': '0.001', 'side': 'unknown'},
+    ]
+    ticks = encode_trades(trades)
+    assert ticks.dtype == TRADE_TAPE_DTYPE
+    assert ticks['ts'].tolist() == [1700000000001, 1700000000002, 1700000000003]
+    assert ticks['px'].tolist() == [3000.25, 1000.0, 2999.5]
+    assert ticks['sz'].tolist() == [0.5, 2.0, 0.001]
+    assert ticks['side'].tolist() == [1, -1, 0]
+    assert ticks['trade_id'].tolist() == [42, 0, 0]
+    assert len(encode_trades([])) == 0
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+多周期派生测试
+验证由 1m 基础序列聚合出的高周期 K 线与 pandas resample 逐根一致，且增量更新结果与一次性聚合相同
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.data_feed.resampler import CandleResampler, resample_candles
+
+PANDAS_FREQ = {'5m': '5min', '15m': '15min', '1H': '1h', '4H': '4h', '1D': '1D'}
+
+
+@pytest.fixture
+def base_1m():
+    """从非整点开始的 3 天 1m K 线，中间挖几个交易所侧缺口"""
+    rng = np.random.default_rng(7)
+    n = 3 * 1440
+    index = pd.date_range('2024-03-01 00:07', periods=n, freq='1min', name='timestamp')
+    close = 3000 + np.cumsum(rng.normal(0, 1, n))
+    df = pd.DataFrame({
+        'open': close + rng.normal(0, 0.2, n),
+        'high': close + rng.uniform(0, 2, n),
+        'low': close - rng.uniform(0, 2, n),
+        'close': close,
+        'volume': rng.uniform(1, 50, n),
+    }, index=index)
+    return df.drop(df.index[[100, 101, 2500]])
+
+
+def pandas_reference(df, timeframe):
+    ref = df.resample(PANDAS_FREQ[timeframe]).agg(
+        {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}).dropna()
+    tf_delta = pd.Timedelta(PANDAS_FREQ[timeframe])
+    ref = ref[ref.index >= df.index[0].ceil(tf_delta)]  # 去掉开头残缺桶
+    if df.index[-1] < ref.index[-1] + tf_delta - pd.Timedelta(minutes=1):
+        ref = ref.iloc[:-1]  # 去掉未收盘的桶
+    return ref
+
+
+@pytest.mark.parametrize('timeframe', ['5m', '15m', '1H', '4H'])
+def test_resample_matches_pandas(base_1m, timeframe):
+    result = resample_candles(base_1m, timeframe)
+    ref = pandas_reference(base_1m, timeframe)
+    assert result.index.equals(ref.index)
+    np.testing.assert_allclose(result[ref.columns].to_numpy(), ref.to_numpy())
+
+
+def test_incremental_update_equals_full_resample(base_1m):
+    resampler = CandleResampler(['5m', '15m', '1H'])
+    # 模拟每 5 分钟喂一次与上次有重叠的尾部
+    step = 300
+    for end in range(step, len(base_1m) + step, step):
+        resampler.update(base_1m.iloc[max(0, end - 2 * step):end])
+
+    for tf in ['5m', '15m', '1H']:
+        full = resample_candles(base_1m, tf)
+        cached = resampler.get(tf)
+        assert cached.index.equals(full.index[-len(cached):])
+        np.testing.assert_allclose(cached.to_numpy(), full.to_numpy()[-len(cached):])
+
+
+def test_unclosed_bucket_not_emitted(base_1m):
+    resampler = CandleResampler(['1H'])
+    resampler.update(base_1m)
+    last_hour = resampler.get('1H').index[-1]
+    assert base_1m.index[-1] >= last_hour + pd.Timedelta(minutes=59)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+SQLite 连接管理测试
+验证 WAL 模式、进程内长连接复用、只读模式，以及写事务进行中读者不被阻塞
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.data_feed.candle_store import SQLiteCandleStore
+from src.data_feed.sqlite_pool import get_connection
+
+
+def make_candles(n: int) -> pd.DataFrame:
+    index = pd.date_range('2024-01-01', periods=n, freq='1min', name='timestamp')
+    return pd.DataFrame({col: np.arange(n, dtype=float) for col in ['open', 'high', 'low', 'close', 'volume']},
+                        index=index)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = os.path.join(tmp_path, 'crypto_history.db')
+    SQLiteCandleStore(path, 'ETH_USDT_SWAP_1m').append(make_candles(1000))
+    return path
+
+
+def test_connection_is_reused_and_in_wal_mode(db_path):
+    conn = get_connection(db_path)
+    assert get_connection(db_path) is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0].lower() == 'wal'
+
+
+def test_read_only_store_reads_but_rejects_writes(db_path):
+    store = SQLiteCandleStore(db_path, 'ETH_USDT_SWAP_1m', read_only=True)
+    assert len(store.read(last_n=10)) == 10
+    with pytest.raises(PermissionError):
+        store.append(make_candles(5))
+    with pytest.raises(sqlite3.OperationalError):
+        get_connection(db_path, read_only=True).execute('DELETE FROM "ETH_USDT_SWAP_1m"')
+
+
+def test_reader_not_blocked_by_open_write_transaction(db_path):
+    writer = get_connection(db_path)
+    writer.execute('BEGIN IMMEDIATE')
+    writer.execute('DELETE FROM "ETH_USDT_SWAP_1m"')
+    try:
+        # 其它线程 (独立连接) 的只读查询看到的是事务开始前的快照，且不需要等待写锁释放
+        result = {}
+
+        def read():
+            result['rows'] = len(SQLiteCandleStore(db_path, 'ETH_USDT_SWAP_1m', read_only=True).read())
+
+        t = threading.Thread(target=read)
+        t.start()
+        t.join(timeout=5)
+        assert not t.is_alive()
+        assert result['rows'] == 1000
+    finally:
+        writer.rollback()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+同价成交聚合测试
+验证连续 (ts, px, side) 相同的成交被合并、成交量与 CVD 守恒、fills 计数正确，以及重复聚合时 fills 累加
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.data_feed.trade_aggregator import AGGREGATED_TRADE_DTYPE, aggregate_fills
+from src.data_feed.trade_tape import TRADE_TAPE_DTYPE
+
+
+def make_bursty_trades(n, seed=0):
+    """每个主动单拆成 1~8 笔同毫秒同价成交，中间穿插同毫秒但不同价/不同方向的成交"""
+    rng = np.random.default_rng(seed)
+    rows, ts, px, trade_id = [], 1_700_000_000_000, 3000.0, 1
+    while len(rows) < n:
+        ts += int(rng.integers(0, 3))
+        px = round(px + float(rng.choice([-0.01, 0.0, 0.01])), 2)
+        side = int(rng.choice([1, -1]))
+        for _ in range(int(rng.integers(1, 9))):
+            rows.append((ts, px, round(float(rng.uniform(0.01, 2.0)), 2), side, trade_id))
+            trade_id += 1
+    return np.array(rows[:n], dtype=TRADE_TAPE_DTYPE)
+
+
+def reference_aggregate(ticks):
+    groups = []
+    for row in ticks.tolist():
+        ts, px, sz, side, trade_id = row
+        if groups and groups[-1][0] == ts and groups[-1][1] == px and groups[-1][3] == side:
+            groups[-1][2] += sz
+            groups[-1][5] += 1
+        else:
+            groups.append([ts, px, sz, side, trade_id, 1])
+    return groups
+
+
+def test_matches_reference_and_conserves_volume():
+    ticks = make_bursty_trades(5000)
+    result = aggregate_fills(ticks)
+    expected = reference_aggregate(ticks)
+
+    assert result.dtype == AGGREGATED_TRADE_DTYPE
+    assert len(result) == len(expected) < len(ticks) // 2
+    for k, name in enumerate(['ts', 'px', 'sz', 'side', 'trade_id', 'fills']):
+        values = [group[k] for group in expected]
+        if name == 'sz':
+            np.testing.assert_allclose(result[name], values, rtol=1e-12)
+        else:
+            assert result[name].tolist() == values
+    assert result['fills'].sum() == len(ticks)
+
+    # CVD 与总成交量守恒
+    np.testing.assert_allclose(np.sum(result['sz'] * result['side']), np.sum(ticks['sz'] * ticks['side']), rtol=1e-12)
+    # 聚合后相邻两笔不会再有相同的 (ts, px, side)
+    same = (result['ts'][1:] == result['ts'][:-1]) & (result['px'][1:] == result['px'][:-1]) & \
+           (result['side'][1:] == result['side'][:-1])
+    assert not same.any()
+
+
+def test_reaggregation_accumulates_fills_and_empty_input():
+    ticks = make_bursty_trades(1200, seed=1)
+    once = aggregate_fills(ticks)
+    # 分帧聚合后再合并聚合，与整段一次聚合相同
+    parts = np.concatenate([aggregate_fills(ticks[:500]), aggregate_fills(ticks[500:])])
+    twice = aggregate_fills(parts)
+    assert twice['fills'].tolist() == once['fills'].tolist()
+    np.testing.assert_allclose(twice['sz'], once['sz'], rtol=1e-12)
+
+    assert len(aggregate_fills(ticks[:0])) == 0
+    assert aggregate_fills(ticks[:0]).dtype == AGGREGATED_TRADE_DTYPE
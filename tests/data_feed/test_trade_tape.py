@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+逐笔成交磁带测试
+验证后台批量落盘、按 UTC 日期切分、内存映射读取以及残缺记录的处理
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.data_feed.trade_tape import (
+    DEFAULT_TAPE_DIR,
+    TRADE_TAPE_DTYPE,
+    TradeTapeRecorder,
+    list_tape_days,
+    load_trade_tape,
+    read_trade_tape,
+    resolve_tape_dir,
+    tape_path,
+)
+
+SYMBOL = "ETH-USDT-SWAP"
+DAY_MS = 86_400_000
+T0 = 1_700_000_000_000 - 1_700_000_000_000 % DAY_MS  # 2023-11-14 00:00 UTC
+
+
+def make_frame(start_idx: int, n: int, base_ts: int = T0):
+    return [{
+        'instId': SYMBOL,
+        'tradeId': str(1000 + i),
+        'px': f"{3000 + i * 0.1:.1f}",
+        'sz': f"{0.5 + i % 3:.1f}",
+        'side': 'buy' if i % 2 == 0 else 'sell',
+        'ts': str(base_ts + i * 10),
+    } for i in range(start_idx, start_idx + n)]
+
+
+def test_record_and_memmap_roundtrip(tmp_path):
+    recorder = TradeTapeRecorder(root_dir=str(tmp_path), flush_interval=0.05).start()
+    for k in range(50):
+        recorder.record(SYMBOL, make_frame(k * 20, 20))
+    recorder.stop()
+
+    assert TRADE_TAPE_DTYPE.itemsize == 33
+    tape = read_trade_tape(tape_path(str(tmp_path), SYMBOL, '2023-11-14'))
+    assert isinstance(tape, np.memmap)
+    assert tape.dtype == TRADE_TAPE_DTYPE
+    assert len(tape) == 1000
+
+    idx = np.arange(1000)
+    np.testing.assert_array_equal(tape['ts'], T0 + idx * 10)
+    np.testing.assert_allclose(tape['px'], np.round(3000 + idx * 0.1, 1))
+    np.testing.assert_array_equal(tape['side'], np.where(idx % 2 == 0, 1, -1))
+    np.testing.assert_array_equal(tape['trade_id'], 1000 + idx)
+
+    # 批量写：写入次数远少于帧数
+    assert recorder.stats['frames'] == 50
+    assert recorder.stats['writes'] < 50
+
+
+def test_split_by_utc_day(tmp_path):
+    recorder = TradeTapeRecorder(root_dir=str(tmp_path), flush_interval=0.05).start()
+    # 一个帧跨越 UTC 零点
+    recorder.record(SYMBOL, make_frame(0, 10, base_ts=T0 + DAY_MS - 50))
+    recorder.stop()
+
+    assert list_tape_days(SYMBOL, str(tmp_path)) == ['2023-11-14', '2023-11-15']
+    assert len(load_trade_tape(SYMBOL, '2023-11-14', root_dir=str(tmp_path))) == 5
+    both = load_trade_tape(SYMBOL, '2023-11-14', '2023-11-15', root_dir=str(tmp_path))
+    assert len(both) == 10
+    assert (np.diff(both['ts']) > 0).all()
+
+
+def test_partial_tail_record_ignored(tmp_path):
+    recorder = TradeTapeRecorder(root_dir=str(tmp_path), flush_interval=0.05).start()
+    recorder.record(SYMBOL, make_frame(0, 3))
+    recorder.stop()
+
+    path = tape_path(str(tmp_path), SYMBOL, '2023-11-14')
+    with open(path, 'ab') as f:
+        f.write(b'\x00' * 7)  # 模拟崩溃时写了一半的记录
+    assert len(read_trade_tape(path)) == 3
+    assert len(read_trade_tape(os.path.join(str(tmp_path), 'missing.tape'))) == 0
+
+
+def test_tape_dir_anchored_at_project_root(tmp_path, monkeypatch):
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    # 从其它工作目录启动时，相对路径仍解析到项目根目录下的 data/
+    monkeypatch.chdir(tmp_path)
+    assert resolve_tape_dir('data/trade_tape') == os.path.join(project_root, 'data', 'trade_tape')
+    assert resolve_tape_dir(str(tmp_path)) == str(tmp_path)
+    assert os.path.isabs(DEFAULT_TAPE_DIR)
+    assert DEFAULT_TAPE_DIR.startswith(project_root + os.sep)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+OHLC Range Bar 内核等价性测试
+用旧实现（iterrows 逐行累积）对照，要求各种时间戳来源和 max_bars 下的结果逐位一致
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.data_process import create_range_bars_from_ohlc, create_range_bars_from_ticks, range_bars_to_dataframe
+from src.strategy.triplea.core.data_structures import NormalizedTick
+
+
+def reference_range_bars(df, tick_range, tick_size, max_bars=None):
+    """旧实现：iterrows 逐行累积，每根Bar一个字典"""
+    range_bars, current_bar, open_price_base = [], None, 0.0
+    has_volume = 'volume' in df.columns
+    for idx, row in df.iterrows():
+        if hasattr(idx, 'timestamp'):
+            ts_ns = int(idx.timestamp() * 1e9)
+        elif 'timestamp' in df.columns:
+            ts_ns = int(row['timestamp'] * 1e9)
+        else:
+            ts_ns = len(range_bars) * 1000000000
+        half = (row['volume'] if has_volume else 0.0) * 0.5
+        close_px = row['close']
+        if current_bar is None:
+            current_bar = {'open_ts': ts_ns, 'open_px': row['open'], 'high_px': row['high'],
+                           'low_px': row['low'], 'close_px': close_px, 'total_buy_vol': half,
+                           'total_sell_vol': half, 'delta': half - half, 'tick_count': 1}
+            open_price_base = row['open']
+            continue
+        current_bar['high_px'] = max(current_bar['high_px'], row['high'])
+        current_bar['low_px'] = min(current_bar['low_px'], row['low'])
+        current_bar['close_px'] = close_px
+        current_bar['total_buy_vol'] += half
+        current_bar['total_sell_vol'] += half
+        current_bar['delta'] = current_bar['total_buy_vol'] - current_bar['total_sell_vol']
+        current_bar['tick_count'] += 1
+        if abs(close_px - open_price_base) / tick_size >= tick_range:
+            range_bars.append(current_bar.copy())
+            current_bar = {'open_ts': ts_ns, 'open_px': close_px, 'high_px': close_px, 'low_px': close_px,
+                           'close_px': close_px, 'total_buy_vol': half, 'total_sell_vol': half,
+                           'delta': half - half, 'tick_count': 1}
+            open_price_base = close_px
+            if max_bars is not None and len(range_bars) >= max_bars:
+                break
+    if current_bar is not None:
+        range_bars.append(current_bar)
+    return range_bars
+
+
+def make_candles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = np.round(3000.0 + np.cumsum(rng.normal(0.0, 1.5, n)), 2)
+    open_ = np.round(np.concatenate([[3000.0], close[:-1]]), 2)
+    high = np.round(np.maximum(open_, close) + rng.uniform(0, 1.0, n), 2)
+    low = np.round(np.minimum(open_, close) - rng.uniform(0, 1.0, n), 2)
+    volume = np.round(rng.lognormal(3.0, 1.0, n), 3)
+    index = pd.date_range('2025-01-01', periods=n, freq='1min')
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}, index=index)
+
+
+def assert_same_bars(result, expected):
+    assert len(result) == len(expected)
+    for name in ['open_ts', 'open_px', 'high_px', 'low_px', 'close_px',
+                 'total_buy_vol', 'total_sell_vol', 'delta', 'tick_count']:
+        assert result[name].tolist() == [bar[name] for bar in expected], name
+    assert result['open_ts'].dtype == np.int64
+
+
+@pytest.mark.parametrize("max_bars", [None, 0, 5])
+def test_datetime_index_matches_iterrows(max_bars):
+    df = make_candles(3000)
+    expected = reference_range_bars(df, 300, 0.01, max_bars)
+    assert len(expected) > 10 or max_bars is not None
+    assert_same_bars(create_range_bars_from_ohlc(df, 300, 0.01, max_bars), expected)
+
+
+def test_timestamp_column_and_bar_index_fallback():
+    df = make_candles(1500, seed=1)
+    with_ts = df.reset_index(drop=True)
+    with_ts['timestamp'] = df.index.asi8 / 1e9 + 0.25
+    assert_same_bars(create_range_bars_from_ohlc(with_ts, 150, 0.01), reference_range_bars(with_ts, 150, 0.01))
+
+    bare = df.reset_index(drop=True).drop(columns=['volume'])
+    assert_same_bars(create_range_bars_from_ohlc(bare, 150, 0.01), reference_range_bars(bare, 150, 0.01))
+
+
+def test_empty_and_missing_columns():
+    assert create_range_bars_from_ohlc(make_candles(0)).empty
+    with pytest.raises(ValueError):
+        create_range_bars_from_ohlc(pd.DataFrame({'open': [1.0], 'close': [1.0]}))
+
+
+def test_range_bars_to_dataframe_columns():
+    ticks = [NormalizedTick(ts=i * 1_000_000, px=3000.0 + (i % 40) * 0.05, sz=0.5, side=1 if i % 3 else -1)
+             for i in range(500)]
+    bars = create_range_bars_from_ticks(ticks, tick_range=100, tick_size=0.01)
+    df = range_bars_to_dataframe(bars)
+    assert df['open_ts'].tolist() == [bar.open_ts for bar in bars]
+    assert df['delta'].tolist() == [bar.delta for bar in bars]
+    assert df['tick_count'].dtype == np.int64
+    assert range_bars_to_dataframe([]).empty
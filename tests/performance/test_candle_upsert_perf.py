@@ -0,0 +1,84 @@
+"""
+历史K线 UPSERT 追加性能测试
+验证 SQLite 存储在表从 1万 行增长到 300万 行的过程中，单次追加代价保持平稳 (O(新增行数))
+"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_feed.candle_store import SQLiteCandleStore
+
+TABLE_SIZES = [10_000, 100_000, 1_000_000, 3_000_000]
+APPEND_BARS = 1000  # 每次追加 1000 根新 K 线
+OVERLAP_BARS = 10  # 其中 10 根与表尾重叠 (模拟增量补齐时重复拉到的最新 K 线)
+ROUNDS = 5
+
+
+def make_candles(start: pd.Timestamp, n: int, seed: int = 0) -> pd.DataFrame:
+    """生成 n 根连续 1m K 线"""
+    rng = np.random.default_rng(seed)
+    close = 3000.0 + np.cumsum(rng.normal(0, 0.5, n))
+    index = pd.date_range(start, periods=n, freq='1min', name='timestamp')
+    return pd.DataFrame({
+        'open': close + rng.normal(0, 0.1, n),
+        'high': close + 1.0,
+        'low': close - 1.0,
+        'close': close,
+        'volume': rng.uniform(10, 100, n),
+    }, index=index)
+
+
+class TestCandleUpsertPerformance:
+    """K线 UPSERT 追加性能测试类"""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        return SQLiteCandleStore(os.path.join(tmp_path, 'crypto_history.db'), 'ETH_USDT_SWAP_1m')
+
+    def test_append_cost_flat_as_table_grows(self, store):
+        """
+        测试追加代价随表规模的变化
+
+        目标：300万行时的单次追加耗时不超过 1万行时的 3 倍
+        """
+        start = pd.Timestamp('2020-01-01')
+        current_rows = 0
+        results = {}
+
+        for size in TABLE_SIZES:
+            # 把表灌到目标规模 (分块写入，不计时)
+            while current_rows < size:
+                chunk = min(500_000, size - current_rows)
+                store.append(make_candles(start + pd.Timedelta(minutes=current_rows), chunk, seed=current_rows))
+                current_rows += chunk
+
+            latencies = []
+            for r in range(ROUNDS):
+                tail_start = start + pd.Timedelta(minutes=current_rows - OVERLAP_BARS)
+                batch = make_candles(tail_start, APPEND_BARS, seed=size + r)
+
+                start_time = time.perf_counter()
+                store.append(batch)
+                latencies.append((time.perf_counter() - start_time) * 1000)
+
+                current_rows += APPEND_BARS - OVERLAP_BARS
+
+            results[size] = float(np.median(latencies))
+
+        print(f"\nK线 UPSERT 追加性能 (每次 {APPEND_BARS} 根，其中 {OVERLAP_BARS} 根重叠):")
+        for size, median_ms in results.items():
+            print(f"  表规模 {size:>9,} 行: 中位耗时 {median_ms:.2f}ms")
+
+        ratio = results[TABLE_SIZES[-1]] / results[TABLE_SIZES[0]]
+        print(f"  300万行 / 1万行 耗时比: {ratio:.2f}x")
+
+        # 重叠的 K 线被覆盖而不是重复插入
+        tail = store.read(last_n=APPEND_BARS)
+        assert len(tail) == APPEND_BARS
+        assert not tail.index.duplicated().any()
+
+        assert ratio < 3.0, f"追加代价随表规模增长过快: {ratio:.2f}x"
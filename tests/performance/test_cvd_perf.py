@@ -238,7 +238,7 @@ class TestCVDPerformance:
             cvd_values_history.append(cvd_values.copy())
 
         # 验证窗口10的CVD值
-        recent_ticks = list(calculator.tick_buffer)
+        recent_ticks = test_ticks
         if len(recent_ticks) >= 10:
             # 手动计算最后10个Tick的CVD
             last_10_ticks = recent_ticks[-10:]
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+分阶段延迟直方图测试
+验证 HDR 风格分桶的分位数误差、Prometheus 文本导出格式，以及状态机/CVD 计时接入
+"""
+import os
+import re
+import sys
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.strategy.triplea.core.data_structures import NormalizedTick, TripleAEngineConfig
+from src.strategy.triplea.replay import drive_coroutine
+from src.strategy.triplea.state_machine.state_machine import TripleAStateMachine
+from src.utils.latency_histogram import LatencyHistogram, LatencyRegistry, get_latency_registry
+
+
+def test_percentiles_within_bucket_error():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.lognormal(10, 1.2, 50000), rng.integers(0, 40, 1000)]).astype(np.int64)
+    histogram = LatencyHistogram(precision_bits=4)
+    for v in values.tolist():
+        histogram.record(v)
+
+    assert histogram.count == len(values)
+    assert histogram.sum_ns == int(values.sum())
+    assert histogram.max_ns == int(values.max())
+    assert histogram.percentile(100) == histogram.max_ns
+    for q in [1, 50, 90, 99, 99.9]:
+        exact = np.percentile(values, q, method='inverted_cdf')
+        approx = histogram.percentile(q)
+        assert exact <= approx <= exact * (1 + 2 ** -4) + 1
+
+    # 小于 2^(p+1) 的值逐纳秒分桶，结果精确
+    small = LatencyHistogram(precision_bits=4)
+    for v in range(32):
+        small.record(v)
+    assert [small.percentile(q) for q in [50, 100]] == [15, 31]
+
+
+def test_batch_record_merge_and_octave_buckets():
+    histogram = LatencyHistogram()
+    histogram.record(1500, count=10)
+    histogram.record(-5)
+    other = LatencyHistogram()
+    other.record(70_000)
+    histogram.merge(other)
+
+    assert histogram.count == 12
+    assert histogram.mean() == (1500 * 10 + 70_000) / 12
+    buckets = dict(histogram.octave_buckets())
+    assert buckets[1] == 1 and buckets[1023] == 1 and buckets[2047] == 11
+    assert buckets[65535] == 11 and buckets[131071] == 12
+    assert max(buckets) >= histogram.max_ns
+
+    with pytest.raises(ValueError):
+        histogram.merge(LatencyHistogram(precision_bits=3))
+    histogram.reset()
+    assert histogram.count == 0 and histogram.percentile(99) == 0
+
+
+def test_prometheus_text_format():
+    registry = LatencyRegistry()
+    for v in [1000, 2000, 3000, 1_000_000]:
+        registry.record('cvd', v)
+    registry.record('decode', 50_000, source='shadow')
+
+    text = registry.prometheus_text()
+    assert '# TYPE triplea_stage_latency_seconds histogram' in text
+    assert 'triplea_stage_latency_seconds_count{stage="cvd",source="main"} 4' in text
+    assert 'triplea_stage_latency_seconds_bucket{stage="decode",source="shadow",le="+Inf"} 1' in text
+    assert 'triplea_stage_latency_seconds_quantile{stage="cvd",source="main",quantile="0.999"} 0.001' in text
+
+    sample = re.compile(r'^[a-z_]+\{[^}]*\} [0-9.e+-]+$')
+    for line in text.strip().splitlines():
+        assert line.startswith('# ') or sample.match(line), line
+
+    counts = [int(v) for v in re.findall(r'bucket\{stage="cvd",source="main",le="[^"]+"\} (\d+)', text)]
+    assert counts == sorted(counts) and counts[-1] == 4
+
+    assert 2000 <= registry.snapshot()[('cvd', 'main')]['p50_ns'] <= 2000 * (1 + 2 ** -4)
+
+
+def test_state_machine_records_stage_latency():
+    registry = get_latency_registry()
+    stages = [registry.histogram(stage, 'shadow') for stage in ['state_machine', 'cvd']]
+    before = [histogram.count for histogram in stages]
+
+    state_machine = TripleAStateMachine(TripleAEngineConfig(), is_shadow=True)
+    for i in range(200):
+        drive_coroutine(state_machine.process_tick(
+            NormalizedTick(ts=(1_700_000_000_000 + i * 20) * 1_000_000, px=3000.0 + (i % 7) * 0.01,
+                           sz=0.5, side=1 if i % 3 else -1)))
+
+    assert [histogram.count - count for histogram, count in zip(stages, before)] == [200, 200]
+    stats = state_machine.get_performance_stats()
+    assert stats['avg_processing_time_ns'] > 0
+    assert stats['p50_processing_time_ns'] <= stats['p99_processing_time_ns'] <= stats['p999_processing_time_ns']
+
+    # 性能统计只反映本实例：另一个影子实例不受影响，reset() 清零本实例而不动进程级直方图
+    other = TripleAStateMachine(TripleAEngineConfig(), is_shadow=True)
+    assert other.get_performance_stats()['avg_processing_time_ns'] == 0
+    assert state_machine.processing_latency.count == 200
+    state_machine.reset()
+    assert state_machine.get_performance_stats()['p99_processing_time_ns'] == 0
+    assert stages[0].count - before[0] == 200
@@ -5,8 +5,11 @@
 
 import gc
 import os
+import sys
 import time
-from typing import Dict
+import tracemalloc
+from dataclasses import fields, make_dataclass
+from typing import Callable, Dict, Tuple
 
 import matplotlib
 import numpy as np
@@ -15,6 +18,13 @@ import psutil
 matplotlib.use('Agg')  # 非交互式后端
 import matplotlib.pyplot as plt
 
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.data_feed.trade_tape import TRADE_TAPE_DTYPE
+from src.strategy.triplea.core.data_structures import NormalizedTick, OKXRawTick, PositionState, RangeBar
+from src.strategy.triplea.data_processing.range_bar_generator import RANGE_BAR_DTYPE
+
 
 class MemoryUsageBenchmark:
     """内存使用基准测试类"""
@@ -322,6 +332,84 @@ class MemoryUsageBenchmark:
         print(f"📊 图表已保存到: tests/performance/memory_usage_report.png")
 
 
+# ==========================================
+# 记录类内存与创建开销（__slots__ 前后对比）
+# ==========================================
+
+def _legacy_class(cls):
+    """按 cls 的字段重建一个不带 __slots__ 的普通 dataclass（即改造前的形态）"""
+    return make_dataclass(f"Legacy{cls.__name__}", [(f.name, f.type) for f in fields(cls)])
+
+
+def measure_records(factory: Callable[[int], object], n: int = 100_000) -> Tuple[float, float]:
+    """
+    创建 n 条记录并保存在列表中
+
+    Returns:
+        (每条记录占用字节数（含字段值对象与列表槽位）, 每条记录创建耗时 ns)
+    """
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    records = [factory(i) for i in range(n)]
+    bytes_per_record = (tracemalloc.get_traced_memory()[0] - baseline) / n
+    tracemalloc.stop()
+    del records
+
+    start = time.perf_counter_ns()
+    for i in range(n):
+        factory(i)
+    ns_per_record = (time.perf_counter_ns() - start) / n
+    return bytes_per_record, ns_per_record
+
+
+def _tick_factory(cls):
+    return lambda i: cls(1_700_000_000_000_000_000 + i, 3000.0 + i * 0.01, 0.5 + i, 1 if i % 2 else -1)
+
+
+def _range_bar_factory(cls):
+    return lambda i: cls(1_700_000_000_000_000_000 + i, 3000.0 + i, 3001.0 + i, 2999.0 + i, 3000.5 + i,
+                         10.0 + i, 9.0 + i, 0.0, 100 + i)
+
+
+def test_slotted_records_have_no_instance_dict():
+    records = [
+        OKXRawTick('ETH-USDT-SWAP', '1', 1, 3000.0, 0.5, 'buy'),
+        NormalizedTick(1, 3000.0, 0.5, 1),
+        RangeBar(1, 3000.0, 3001.0, 2999.0, 3000.5, 1.0, 0.5, 0.0, 3),
+        PositionState('p1', 'ETH-USDT-SWAP', 'LONG', 3000.0, 3000.0, 0.1, 0.0, 2990.0, 3020.0, 0.0, 0.0),
+    ]
+    for record in records:
+        assert not hasattr(record, '__dict__')
+        assert set(type(record).__slots__) == {f.name for f in fields(record)}
+
+
+def test_tick_bytes_per_record_before_and_after():
+    legacy_bytes, legacy_ns = measure_records(_tick_factory(_legacy_class(NormalizedTick)))
+    slotted_bytes, slotted_ns = measure_records(_tick_factory(NormalizedTick))
+    columnar_bytes = TRADE_TAPE_DTYPE.itemsize
+
+    print(f"\n🧠 NormalizedTick 每笔内存: 普通dataclass {legacy_bytes:.0f}B | __slots__ {slotted_bytes:.0f}B | "
+          f"TRADE_TAPE_DTYPE {columnar_bytes}B")
+    print(f"⏱️  NormalizedTick 每笔创建: 普通dataclass {legacy_ns:.0f}ns | __slots__ {slotted_ns:.0f}ns")
+
+    assert slotted_bytes < legacy_bytes
+    assert columnar_bytes < slotted_bytes
+    assert slotted_ns < legacy_ns * 1.5
+
+
+def test_range_bar_bytes_per_record_before_and_after():
+    legacy_bytes, legacy_ns = measure_records(_range_bar_factory(_legacy_class(RangeBar)), n=50_000)
+    slotted_bytes, slotted_ns = measure_records(_range_bar_factory(RangeBar), n=50_000)
+
+    print(f"\n🧠 RangeBar 每根内存: 普通dataclass {legacy_bytes:.0f}B | __slots__ {slotted_bytes:.0f}B | "
+          f"RANGE_BAR_DTYPE {RANGE_BAR_DTYPE.itemsize}B")
+    print(f"⏱️  RangeBar 每根创建: 普通dataclass {legacy_ns:.0f}ns | __slots__ {slotted_ns:.0f}ns")
+
+    assert slotted_bytes < legacy_bytes
+    assert RANGE_BAR_DTYPE.itemsize < slotted_bytes
+
+
 def main():
     """主函数：运行内存基准测试"""
     print("🔧 四号引擎v3.0内存使用基准测试启动...")
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+批量 Tick 接入测试
+验证 process_ticks（整帧列式输入）在 CVD、Range Bar、环形缓冲、状态机和信号生成器各层
+与逐笔调用的结果完全一致，包括持仓期间的向量化止损/止盈扫描
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from src.strategy.triplea.core.data_structures import NormalizedTick, RangeBarConfig, TripleAEngineConfig
+from src.strategy.triplea.core.ring_buffer import SoARingBuffer
+from src.strategy.triplea.data_processing.cvd_calculator import CVDCalculator
+from src.strategy.triplea.data_processing.range_bar_generator import RangeBarGenerator
+from src.strategy.triplea.replay import drive_coroutine, make_synthetic_ticks
+from src.strategy.triplea.signal.signal_generator import TripleASignalGenerator
+from src.strategy.triplea.state_machine.state_machine import TripleAState, TripleAStateMachine
+
+
+def make_columns(n, seed=0, mean_interval_ms=20):
+    ticks = make_synthetic_ticks(n, seed=seed, mean_interval_ms=mean_interval_ms)
+    return ticks, ticks['ts'].astype(np.int64) * 1_000_000, ticks['px'], ticks['sz'], ticks['side']
+
+
+def iter_ticks(ts, px, sz, side):
+    for t, p, s, d in zip(ts.tolist(), px.tolist(), sz.tolist(), side.tolist()):
+        yield NormalizedTick(ts=t, px=p, sz=s, side=d)
+
+
+def random_chunks(n, seed, max_size=80):
+    rng = np.random.default_rng(seed)
+    i = 0
+    while i < n:
+        j = min(n, i + int(rng.integers(1, max_size)))
+        yield i, j
+        i = j
+
+
+def test_ring_buffer_extend_matches_append():
+    rng = np.random.default_rng(0)
+    fields = {'a': np.float64, 'b': np.int8}
+    expected, actual = SoARingBuffer(37, fields), SoARingBuffer(37, fields)
+    for n in [0, 1, 5, 36, 37, 80, 3]:
+        a = rng.normal(size=n)
+        b = rng.integers(-1, 2, n).astype(np.int8)
+        for x, y in zip(a, b):
+            expected.append(x, y)
+        actual.extend(a, b)
+        assert len(actual) == len(expected)
+        for name in fields:
+            assert actual.view(name).tolist() == expected.view(name).tolist()
+        assert actual._pos == expected._pos
+
+
+def test_cvd_process_ticks_matches_on_tick():
+    _, ts, px, sz, side = make_columns(4000, seed=1)
+    expected = CVDCalculator(window_sizes=[10, 60, 240], max_history=300)
+    for tick in iter_ticks(ts, px, sz, side):
+        expected_values = expected.on_tick(tick)
+
+    actual = CVDCalculator(window_sizes=[10, 60, 240], max_history=300)
+    for i, j in random_chunks(len(px), seed=1, max_size=400):
+        values = actual.process_ticks(ts[i:j], px[i:j], sz[i:j], side[i:j])
+
+    assert values == expected_values
+    assert actual.get_statistics() == expected.get_statistics()
+    for window in [10, 60, 240]:
+        assert actual.get_history(window) == expected.get_history(window)
+    assert actual.delta_buffer.view('delta').tolist() == expected.delta_buffer.view('delta').tolist()
+
+
+def test_range_bar_process_ticks_interleaves_with_on_tick():
+    config = RangeBarConfig(tick_range=8, tick_size=0.01)
+    _, ts, px, sz, side = make_columns(5000, seed=2)
+    expected = RangeBarGenerator(config)
+    expected_bars = [bar for bar in map(expected.on_tick, iter_ticks(ts, px, sz, side)) if bar is not None]
+    assert len(expected_bars) > 10
+
+    actual = RangeBarGenerator(config)
+    bars = []
+    for k, (i, j) in enumerate(random_chunks(len(px), seed=2, max_size=300)):
+        if k % 3 == 0:
+            bars += [bar for bar in map(actual.on_tick, iter_ticks(ts[i:j], px[i:j], sz[i:j], side[i:j])) if bar]
+        else:
+            bars += actual.process_ticks(ts[i:j], px[i:j], sz[i:j], side[i:j])
+
+    assert [bar.to_dict() for bar in bars] == [bar.to_dict() for bar in expected_bars]
+    assert actual.get_current_bar().to_dict() == expected.get_current_bar().to_dict()
+    for key in ['ticks_processed', 'bars_generated']:
+        assert actual.stats[key] == expected.stats[key]
+    assert len(actual.bar_history) == len(expected.bar_history)
+
+
+def make_state_machine():
+    """放宽阈值并周期性强制开仓，让持仓出场路径被覆盖"""
+    state_machine = TripleAStateMachine(TripleAEngineConfig(), is_shadow=True)
+    state_machine.min_compression_duration = 1.0
+    state_machine.min_tick_density = 20
+    state_machine.vol_compression_threshold = 6.0
+
+    handle_idle = state_machine._handle_idle_state
+    next_entry = [700]
+
+    def handle_idle_with_entries(tick):
+        context = state_machine.context
+        if context.stats['total_ticks_processed'] < next_entry[0]:
+            return handle_idle(tick)
+        next_entry[0] += 1500
+        is_long = (next_entry[0] // 1500) % 2 == 0
+        context.trade_direction = 'LONG' if is_long else 'SHORT'
+        context.entry_price = tick.px
+        context.stop_loss_price = tick.px - 0.3 if is_long else tick.px + 0.3
+        context.take_profit_price = tick.px + 0.4 if is_long else tick.px - 0.4
+        context.update_state(TripleAState.POSITION, "测试强制开仓")
+        return {'action': 'OPEN_LONG' if is_long else 'OPEN_SHORT', 'price': tick.px}
+
+    state_machine._handle_idle_state = handle_idle_with_entries
+    return state_machine
+
+
+def snapshot(state_machine):
+    context = state_machine.context
+    return (
+        context.current_state, context.trade_direction, context.stop_loss_price, context.large_order_threshold,
+        context.ticks_per_second, context.price_range_ticks, context.absorption_score,
+        context.stats['total_ticks_processed'], context.stats['state_transitions'],
+        [(state, t) for state, t, _ in context.state_history],
+        context.current_cvd_values, context.cvd_statistics,
+        state_machine.tick_buffer.view('ts').tolist(), state_machine.tick_buffer.view('sz').tolist(),
+        state_machine.large_order_sizes._sorted, sorted(state_machine.footprint_ladder.levels.items()),
+        state_machine.clock.now_ns(),
+    )
+
+
+@pytest.mark.parametrize("seed,mean_interval_ms", [(1, 20), (2, 60)])
+def test_state_machine_process_ticks_matches_process_tick(seed, mean_interval_ms):
+    _, ts, px, sz, side = make_columns(12000, seed=seed, mean_interval_ms=mean_interval_ms)
+
+    expected = make_state_machine()
+    expected_signals = []
+    for i, tick in enumerate(iter_ticks(ts, px, sz, side)):
+        signal = drive_coroutine(expected.process_tick(tick))
+        if signal:
+            expected_signals.append((i, signal))
+    closes = [signal for _, signal in expected_signals if signal['action'].startswith('CLOSE')]
+    assert len(closes) >= 2
+
+    actual = make_state_machine()
+    signals = []
+    for i, j in random_chunks(len(px), seed=seed):
+        returned = drive_coroutine(actual.process_ticks(
+            ts[i:j], px[i:j], sz[i:j], side[i:j],
+            on_signal=lambda k, signal, offset=i: signals.append((offset + k, signal))))
+        assert returned == [signal for k, signal in signals if k >= i]
+
+    strip = lambda items: [(i, {k: v for k, v in s.items() if k != 'timestamp'}) for i, s in items]
+    assert strip(signals) == strip(expected_signals)
+    assert snapshot(actual) == snapshot(expected)
+
+
+def fail_on_ticks(state_machine, bad_ts):
+    """让状态分发在指定时间戳的Tick上抛异常"""
+    dispatch = state_machine._dispatch_state
+
+    def dispatch_or_raise(tick):
+        if tick.ts in bad_ts:
+            raise ValueError(f"bad tick {tick.ts}")
+        return dispatch(tick)
+
+    state_machine._dispatch_state = dispatch_or_raise
+    return state_machine
+
+
+def test_state_machine_process_ticks_skips_failing_tick():
+    _, ts, px, sz, side = make_columns(3000, seed=5)
+    bad_ts = {ts[700], ts[1501]}
+
+    # 逐笔参照：上层 (TripleASignalGenerator.process_tick) 捕获异常后继续处理下一笔
+    expected = fail_on_ticks(TripleAStateMachine(TripleAEngineConfig(), is_shadow=True), bad_ts)
+    for tick in iter_ticks(ts, px, sz, side):
+        try:
+            drive_coroutine(expected.process_tick(tick))
+        except ValueError:
+            pass
+
+    actual = fail_on_ticks(TripleAStateMachine(TripleAEngineConfig(), is_shadow=True), bad_ts)
+    drive_coroutine(actual.process_ticks(ts[:1000], px[:1000], sz[:1000], side[:1000]))
+    drive_coroutine(actual.process_ticks(ts[1000:], px[1000:], sz[1000:], side[1000:]))
+
+    assert actual.context.stats['total_ticks_processed'] == len(px) - 2
+    assert snapshot(actual) == snapshot(expected)
+
+
+def test_signal_generator_process_ticks_on_trade_tape():
+    ticks, _, _, _, _ = make_columns(6000, seed=3)
+    expected = TripleASignalGenerator(is_shadow=True)
+    expected_signals = []
+    for ts, px, sz, side in zip(ticks['ts'].tolist(), ticks['px'].tolist(),
+                                ticks['sz'].tolist(), ticks['side'].tolist()):
+        signal = drive_coroutine(expected.process_tick(
+            {'ts': ts, 'price': px, 'size': sz, 'side': 'buy' if side == 1 else 'sell'}))
+        if signal:
+            expected_signals.append(signal)
+
+    actual = TripleASignalGenerator(is_shadow=True)
+    signals = []
+    for i, j in random_chunks(len(ticks), seed=3):
+        signals += drive_coroutine(actual.process_ticks(ticks[i:j]))
+
+    assert len(signals) == len(expected_signals)
+    assert actual.processed_ticks == expected.processed_ticks == len(ticks)
+    assert actual.status == expected.status
+    assert actual.state_machine.context.stats['state_transitions'] == \
+        expected.state_machine.context.stats['state_transitions']
+    assert actual.state_machine.tick_buffer.view('px').tolist() == expected.state_machine.tick_buffer.view('px').tolist()
+    assert drive_coroutine(actual.process_ticks(ticks[:0])) == []
+
+
+def test_fills_flow_into_large_order_detector():
+    _, ts, px, sz, side = make_columns(3000, seed=4)
+    fills = np.random.default_rng(4).integers(1, 6, len(px)).astype(np.int32)
+
+    expected = TripleAStateMachine(TripleAEngineConfig(), is_shadow=True)
+    for tick, n_fills in zip(iter_ticks(ts, px, sz, side), fills.tolist()):
+        drive_coroutine(expected.process_tick(tick, n_fills))
+    actual = TripleAStateMachine(TripleAEngineConfig(), is_shadow=True)
+    for i, j in random_chunks(len(px), seed=4):
+        drive_coroutine(actual.process_ticks(ts[i:j], px[i:j], sz[i:j], side[i:j], fills=fills[i:j]))
+    assert actual.tick_buffer.view('fills').tolist() == expected.tick_buffer.view('fills').tolist() == \
+        fills[-actual.tick_buffer.capacity:].tolist()
+
+    state_machine = actual
+    state_machine.large_order_quantile = 80.0
+    state_machine.large_order_median_multiplier = 0.0
+    state_machine.last_large_order_trigger_ts = 0.0
+    state_machine._detect_large_order_bubble()
+    context = state_machine.context
+    m = state_machine.large_order_ratio_window_ticks
+    hit_mask = state_machine.tick_buffer.view('sz', m) >= context.large_order_threshold
+    assert context.large_order_hits == int(hit_mask.sum()) > 0
+    assert context.large_order_fills_per_aggressor == float(np.mean(fills[-m:][hit_mask]))
+
+    # 提高每个主动单的最小成交笔数后不再触发
+    state_machine.large_order_ratio_threshold = 0.0
+    context.cvd_divergence_direction = None
+    state_machine.large_order_min_fills_per_aggressor = 100.0
+    state_machine.last_large_order_trigger_ts = 0.0
+    assert state_machine._detect_large_order_bubble() is False
+    state_machine.large_order_min_fills_per_aggressor = 1.0
+    state_machine.last_large_order_trigger_ts = 0.0
+    assert state_machine._detect_large_order_bubble() is True
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+CVD 增量统计测试
+验证滚动和/平方和得到的均值、标准差、Z-score 与直接对历史做 np.mean/np.std 一致
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from src.strategy.triplea.core.data_structures import NormalizedTick
+from src.strategy.triplea.data_processing.cvd_calculator import CVDCalculator
+
+
+def numpy_statistics(calculator, window):
+    """旧实现：每次对整段历史调用 np.mean / np.std"""
+    history = np.array(calculator.get_history(window))
+    mean_val = np.mean(history)
+    std_val = np.std(history, ddof=1)
+    z_score = (calculator.window_cvd[window] - mean_val) / std_val if std_val > 0 else 0.0
+    return mean_val, std_val, z_score
+
+
+def feed(calculator, n, seed=0, buy_prob=0.5, offset=0):
+    rng = np.random.default_rng(seed)
+    for i in range(n):
+        side = 1 if rng.random() < buy_prob else -1
+        calculator.on_tick(NormalizedTick(ts=offset + i, px=3000.0, sz=float(rng.lognormal()), side=side))
+
+
+@pytest.mark.parametrize("buy_prob", [0.5, 0.6])
+def test_incremental_statistics_match_numpy(buy_prob):
+    calculator = CVDCalculator(window_sizes=[10, 60, 240], max_history=300)
+    for step in range(12):
+        feed(calculator, 137, seed=step, buy_prob=buy_prob, offset=step * 137)
+        stats = calculator.get_statistics()
+        for window in calculator.window_sizes:
+            mean_val, std_val, z_score = numpy_statistics(calculator, window)
+            assert stats[window]['mean'] == pytest.approx(mean_val, rel=1e-9, abs=1e-9)
+            assert stats[window]['std'] == pytest.approx(std_val, rel=1e-9)
+            assert stats[window]['z_score'] == pytest.approx(z_score, rel=1e-7, abs=1e-9)
+
+
+def test_no_drift_after_many_resyncs():
+    # 强趋势让 CVD 远离 0，检验平移量与周期性重算能抑制大数相消误差
+    calculator = CVDCalculator(window_sizes=[240], max_history=100)
+    feed(calculator, 5000, buy_prob=0.9)
+    stats = calculator.get_statistics(240)[240]
+    mean_val, std_val, _ = numpy_statistics(calculator, 240)
+    assert stats['mean'] == pytest.approx(mean_val, rel=1e-12)
+    assert stats['std'] == pytest.approx(std_val, rel=1e-9)
+
+
+def test_repeated_reads_reuse_cached_stats():
+    calculator = CVDCalculator(window_sizes=[10], max_history=50)
+    feed(calculator, 30)
+    first = calculator.get_statistics()[10]
+    assert calculator.get_statistics()[10] is first
+
+    feed(calculator, 1, seed=1, offset=30)
+    assert calculator.get_statistics()[10] is not first
+
+
+def test_reset_clears_running_sums():
+    calculator = CVDCalculator(window_sizes=[10], max_history=50)
+    feed(calculator, 80, buy_prob=0.9)
+    calculator.reset()
+    feed(calculator, 40, seed=3)
+    stats = calculator.get_statistics(10)[10]
+    mean_val, std_val, _ = numpy_statistics(calculator, 10)
+    assert stats['mean'] == pytest.approx(mean_val, rel=1e-9, abs=1e-9)
+    assert stats['std'] == pytest.approx(std_val, rel=1e-9)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+四号引擎事件时钟测试
+验证状态机的超时、冷却与时间窗口由 Tick 时间戳驱动，回放结果与墙钟无关且可复现
+"""
+import os
+import sys
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from src.strategy.triplea.core.clock import EventClock, WallClock
+from src.strategy.triplea.core.data_structures import NormalizedTick, TripleAEngineConfig
+from src.strategy.triplea.replay import drive_coroutine, make_synthetic_ticks
+from src.strategy.triplea.state_machine.state_machine import TripleAStateMachine, TripleAState
+
+T0_NS = 1_700_000_000_000_000_000
+
+
+def feed(state_machine, ts_ns, px=3000.0, sz=0.1, side=1):
+    return drive_coroutine(state_machine.process_tick(NormalizedTick(ts=ts_ns, px=px, sz=sz, side=side)))
+
+
+def test_event_clock_is_monotonic():
+    clock = EventClock()
+    assert clock.now() == 0.0
+    clock.on_tick(T0_NS + 2_000_000_000)
+    clock.on_tick(T0_NS)  # 乱序 Tick 不会让时间倒退
+    assert clock.now_ns() == T0_NS + 2_000_000_000
+    assert clock.now() == (T0_NS + 2_000_000_000) / 1e9
+    clock.reset()
+    assert clock.now_ns() == 0
+
+
+def test_state_timeout_uses_tick_time():
+    state_machine = TripleAStateMachine(TripleAEngineConfig(), is_shadow=True)
+    assert isinstance(state_machine.clock, EventClock)
+
+    feed(state_machine, T0_NS)
+    assert state_machine.get_current_state() == TripleAState.MONITORING
+
+    # 墙钟几乎没有流逝，但 Tick 时间已经超过监控超时 (120s)
+    feed(state_machine, T0_NS + 121 * 1_000_000_000)
+    assert state_machine.get_current_state() == TripleAState.IDLE
+    assert state_machine.context.state_enter_time == T0_NS / 1e9 + 121
+
+
+def test_buffers_stamped_with_tick_time():
+    state_machine = TripleAStateMachine(TripleAEngineConfig(), is_shadow=True)
+    for i in range(5):
+        feed(state_machine, T0_NS + i * 250_000_000)
+    np.testing.assert_allclose(state_machine.tick_buffer.view('ts'), T0_NS / 1e9 + np.arange(5) * 0.25)
+
+
+def test_wall_clock_keeps_legacy_behaviour():
+    state_machine = TripleAStateMachine(TripleAEngineConfig(), is_shadow=True, clock=WallClock())
+    feed(state_machine, T0_NS)
+    feed(state_machine, T0_NS + 121 * 1_000_000_000)
+    assert state_machine.get_current_state() == TripleAState.MONITORING
+
+
+def test_replay_is_deterministic():
+    ticks = make_synthetic_ticks(1500, seed=7)
+
+    def run():
+        state_machine = TripleAStateMachine(TripleAEngineConfig(), is_shadow=True)
+        for ts, px, sz, side in zip(ticks['ts'].tolist(), ticks['px'].tolist(),
+                                    ticks['sz'].tolist(), ticks['side'].tolist()):
+            feed(state_machine, ts * 1_000_000, px, sz, side)
+        return [(state, t) for state, t, _ in state_machine.context.state_history]
+
+    assert run() == run()
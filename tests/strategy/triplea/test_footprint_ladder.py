@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+增量足迹价格阶梯测试
+验证滑动窗口增删后的档位买/卖量与按窗口重新聚合的结果一致
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from src.strategy.triplea.data_processing.footprint_ladder import FootprintLadder
+
+
+def rebuild_reference(prices, sizes, sides, tick_size):
+    """旧实现：按窗口重新聚合每个价格档位"""
+    levels = {}
+    for px, sz, side in zip(prices, sizes, sides):
+        if sz <= 0 or side == 0:
+            continue
+        key = int(round(px / tick_size))
+        buy, sell = levels.get(key, (0.0, 0.0))
+        levels[key] = (buy + sz, sell) if side > 0 else (buy, sell + sz)
+    return [(key * tick_size, buy, sell) for key, (buy, sell) in sorted(levels.items())]
+
+
+def make_ticks(n, seed=0):
+    rng = np.random.default_rng(seed)
+    prices = np.round(3000.0 + np.cumsum(rng.choice([-1, 0, 1], size=n)) * 0.01, 2)
+    sizes = np.round(rng.lognormal(0.0, 1.0, n), 3)
+    sizes[rng.random(n) < 0.02] = 0.0
+    sides = rng.choice([1, -1], size=n)
+    return prices, sizes, sides
+
+
+@pytest.mark.parametrize("window", [1, 20, 120])
+def test_ladder_matches_full_rebuild(window):
+    prices, sizes, sides = make_ticks(1500)
+    ladder = FootprintLadder(tick_size=0.01, window_ticks=window)
+    for i in range(len(prices)):
+        ladder.add(float(prices[i]), float(sizes[i]), int(sides[i]))
+        if i % 37 == 0 or i == len(prices) - 1:
+            lo = max(i + 1 - window, 0)
+            expected = rebuild_reference(prices[lo:i + 1], sizes[lo:i + 1], sides[lo:i + 1], 0.01)
+            actual = ladder.sorted_levels()
+            assert len(ladder) == i + 1 - lo
+            assert [row[0] for row in actual] == pytest.approx([row[0] for row in expected])
+            np.testing.assert_allclose([row[1:] for row in actual], [row[1:] for row in expected], atol=1e-9)
+            assert ladder.total_volume == pytest.approx(float(np.sum(sizes[lo:i + 1])), abs=1e-9)
+
+
+def test_emptied_side_resets_to_exact_zero():
+    ladder = FootprintLadder(tick_size=0.01, window_ticks=2)
+    ladder.add(100.00, 0.1, 1)
+    ladder.add(100.00, 0.7, -1)
+    ladder.add(100.00, 0.2, -1)  # 买单滑出窗口
+    assert ladder.sorted_levels() == [(pytest.approx(100.00), 0.0, pytest.approx(0.9))]
+    ladder.add(100.05, 0.3, 1)
+    ladder.add(100.05, 0.4, 1)  # 100.00 档位全部滑出后被删除
+    assert [row[0] for row in ladder.sorted_levels()] == [pytest.approx(100.05)]
+
+
+def test_rebuild_and_diagonal_imbalance():
+    ladder = FootprintLadder(tick_size=0.5, window_ticks=10)
+    ladder.rebuild([100.0, 100.0, 100.5, 100.5, 101.0],
+                   [2.0, 1.0, 6.0, 3.0, 0.5],
+                   [-1, 1, 1, -1, 1], window_ticks=4)
+    assert len(ladder) == 4
+    assert ladder.window_ticks == 4
+    rows = {round(px, 1): (buy_ratio, sell_ratio) for px, buy_ratio, sell_ratio in ladder.diagonal_imbalances()}
+    # 100.0 档的卖单已滑出窗口：100.5 的主动买 6 对下方 0 卖量
+    assert rows[100.5][0] == pytest.approx(6.0 / 1e-8)
+    # 100.5 的主动卖 3 对上方 101.0 的主动买 0.5
+    assert rows[100.5][1] == pytest.approx(6.0)
+    assert rows[101.0][0] == pytest.approx(0.5 / 3.0)
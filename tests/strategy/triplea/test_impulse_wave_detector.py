@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+脉冲波检测器增量统计测试
+用旧实现（每个 Tick 从完整历史重新建数组）逐 Tick 对照，要求检测结果逐位一致
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from src.strategy.triplea.core.data_structures import KDEEngineConfig, NormalizedTick
+from src.strategy.triplea.data_processing.impulse_wave_detector import ImpulseWaveDetector
+
+
+def reference_window_stats(history, lookback):
+    """
+    旧实现：对完整历史切片后重新计算各项窗口统计
+
+    方向一致性即原 _calculate_directional_consistency：对窗口价格做 np.diff，取上涨/下跌价差数的较大者除以价差总数；
+    检测器的 _directional_consistency_from_counts 用滑动涨跌计数得到同样的结果
+    """
+    prices = np.array([t.px for t in history[-lookback:]])
+    volumes = np.array([t.sz for t in history[-lookback:]])
+    returns = np.diff(prices) / prices[:-1]
+    diffs = np.diff(prices)
+    consistency = max(np.sum(diffs > 0), np.sum(diffs < 0)) / len(diffs)
+    return {
+        'time_window_seconds': (history[-1].ts - history[-lookback].ts) / 1e9,
+        'price_change_pct': abs((prices[-1] - prices[0]) / prices[0] * 100),
+        'recent_avg_volume': np.mean(volumes),
+        'recent_volatility': np.std(returns),
+        'directional_consistency': consistency,
+    }
+
+
+def make_ticks(n, seed=0):
+    rng = np.random.default_rng(seed)
+    ts = 1_700_000_000_000_000_000 + np.cumsum(rng.exponential(1e8, n)).astype(np.int64)
+    steps = rng.choice([-1, 0, 0, 1], size=n) * 0.5
+    steps[300:340] += 1.0  # 一段单边拉升
+    px = np.round(3000.0 + np.cumsum(steps), 2)
+    sz = np.round(rng.lognormal(0.0, 1.0, n), 3)
+    sz[300:340] *= 4
+    return [NormalizedTick(ts=int(ts[i]), px=float(px[i]), sz=float(sz[i]), side=1 if i % 3 else -1)
+            for i in range(n)]
+
+
+@pytest.mark.parametrize("lookback", [15, 50])
+def test_window_statistics_match_full_recompute(lookback):
+    config = KDEEngineConfig()
+    config.lookback_window_ticks = lookback
+    detector = ImpulseWaveDetector(config)
+    ticks = make_ticks(800)
+    for i, tick in enumerate(ticks):
+        detector.process_tick(tick)
+        history = ticks[max(0, i - 199):i + 1]
+
+        if len(history) >= 50:
+            assert detector.avg_volume == np.mean([t.sz for t in history[-50:]])
+        if len(history) >= 100:
+            prices = np.array([t.px for t in history[-100:]])
+            assert detector.historical_volatility == np.std(np.diff(prices) / prices[:-1])
+
+        if len(history) >= lookback:
+            expected = reference_window_stats(history, lookback)
+            result = detector._detect_impulse_wave(tick)
+            assert result['time_window_seconds'] == expected['time_window_seconds']
+            assert result['price_change_pct'] == expected['price_change_pct']
+            assert result['directional_consistency'] == expected['directional_consistency']
+            if detector.avg_volume > 0:
+                assert result['volume_multiplier'] == expected['recent_avg_volume'] / detector.avg_volume
+            if detector.historical_volatility > 0:
+                assert result['volatility_ratio'] == expected['recent_volatility'] / detector.historical_volatility
+
+
+def test_lookback_change_recounts_moves():
+    config = KDEEngineConfig()
+    config.lookback_window_ticks = 20
+    detector = ImpulseWaveDetector(config)
+    ticks = make_ticks(400, seed=3)
+    for i, tick in enumerate(ticks):
+        if i == 250:
+            config.lookback_window_ticks = 35
+        detector.process_tick(tick)
+    lookback = config.lookback_window_ticks
+    expected = reference_window_stats(ticks, lookback)['directional_consistency']
+    assert detector._directional_consistency_from_counts(lookback - 1) == expected
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Range Bar 批量内核等价性测试
+BatchRangeBarGenerator / MultiRangeBarGenerator（Numba 内核）在任意分批方式下都要与 RangeBarGenerator.on_tick 逐根一致
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from src.strategy.triplea.core.data_structures import NormalizedTick, RangeBarConfig
+from src.strategy.triplea.data_processing.range_bar_generator import (
+    RANGE_BAR_DTYPE, BatchRangeBarGenerator, MultiRangeBarGenerator, RangeBarGenerator
+)
+
+BAR_FIELDS = ['open_ts', 'open_px', 'high_px', 'low_px', 'close_px',
+              'total_buy_vol', 'total_sell_vol', 'delta', 'tick_count']
+
+
+def make_tick_arrays(n, seed=0):
+    rng = np.random.default_rng(seed)
+    ts = 1_700_000_000_000_000_000 + np.cumsum(rng.integers(1, 10, n) * 1_000_000)
+    px = np.round(3000.0 + np.cumsum(rng.normal(0.0, 0.3, n)), 2)
+    sz = np.round(rng.uniform(0.1, 5.0, n), 3)
+    side = rng.choice(np.array([1, -1], dtype=np.int8), n)
+    return ts, px, sz, side
+
+
+def reference_bars(config, ts, px, sz, side):
+    generator = RangeBarGenerator(config)
+    bars, close_ts = [], []
+    for i in range(len(px)):
+        bar = generator.on_tick(NormalizedTick(ts=int(ts[i]), px=float(px[i]), sz=float(sz[i]), side=int(side[i])))
+        if bar is not None:
+            bars.append(bar)
+            close_ts.append(int(ts[i]))
+    return bars, close_ts, generator.get_current_bar()
+
+
+@pytest.mark.parametrize("chunk", [1, 7, 100, 5000])
+def test_kernel_matches_on_tick(chunk):
+    config = RangeBarConfig(tick_range=150, tick_size=0.01)
+    ts, px, sz, side = make_tick_arrays(5000)
+    expected, expected_close_ts, expected_partial = reference_bars(config, ts, px, sz, side)
+    assert len(expected) > 10
+
+    generator = BatchRangeBarGenerator(config, output_capacity=4)
+    parts = [generator.add_tick_arrays(ts[i:i + chunk], px[i:i + chunk], sz[i:i + chunk], side[i:i + chunk])
+             for i in range(0, len(px), chunk)]
+    bars = np.concatenate(parts)
+
+    assert bars.dtype == RANGE_BAR_DTYPE
+    assert len(bars) == len(expected)
+    for name in BAR_FIELDS:
+        assert bars[name].tolist() == [getattr(bar, name) for bar in expected]
+    assert bars['close_ts'].tolist() == expected_close_ts
+    np.testing.assert_array_equal(bars['duration'], bars['close_ts'] - bars['open_ts'])
+
+    # 跨批次延续的未闭合 Bar
+    partial = generator.current_bar
+    for name in BAR_FIELDS:
+        assert getattr(partial, name) == getattr(expected_partial, name)
+    assert generator.stats['bars_generated'] == len(expected)
+
+
+def test_add_ticks_object_path_and_reset():
+    config = RangeBarConfig(tick_range=50, tick_size=0.01)
+    ts, px, sz, side = make_tick_arrays(2000, seed=1)
+    ticks = [NormalizedTick(ts=int(ts[i]), px=float(px[i]), sz=float(sz[i]), side=int(side[i]))
+             for i in range(len(px))]
+    expected, _, _ = reference_bars(config, ts, px, sz, side)
+
+    generator = BatchRangeBarGenerator(config)
+    bars = generator.add_ticks(ticks[:999]) + generator.add_ticks(ticks[999:])
+    assert [(b.open_ts, b.close_px, b.total_buy_vol, b.tick_count) for b in bars] == \
+           [(b.open_ts, b.close_px, b.total_buy_vol, b.tick_count) for b in expected]
+    assert len(generator.bar_history) == len(expected)
+    assert generator.flush() == []
+
+    generator.reset()
+    assert generator.current_bar is None
+    assert len(generator.add_tick_arrays(ts[:0], px[:0], sz[:0], side[:0])) == 0
+
+
+def test_multi_threshold_matches_single_threshold_generators():
+    ts, px, sz, side = make_tick_arrays(6000, seed=2)
+    tick_ranges = [40, 150, 300]
+    generator = MultiRangeBarGenerator(tick_ranges, tick_size=0.01, output_capacity=2)
+    parts = [generator.add_tick_arrays(ts[i:i + 1000], px[i:i + 1000], sz[i:i + 1000], side[i:i + 1000])
+             for i in range(0, len(px), 1000)]
+
+    for tick_range in tick_ranges:
+        expected, expected_close_ts, _ = reference_bars(
+            RangeBarConfig(tick_range=tick_range, tick_size=0.01), ts, px, sz, side)
+        assert len(expected) > 0
+        for name in BAR_FIELDS:
+            actual = np.concatenate([part[tick_range][name] for part in parts]).tolist()
+            assert actual == [getattr(bar, name) for bar in expected]
+        assert np.concatenate([part[tick_range]['close_ts'] for part in parts]).tolist() == expected_close_ts
+
+
+def test_multi_threshold_from_percentages():
+    generator = MultiRangeBarGenerator.from_percentages([0.05, 0.1], reference_price=3000.0, tick_size=0.01)
+    assert generator.tick_ranges.tolist() == [150.0, 300.0]
+    with pytest.raises(ValueError):
+        MultiRangeBarGenerator([])
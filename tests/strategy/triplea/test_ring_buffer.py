@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+SoA 环形缓冲区测试
+验证追加/回绕后的 "最近 N 条" 视图与 deque 语义一致，且视图为零拷贝
+"""
+import os
+import sys
+from collections import deque
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from src.strategy.triplea.core.ring_buffer import (
+    SoARingBuffer, TickRingBuffer, time_window_bounds, time_window_start
+)
+
+
+@pytest.mark.parametrize("n_items", [0, 1, 7, 10, 11, 25, 103])
+def test_views_match_deque(n_items):
+    capacity = 10
+    buffer = TickRingBuffer(capacity)
+    reference = deque(maxlen=capacity)
+    for i in range(n_items):
+        buffer.append(float(i), 100.0 + i, 0.5 * i, 1 if i % 2 else -1)
+        reference.append(i)
+
+    assert len(buffer) == len(reference)
+    expected = np.array(reference, dtype=float)
+    np.testing.assert_array_equal(buffer.view('ts'), expected)
+    np.testing.assert_array_equal(buffer.view('px'), 100.0 + expected)
+    for n in (1, 3, capacity, capacity + 5):
+        np.testing.assert_array_equal(buffer.view('sz', n), 0.5 * expected[-n:])
+    if n_items:
+        assert buffer.last('ts') == n_items - 1
+
+
+def test_view_is_zero_copy():
+    buffer = TickRingBuffer(8)
+    for i in range(21):
+        buffer.append(float(i), 1.0, 1.0, 1)
+    view = buffer.view('ts', 5)
+    assert np.shares_memory(view, buffer.ts)
+    assert view.flags['C_CONTIGUOUS']
+
+
+def test_generic_fields_and_clear():
+    buffer = SoARingBuffer(4, {'a': np.int64, 'b': np.float32})
+    for i in range(6):
+        buffer.append(i, i / 2)
+    np.testing.assert_array_equal(buffer.view('a'), [2, 3, 4, 5])
+    assert buffer.view('b').dtype == np.float32
+
+    buffer.clear()
+    assert len(buffer) == 0
+    assert len(buffer.view('a')) == 0
+    with pytest.raises(IndexError):
+        buffer.last('a')
+
+
+def test_count_since_matches_mask():
+    rng = np.random.default_rng(3)
+    buffer = TickRingBuffer(200)
+    for ts in np.cumsum(rng.exponential(0.05, 500)).round(2):  # 含重复时间戳
+        buffer.append(ts, 1.0, 1.0, 1)
+    times = buffer.view('ts')
+    for cutoff in [times[0] - 1, times[0], times[57], times[57] + 1e-9, times[-1], times[-1] + 1]:
+        assert buffer.count_since(cutoff) == int(np.sum(times >= cutoff))
+        start = time_window_start(times, cutoff)
+        np.testing.assert_array_equal(times[start:], times[times >= cutoff])
+
+
+def test_time_window_bounds_match_masks():
+    times = np.array([0.0, 0.1, 0.1, 0.5, 1.0, 1.0, 1.7, 2.4, 3.0])
+    lefts = np.arange(4) * 0.8
+    lo, hi = time_window_bounds(times, lefts, lefts + 0.8)
+    for k, left in enumerate(lefts):
+        mask = (times >= left) & (times < left + 0.8)
+        np.testing.assert_array_equal(times[lo[k]:hi[k]], times[mask])
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+滑动窗口分位数测试
+验证 RollingQuantile 在数量/时间淘汰下与 np.percentile / np.median 逐位一致，
+以及状态机大单阈值改用它之后的结果不变
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from src.strategy.triplea.core.data_structures import NormalizedTick, TripleAEngineConfig
+from src.strategy.triplea.replay import drive_coroutine, make_synthetic_ticks
+from src.strategy.triplea.state_machine.state_machine import TripleAStateMachine
+from src.utils.rolling_quantile import RollingQuantile
+
+QUANTILES = [0, 10, 33.3, 50, 90, 95, 97.5, 99, 100]
+
+
+def test_matches_numpy_with_count_and_time_eviction():
+    rng = np.random.default_rng(1)
+    values = np.round(rng.lognormal(size=3000), 3)  # 含大量重复值
+    times = np.cumsum(rng.exponential(0.01, 3000))
+    window = RollingQuantile(maxlen=300)
+    for i in range(len(values)):
+        window.add(float(values[i]), float(times[i]))
+        cutoff = float(times[i]) - 2.0
+        window.evict_before(cutoff)
+
+        lo = max(0, i - 299)
+        expected = values[lo:i + 1][times[lo:i + 1] >= cutoff]
+        assert len(window) == len(expected)
+        if i % 7 == 0:
+            for q in QUANTILES:
+                assert window.percentile(q) == float(np.percentile(expected, q))
+            assert window.quantile(0.95) == float(np.quantile(expected, 0.95))
+            assert window.median() == float(np.median(expected))
+
+
+def test_rebuild_and_errors():
+    window = RollingQuantile()
+    with pytest.raises(ValueError):
+        window.percentile(50)
+    window.rebuild([5.0, 1.0, 3.0], [0.0, 1.0, 2.0])
+    assert window.median() == 3.0
+    assert window.evict_before(1.0) == 1
+    assert window.median() == 2.0
+    with pytest.raises(ValueError):
+        window.percentile(101)
+
+
+def test_large_order_threshold_matches_numpy():
+    state_machine = TripleAStateMachine(TripleAEngineConfig(), is_shadow=True)
+    ticks = make_synthetic_ticks(1500, seed=5, mean_interval_ms=60)
+    for k, (ts, px, sz, side) in enumerate(zip(ticks['ts'].tolist(), ticks['px'].tolist(),
+                                               ticks['sz'].tolist(), ticks['side'].tolist())):
+        drive_coroutine(state_machine.process_tick(NormalizedTick(ts=ts * 1_000_000, px=px, sz=sz, side=side)))
+        if k % 10:
+            continue
+        # 中途调大时间窗，触发从环形缓冲重建
+        if k == 1000:
+            state_machine.large_order_window_seconds = 60.0
+        state_machine.last_large_order_trigger_ts = 0.0
+        state_machine._detect_large_order_bubble()
+
+        buffer = state_machine.tick_buffer
+        n = buffer.count_since(state_machine.clock.now() - state_machine.large_order_window_seconds)
+        if len(buffer) < 50 or n < max(30, state_machine.large_order_ratio_window_ticks):
+            continue
+        window_sizes = buffer.view('sz', n)
+        expected = max(float(np.percentile(window_sizes, state_machine.large_order_quantile)),
+                       float(np.median(window_sizes) * state_machine.large_order_median_multiplier))
+        assert state_machine.context.large_order_threshold == expected
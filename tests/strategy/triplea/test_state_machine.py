@@ -186,12 +186,12 @@ def test_volatility_compression_detection():
     state_machine = TripleAStateMachine(config)
 
     # 清空缓冲区
-    state_machine.price_buffer.clear()
+    state_machine.tick_buffer.clear()
 
     # 模拟价格在窄幅区间内波动（波动率压缩）
     compressed_prices = [3000.0 + np.random.uniform(-0.01, 0.01) for _ in range(20)]
-    for price in compressed_prices:
-        state_machine.price_buffer.append(price)
+    for i, price in enumerate(compressed_prices):
+        state_machine.tick_buffer.append(i * 0.1, price, 0.1, 1)
 
     # 检测波动率压缩
     compression_detected = state_machine._detect_volatility_compression()
@@ -201,10 +201,10 @@ def test_volatility_compression_detection():
     print(f"✅ 波动率压缩检测逻辑执行完成，结果: {compression_detected}")
 
     # 模拟价格大幅波动（非压缩）
-    state_machine.price_buffer.clear()
+    state_machine.tick_buffer.clear()
     volatile_prices = [3000.0 + np.random.uniform(-10.0, 10.0) for _ in range(20)]
-    for price in volatile_prices:
-        state_machine.price_buffer.append(price)
+    for i, price in enumerate(volatile_prices):
+        state_machine.tick_buffer.append(i * 0.1, price, 0.1, 1)
 
     compression_detected = state_machine._detect_volatility_compression()
     assert compression_detected is False
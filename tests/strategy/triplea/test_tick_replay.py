@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+四号引擎 Tick 回放器测试
+验证协程同步驱动、回放统计以及信号的止盈/止损出场与 MFE/MAE 计算
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from src.data_feed.trade_tape import TRADE_TAPE_DTYPE
+from src.strategy.triplea.replay import TripleAReplay, drive_coroutine, make_synthetic_ticks
+
+
+def test_drive_coroutine_returns_value():
+    async def no_suspend(x):
+        return x * 2
+
+    assert drive_coroutine(no_suspend(21)) == 42
+
+
+def test_drive_coroutine_rejects_real_suspension():
+    import asyncio
+
+    async def suspends():
+        await asyncio.sleep(0)
+
+    with pytest.raises(RuntimeError):
+        drive_coroutine(suspends())
+
+
+def test_replay_runs_both_engines():
+    ticks = make_synthetic_ticks(1000, seed=1)
+    replay = TripleAReplay(shadow_overrides={'large_order_quantile': 99.0})
+    result = replay.run(ticks)
+
+    assert replay.generators['main'].processed_ticks == 1000
+    assert replay.generators['shadow'].processed_ticks == 1000
+    assert replay.generators['shadow'].state_machine.large_order_quantile == 99.0
+    assert result.stats['ticks'] == 1000
+    assert result.stats['ticks_per_sec'] > 0
+    assert list(result.signals.columns)[:3] == ['engine', 'tick_index', 'ts']
+
+
+def test_evaluate_signals_exit_and_excursions():
+    px = [100.0, 100.5, 99.5, 101.0, 102.5, 99.0, 98.0]
+    ticks = np.zeros(len(px), dtype=TRADE_TAPE_DTYPE)
+    ticks['px'] = px
+    ticks['ts'] = 1_700_000_000_000 + np.arange(len(px)) * 100
+
+    raw = [
+        # 多单：99.5 的不利偏移 0.5，随后在 102.5 触及止盈
+        ('main', 0, {'action': 'BUY', 'entry_price': 100.0, 'stop_loss': 99.0, 'take_profit': 102.0}),
+        # 空单：先涨到 102.5 触及止损
+        ('shadow', 2, {'action': 'SELL', 'entry_price': 99.5, 'stop_loss': 102.0, 'take_profit': 97.0}),
+        # 多单：到数据结束也没有触及
+        ('main', 4, {'action': 'BUY', 'entry_price': 102.5, 'stop_loss': 90.0, 'take_profit': 110.0}),
+    ]
+    df = TripleAReplay._evaluate_signals(raw, ticks)
+
+    assert list(df['exit_reason']) == ['TP', 'SL', 'END']
+    assert list(df['exit_index']) == [4, 4, 6]
+    assert df.loc[0, 'mfe'] == pytest.approx(2.5)
+    assert df.loc[0, 'mae'] == pytest.approx(0.5)
+    assert df.loc[1, 'mae'] == pytest.approx(3.0)
+    assert df.loc[1, 'pnl'] == pytest.approx(-3.0)
+    assert df.loc[2, 'mae'] == pytest.approx(4.5)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author     : Zijun Deng
+@Date       : 3/8/26 11:05 PM
+@File       : migrate_candles_to_columnar.py
+@Description: 一次性迁移工具：data/crypto_history.db -> data/candles/ 按月分区列式存储
+
+用法:
+    python tools/migrate_candles_to_columnar.py                       # 迁移库内所有 K 线表
+    python tools/migrate_candles_to_columnar.py --tables ETH_USDT_SWAP_1m ETH_USDT_SWAP_1H
+
+迁移完成后把 config/settings.yaml 中 candle_storage.backend 改为 "columnar"。
+"""
+import argparse
+import os
+import sqlite3
+import sys
+
+# 添加项目根目录到 Python 路径
+current_file = os.path.abspath(__file__)
+project_root = os.path.dirname(os.path.dirname(current_file))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import pandas as pd
+
+from src.data_feed.candle_store import ColumnarCandleStore
+
+KNOWN_TIMEFRAMES = ('1m', '5m', '15m', '30m', '1H', '4H', '1D')
+CHUNK_SIZE = 500_000
+
+
+def parse_table_name(table_name: str):
+    """ETH_USDT_SWAP_1H -> ('ETH-USDT-SWAP', '1H')，不是 K 线表时返回 None"""
+    symbol_part, _, timeframe = table_name.rpartition('_')
+    if not symbol_part or timeframe not in KNOWN_TIMEFRAMES:
+        return None
+    return symbol_part.replace('_', '-'), timeframe
+
+
+def migrate_table(conn, table_name: str, out_dir: str) -> int:
+    parsed = parse_table_name(table_name)
+    if parsed is None:
+        print(f"⏭️  跳过非K线表: {table_name}")
+        return 0
+    symbol, timeframe = parsed
+    store = ColumnarCandleStore(out_dir, symbol, timeframe)
+
+    total = 0
+    # 按时间顺序分块读取，列式存储走尾部追加快路径，内存占用与总行数无关
+    query = f"SELECT timestamp, open, high, low, close, volume FROM {table_name} ORDER BY timestamp"
+    for chunk in pd.read_sql(query, conn, index_col='timestamp', parse_dates=['timestamp'], chunksize=CHUNK_SIZE):
+        store.append(chunk)
+        total += len(chunk)
+        print(f"   {table_name}: 已迁移 {total} 根")
+
+    print(f"✅ {table_name} -> {store.base_dir} ({total} 根, {len(store.partitions())} 个月份分区)")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把 SQLite K 线库迁移为按月分区的列式存储")
+    parser.add_argument('--db', default=os.path.join(project_root, 'data', 'crypto_history.db'),
+                        help="源 SQLite 数据库路径")
+    parser.add_argument('--out', default=os.path.join(project_root, 'data', 'candles'),
+                        help="列式存储根目录")
+    parser.add_argument('--tables', nargs='*', help="只迁移指定的表 (默认全部)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ 找不到数据库: {args.db}")
+        sys.exit(1)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        tables = args.tables or [row[0] for row in
+                                 conn.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")]
+        grand_total = sum(migrate_table(conn, table, args.out) for table in tables)
+    finally:
+        conn.close()
+
+    print(f"🎉 迁移完成，共 {len(tables)} 张表，{grand_total} 根 K 线")
+
+
+if __name__ == "__main__":
+    main()
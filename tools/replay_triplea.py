@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Author     : Zijun Deng
+@Date       : 3/14/26 10:30 PM
+@File       : replay_triplea.py
+@Description: 四号引擎离线回放工具：用录制的成交磁带驱动主引擎 + 影子引擎
+
+用法:
+    python tools/replay_triplea.py --day 2026-03-01
+    python tools/replay_triplea.py --day 2026-03-01 --end-day 2026-03-03 --shadow vol_spike_threshold=1.8
+    python tools/replay_triplea.py --synthetic 200000 --out data/tripleA/replay_signals.csv
+"""
+import argparse
+import os
+import sys
+
+# 添加项目根目录到 Python 路径
+current_file = os.path.abspath(__file__)
+project_root = os.path.dirname(os.path.dirname(current_file))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.data_feed.trade_tape import DEFAULT_TAPE_DIR
+from src.strategy.triplea.replay import TripleAReplay, make_synthetic_ticks
+
+
+def parse_overrides(items: list) -> dict:
+    """['vol_spike_threshold=1.8', ...] -> {'vol_spike_threshold': 1.8}"""
+    overrides = {}
+    for item in items or []:
+        name, _, value = item.partition('=')
+        try:
+            overrides[name] = float(value)
+        except ValueError:
+            overrides[name] = value
+    return overrides
+
+
+def main():
+    parser = argparse.ArgumentParser(description="四号引擎成交磁带极速回放")
+    parser.add_argument('--symbol', default="ETH-USDT-SWAP", help="交易对")
+    parser.add_argument('--day', help="回放起始日期 YYYY-MM-DD (UTC)")
+    parser.add_argument('--end-day', help="回放结束日期 (默认与 --day 相同)")
+    parser.add_argument('--tape-dir', default=DEFAULT_TAPE_DIR, help="成交磁带目录")
+    parser.add_argument('--synthetic', type=int, help="不读磁带，改用 N 笔合成成交")
+    parser.add_argument('--no-main', action='store_true', help="不回放主引擎")
+    parser.add_argument('--no-shadow', action='store_true', help="不回放影子引擎")
+    parser.add_argument('--main', nargs='*', help="主引擎参数覆盖，如 large_order_quantile=98")
+    parser.add_argument('--shadow', nargs='*', help="影子引擎参数覆盖，如 vol_spike_threshold=1.8")
+    parser.add_argument('--out', help="信号明细输出 CSV 路径")
+    args = parser.parse_args()
+
+    if not args.synthetic and not args.day:
+        parser.error("需要指定 --day 或 --synthetic")
+
+    replay = TripleAReplay(symbol=args.symbol,
+                           include_main=not args.no_main,
+                           include_shadow=not args.no_shadow,
+                           main_overrides=parse_overrides(args.main),
+                           shadow_overrides=parse_overrides(args.shadow))
+
+    if args.synthetic:
+        result = replay.run(make_synthetic_ticks(args.synthetic))
+    else:
+        result = replay.run_tape(args.day, args.end_day, root_dir=args.tape_dir)
+
+    stats = result.stats
+    print(f"✅ 回放完成: {stats['ticks']} 笔成交, {stats['elapsed_sec']:.2f}s, "
+          f"{stats['ticks_per_sec']:,.0f} ticks/s, 信号 {stats['signals']} 个")
+    if not result.signals.empty:
+        print(result.signals.groupby(['engine', 'exit_reason'])[['mfe', 'mae', 'pnl']].mean())
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        result.signals.to_csv(args.out, index=False)
+        print(f"💾 信号明细已写入 {args.out}")
+
+
+if __name__ == "__main__":
+    main()